@@ -1,21 +1,616 @@
-from flask import Flask, render_template, request, redirect, url_for, session, flash
+from flask import Flask, render_template, request, redirect, url_for, session, flash, g, jsonify, make_response, has_request_context, Response, send_file
+import click
 import sqlite3
+import base64
+import bisect
+import csv
+import hashlib
+import hmac
+import html
+import io
+import ipaddress
+import json
+import logging
+import math
+import multiprocessing
+import pathlib
+import pickle
+import queue
+import random
+import re
+import secrets
+import sys
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError as FuturesTimeout
+from contextlib import contextmanager
+from flask.json.tag import TaggedJSONSerializer
+from flask.logging import default_handler
+from flask.sessions import SessionInterface, SessionMixin
+from werkzeug.datastructures import CallbackDict
+from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
 import os
 
+try:
+    import fcntl
+except ImportError:  # Windows: snapshot refreshes just aren't coordinated across processes
+    fcntl = None
+
+try:
+    import qrcode
+    import qrcode.image.svg
+except ImportError:  # optional: tickets fall back to a plain SVG badge
+    qrcode = None
+
 app = Flask(__name__)
 app.secret_key = 'super_secret_key'  # Change this for production
-DB_NAME = "eventlink.db"
+DB_NAME = os.environ.get('EVENTLINK_DB', 'eventlink.db')
+DB_POOL_SIZE = int(os.environ.get('EVENTLINK_DB_POOL_SIZE', 8))
+DB_POOL_TIMEOUT = float(os.environ.get('EVENTLINK_DB_POOL_TIMEOUT', 5.0))
+
+# Applied to every new connection. WAL lets readers run alongside the writer,
+# and synchronous=NORMAL is safe under WAL (only the last commits can be lost on power failure;
+# EVENTLINK_DB_SYNCHRONOUS=FULL syncs every commit).
+DB_PRAGMAS = [
+    ('journal_mode', 'WAL'),
+    ('synchronous', os.environ.get('EVENTLINK_DB_SYNCHRONOUS', 'NORMAL')),
+    ('cache_size', -16000),      # ~16MB page cache per connection
+    ('mmap_size', 134217728),    # 128MB memory-mapped I/O
+    ('busy_timeout', 5000),      # wait up to 5s on a locked database
+    ('temp_store', 'MEMORY'),
+]
 
 # --- Database Helper ---
+class PoolTimeout(sqlite3.OperationalError):
+    """Raised when no pooled connection becomes free within the timeout"""
+
+class ConnectionPool:
+    """Thread-safe pool of SQLite connections shared by the request threads of a worker"""
+
+    def __init__(self, database, max_size=DB_POOL_SIZE, timeout=DB_POOL_TIMEOUT, readonly=False, immutable=False):
+        self.database = database
+        self.max_size = max_size
+        self.timeout = timeout
+        # readonly: mode=ro connections that can never take the write lock.
+        # immutable: the file is only ever replaced whole (a snapshot), so SQLite
+        # skips locking; connections to a replaced file are retired.
+        self.readonly = readonly or immutable
+        self.immutable = immutable
+        self._cond = threading.Condition()
+        self._reset()
+
+    def _reset(self):
+        # Connections must never cross a fork, so a new worker process starts with an empty pool
+        self._pid = os.getpid()
+        self._idle = []
+        self._opened = 0
+        self._in_use = 0
+        self.stats = {'hits': 0, 'misses': 0, 'waits': 0, 'timeouts': 0, 'leaks': 0}
+
+    def _connect(self):
+        if self.readonly:
+            mode = 'ro&immutable=1' if self.immutable else 'ro'
+            conn = sqlite3.connect(f'{pathlib.Path(self.database).resolve().as_uri()}?mode={mode}', uri=True,
+                                   timeout=self.timeout, check_same_thread=False, factory=InstrumentedConnection)
+            pragmas = [(name, value) for name, value in DB_PRAGMAS if name != 'journal_mode']
+        else:
+            conn = sqlite3.connect(self.database, timeout=self.timeout, check_same_thread=False,
+                                   factory=InstrumentedConnection)
+            pragmas = DB_PRAGMAS
+        conn.row_factory = sqlite3.Row
+        for name, value in pragmas:
+            conn.execute(f'PRAGMA {name} = {value}')
+        conn.file_id = self._file_id() if self.immutable else None
+        return conn
+
+    def _file_id(self):
+        st = os.stat(self.database)
+        return st.st_ino, st.st_mtime_ns
+
+    def _retire(self, conn):
+        # Caller holds self._cond
+        conn.close()
+        self._opened -= 1
+
+    def acquire(self):
+        with self._cond:
+            if self._pid != os.getpid():
+                self._reset()
+            if not self._idle and self._opened >= self.max_size:
+                self.stats['waits'] += 1
+                if not self._cond.wait_for(lambda: self._idle or self._opened < self.max_size, self.timeout):
+                    self.stats['timeouts'] += 1
+                    raise PoolTimeout(f'No database connection available after {self.timeout}s')
+            if self._idle and self.immutable:
+                current = self._file_id()
+                for stale in [c for c in self._idle if c.file_id != current]:
+                    self._idle.remove(stale)
+                    self._retire(stale)
+            if self._idle:
+                self.stats['hits'] += 1
+                conn = self._idle.pop()
+            else:
+                self.stats['misses'] += 1
+                conn = self._connect()
+                self._opened += 1
+            self._in_use += 1
+            return conn
+
+    def release(self, conn):
+        # A connection returned mid-transaction means a route forgot to commit
+        leaked = conn.in_transaction
+        if leaked:
+            conn.rollback()
+        with self._cond:
+            if self._pid != os.getpid():
+                conn.close()
+                return
+            self._in_use -= 1
+            if leaked:
+                self.stats['leaks'] += 1
+            if self.immutable and conn.file_id != self._file_id():
+                self._retire(conn)
+            else:
+                self._idle.append(conn)
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection outside of a request (CLI commands, background threads)"""
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def snapshot(self):
+        with self._cond:
+            return dict(self.stats, size=self.max_size, opened=self._opened,
+                        idle=len(self._idle), in_use=self._in_use)
+
+db_pool = ConnectionPool(DB_NAME)
+
 def get_db():
-    conn = sqlite3.connect(DB_NAME)
-    conn.row_factory = sqlite3.Row
-    return conn
+    """Return the connection bound to the current app context, checking one out of the pool on first use"""
+    if 'db' not in g:
+        g.db = db_pool.acquire()
+        g.db.profile = g.get('query_profile')
+    return g.db
 
-def init_db():
-    conn = get_db()
+def return_db():
+    """Give the connection get_db() checked out back to the pool early; a later get_db() checks out another"""
+    conn = g.pop('db', None)
+    if conn is not None:
+        conn.profile = None
+        db_pool.release(conn)
+
+@contextmanager
+def write_transaction(conn):
+    """Run a block under BEGIN IMMEDIATE: the write lock is taken up front, so the
+    reads inside the block cannot go stale before the writes land"""
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+@app.teardown_appcontext
+def release_db(exc):
+    return_db()
+    conn = g.pop('read_db', None)
+    if conn is not None:
+        conn.profile = None
+        g.pop('read_db_pool').release(conn)
+
+# --- Logging ---
+# app.logger writes JSON lines to stderr. Callers only copy the record onto a
+# bounded queue; a writer thread per process encodes and writes it, so a slow
+# or blocked stderr (a full pipe under gunicorn) never holds up a request.
+# When the queue is full records are dropped and counted rather than waited on.
+# Each request gets a correlation id (the incoming X-Request-ID if it looks
+# sane, else a new one), carried by every record logged while it runs and
+# echoed in the response. Access lines are sampled per endpoint with
+# EVENTLINK_LOG_SAMPLING ('endpoint=rate,...', '*' for the rest); server
+# errors and requests slower than LOG_SLOW_REQUEST_MS are always logged.
+LOG_LEVEL = os.environ.get('EVENTLINK_LOG_LEVEL', 'INFO').upper()
+LOG_QUEUE_SIZE = int(os.environ.get('EVENTLINK_LOG_QUEUE_SIZE', 10000))
+LOG_SLOW_REQUEST_MS = float(os.environ.get('EVENTLINK_LOG_SLOW_REQUEST_MS', 1000))
+REQUEST_ID_HEADER = 'X-Request-ID'
+REQUEST_ID_RE = re.compile(r'[A-Za-z0-9._:-]{1,64}')
+
+def parse_log_sampling(spec):
+    """{'endpoint': rate} from 'endpoint=rate,...'; malformed entries are ignored"""
+    rates = {}
+    for item in spec.split(','):
+        endpoint, _, rate = item.strip().partition('=')
+        try:
+            rates[endpoint] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
+
+# The public event pages, the stream they open, and the probes are the bulk of all requests
+LOG_SAMPLING = parse_log_sampling(os.environ.get(
+    'EVENTLINK_LOG_SAMPLING', 'health=0.01,metrics=0.01,static=0.01,events_list=0.1,event_detail=0.1,event_availability=0.1,'
+    'event_availability_counts=0.1'))
+
+class JsonLogFormatter(logging.Formatter):
+    """One JSON object per record: time, level, logger, message, request id, the `fields` passed as extra, traceback"""
+
+    def format(self, record):
+        entry = {'ts': datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec='milliseconds'),
+                 'level': record.levelname, 'logger': record.name, 'msg': record.getMessage(),
+                 'request_id': getattr(record, 'request_id', None), 'pid': record.process, 'thread': record.threadName}
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, default=str)
+
+def current_request_id():
+    """This request's correlation id, taken from the X-Request-ID header or made up on first use"""
+    request_id = g.get('request_id')
+    if request_id is None:
+        incoming = request.headers.get(REQUEST_ID_HEADER, '')
+        request_id = g.request_id = incoming if REQUEST_ID_RE.fullmatch(incoming) else uuid.uuid4().hex
+    return request_id
+
+class RequestIdFilter(logging.Filter):
+    """Stamps records with the current request's correlation id; runs on the logging thread, not the writer"""
+
+    def filter(self, record):
+        record.request_id = current_request_id() if has_request_context() else None
+        return True
+
+class AsyncLogHandler(logging.Handler):
+    """Queues records for a background thread that formats and writes them to stream; emit() never blocks.
+
+    The thread is started on first use in each process, since threads don't survive a fork.
+    """
+
+    def __init__(self, stream=None, max_queue=LOG_QUEUE_SIZE, batch_size=1000, interval=0.05):
+        super().__init__()
+        self.stream = stream
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.interval = interval
+        self._queue = None
+        self._thread = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        self._traceback_formatter = logging.Formatter()
+        # Updated by every request thread and the writer
+        self._stats_lock = threading.Lock()
+        self.stats = {'queued': 0, 'written': 0, 'dropped': 0, 'errors': 0}
+
+    def _start(self):
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            # An inherited queue may hold records the parent's writer was about to write
+            self._queue = queue.SimpleQueue()
+            with self._stats_lock:
+                self.stats.update(queued=0, written=0)
+            self._thread = threading.Thread(target=self._write, name='log-writer', daemon=True)
+            self._thread.start()
+            self._pid = os.getpid()
+
+    def prepare(self, record):
+        """Settle everything that depends on the moment of the call; encoding and I/O are left to the writer"""
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = self._traceback_formatter.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def _count(self, stat, n=1):
+        with self._stats_lock:
+            self.stats[stat] += n
+
+    def emit(self, record):
+        if self._pid != os.getpid():
+            self._start()
+        if self._queue.qsize() >= self.max_queue:
+            self._count('dropped')
+            return
+        self._queue.put(self.prepare(record))
+        self._count('queued')
+
+    def _write(self):
+        records = self._queue
+        while True:
+            # Wait for a record, then give the request threads a moment to add more, so the writer
+            # takes the GIL once per batch rather than once per record, and writes and flushes once
+            batch = [records.get()]
+            time.sleep(self.interval)
+            while len(batch) < self.batch_size and not records.empty():
+                batch.append(records.get())
+            done = None in batch
+            batch = [record for record in batch if record is not None]
+            try:
+                stream = self.stream or sys.stderr
+                stream.write(''.join(self.format(record) + '\n' for record in batch))
+                stream.flush()
+                self._count('written', len(batch))
+            except Exception:
+                self._count('errors', len(batch))
+            if done:
+                return
+
+    def flush(self, timeout=2.0):
+        """Wait up to timeout seconds for the writer to catch up"""
+        deadline = time.monotonic() + timeout
+        while self._pid == os.getpid() and self._backlog() and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    def _backlog(self):
+        with self._stats_lock:
+            return self.stats['queued'] - self.stats['written'] - self.stats['errors']
+
+    def close(self):
+        # Called by logging.shutdown() at exit: let the writer drain the queue, then stop it
+        if self._pid == os.getpid() and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join(2.0)
+        super().close()
+
+    def snapshot(self):
+        running = self._pid == os.getpid()
+        with self._stats_lock:
+            stats = dict(self.stats)
+        return dict(stats, backlog=self._queue.qsize() if running else 0, max_queue=self.max_queue,
+                    writer='running' if running and self._thread.is_alive() else 'idle')
+
+log_handler = AsyncLogHandler()
+log_handler.setFormatter(JsonLogFormatter())
+log_handler.addFilter(RequestIdFilter())
+app.logger.removeHandler(default_handler)
+app.logger.addHandler(log_handler)
+app.logger.setLevel(LOG_LEVEL)
+app.logger.propagate = False
+access_logger = app.logger.getChild('access')
+
+def log_request(response, seconds, profile):
+    """Write the access line for a finished request, if its endpoint's sample includes it"""
+    if not access_logger.isEnabledFor(logging.INFO):
+        return
+    endpoint = request.endpoint or 'unmatched'
+    always = response.status_code >= 500 or seconds * 1000 >= LOG_SLOW_REQUEST_MS
+    rate = 1.0 if always else LOG_SAMPLING.get(endpoint, LOG_SAMPLING.get('*', 1.0))
+    if rate < 1.0 and random.random() >= rate:
+        return
+    # The path only: query strings carry search terms and cursors
+    access_logger.log(logging.WARNING if always else logging.INFO, '%s %s %s',
+                      request.method, request.path, response.status_code, extra={'fields': {
+                          'method': request.method, 'path': request.path, 'endpoint': endpoint,
+                          'status': response.status_code, 'duration_ms': round(seconds * 1000, 2),
+                          'queries': profile.count, 'db_ms': round(profile.seconds * 1000, 2),
+                          'user_id': session.get('user_id'), 'sample_rate': rate}})
+
+@app.after_request
+def tag_request_id(response):
+    response.headers[REQUEST_ID_HEADER] = current_request_id()
+    return response
+
+# --- Instrumentation ---
+# Every pooled connection times its statements. During a request the timings land
+# in g.query_profile, which feeds the Server-Timing header and the /metrics histograms.
+# Metrics are kept per worker process; scrape each worker (or run one) for totals.
+# /metrics and the /health details answer only a bearer EVENTLINK_METRICS_TOKEN, or
+# without one only loopback callers; behind a proxy set the token or EVENTLINK_PROXY_HOPS.
+SLOW_QUERY_MS = float(os.environ.get('EVENTLINK_SLOW_QUERY_MS', 100))
+METRICS_TOKEN = os.environ.get('EVENTLINK_METRICS_TOKEN')
+MAX_PROFILED_STATEMENTS = 200
+
+def internal_caller():
+    """Whether this request may see pool, query and queue internals"""
+    if METRICS_TOKEN:
+        return hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {METRICS_TOKEN}')
+    if 'X-Forwarded-For' in request.headers and not PROXY_HOPS:
+        return False  # a local proxy relaying someone else
+    try:
+        return ipaddress.ip_address(request.remote_addr or '').is_loopback
+    except ValueError:
+        return False
+
+class QueryProfile:
+    """SQL statements run on behalf of one request"""
+
+    def __init__(self):
+        self.count = 0
+        self.seconds = 0.0
+        self.statements = []
+        self.wrote = False
+
+    def record(self, sql, seconds):
+        self.count += 1
+        self.seconds += seconds
+        if len(self.statements) < MAX_PROFILED_STATEMENTS:
+            self.statements.append((sql, seconds))
+
+class InstrumentedConnection(sqlite3.Connection):
+    """Connection that times each statement and logs the slow ones with their query plan.
+
+    Only the execute() call itself is timed: rows fetched lazily afterwards are not,
+    but sorts, aggregates and writes all complete inside it."""
+    profile = None
+
+    def execute(self, sql, parameters=()):
+        start = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            self._observe(sql, parameters, time.perf_counter() - start)
+
+    def executemany(self, sql, seq_of_parameters):
+        start = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_parameters)
+        finally:
+            self._observe(sql, None, time.perf_counter() - start)
+
+    def commit(self):
+        if not self.in_transaction:
+            return super().commit()
+        start = time.perf_counter()
+        try:
+            super().commit()
+        finally:
+            self._observe('COMMIT', None, time.perf_counter() - start)
+        if self.profile is not None:
+            self.profile.wrote = True
+
+    def _observe(self, sql, parameters, seconds):
+        if self.profile is not None:
+            self.profile.record(sql, seconds)
+        if seconds * 1000 >= SLOW_QUERY_MS:
+            log_slow_query(self, sql, parameters, seconds)
+
+def log_slow_query(conn, sql, parameters, seconds):
+    """Log a statement that ran past SLOW_QUERY_MS together with its EXPLAIN QUERY PLAN"""
+    request_metrics.count_slow_query()
+    plan = 'n/a'
+    if parameters is not None and not sql.lstrip().upper().startswith(('BEGIN', 'COMMIT', 'PRAGMA')):
+        try:
+            rows = sqlite3.Connection.execute(conn, 'EXPLAIN QUERY PLAN ' + sql, parameters).fetchall()
+            plan = '; '.join(row[3] for row in rows)
+        except sqlite3.Error as e:
+            plan = f'unavailable ({e})'
+    endpoint = request.endpoint if has_request_context() else None
+    app.logger.warning('Slow query (%.1f ms) in %s: %s | plan: %s',
+                       seconds * 1000, endpoint or '-', ' '.join(sql.split()), plan)
+
+class Histogram:
+    """Fixed-bucket histogram; bucket counts are stored per bucket and summed when rendered"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+def _prom_labels(**labels):
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for v in labels.values())
+    return '{' + ','.join(f'{k}="{v}"' for k, v in zip(labels, escaped)) + '}'
+
+class RequestMetrics:
+    """Per-endpoint request counters and histograms, rendered in the Prometheus text format"""
+    DURATION_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+    QUERY_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100)
+    HISTOGRAMS = [
+        ('eventlink_request_duration_seconds', 'Request latency by endpoint', DURATION_BUCKETS),
+        ('eventlink_request_sql_seconds', 'Time spent in SQL per request by endpoint', DURATION_BUCKETS),
+        ('eventlink_request_queries', 'SQL statements per request by endpoint', QUERY_BUCKETS),
+    ]
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._responses = {}
+        self.slow_queries = 0
+
+    def observe(self, endpoint, method, status, seconds, profile):
+        key = (endpoint, method)
+        with self._lock:
+            series = self._histograms.get(key)
+            if series is None:
+                series = self._histograms[key] = [Histogram(buckets) for _, _, buckets in self.HISTOGRAMS]
+            for histogram, value in zip(series, (seconds, profile.seconds, profile.count)):
+                histogram.observe(value)
+            response_key = (endpoint, method, status)
+            self._responses[response_key] = self._responses.get(response_key, 0) + 1
+
+    def count_slow_query(self):
+        with self._lock:
+            self.slow_queries += 1
+
+    def render(self, pool_stats, hash_stats):
+        lines = ['# HELP eventlink_requests_total Responses by endpoint, method and status',
+                 '# TYPE eventlink_requests_total counter']
+        with self._lock:
+            for (endpoint, method, status), count in sorted(self._responses.items()):
+                lines.append(f'eventlink_requests_total{_prom_labels(endpoint=endpoint, method=method, status=status)} {count}')
+            for index, (name, help_text, buckets) in enumerate(self.HISTOGRAMS):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for (endpoint, method), series in sorted(self._histograms.items()):
+                    histogram = series[index]
+                    cumulative = 0
+                    for bound, count in zip(list(buckets) + ['+Inf'], histogram.counts):
+                        cumulative += count
+                        lines.append(f'{name}_bucket{_prom_labels(endpoint=endpoint, method=method, le=bound)} {cumulative}')
+                    labels = _prom_labels(endpoint=endpoint, method=method)
+                    lines.append(f'{name}_sum{labels} {round(histogram.sum, 6)}')
+                    lines.append(f'{name}_count{labels} {histogram.count}')
+            lines += ['# HELP eventlink_slow_queries_total Statements slower than the slow-query threshold',
+                      '# TYPE eventlink_slow_queries_total counter',
+                      f'eventlink_slow_queries_total {self.slow_queries}']
+        for key in ('hits', 'misses', 'waits', 'timeouts', 'leaks'):
+            lines += [f'# TYPE eventlink_db_pool_{key}_total counter', f'eventlink_db_pool_{key}_total {pool_stats[key]}']
+        for key in ('size', 'opened', 'idle', 'in_use'):
+            lines += [f'# TYPE eventlink_db_pool_{key} gauge', f'eventlink_db_pool_{key} {pool_stats[key]}']
+        for key in ('hashed', 'verified', 'rehashed', 'rejected'):
+            lines += [f'# TYPE eventlink_password_{key}_total counter', f'eventlink_password_{key}_total {hash_stats[key]}']
+        lines += ['# HELP eventlink_password_queue_depth Password hashing jobs waiting or running',
+                  '# TYPE eventlink_password_queue_depth gauge', f'eventlink_password_queue_depth {hash_stats["pending"]}',
+                  '# TYPE eventlink_password_queue_limit gauge', f'eventlink_password_queue_limit {hash_stats["limit"]}']
+        return '\n'.join(lines) + '\n'
+
+request_metrics = RequestMetrics()
+
+@app.before_request
+def start_request_profile():
+    g.request_started = time.perf_counter()
+    g.query_profile = QueryProfile()
+    if 'db' in g:
+        # Checked out earlier to load the session
+        g.db.profile = g.query_profile
+
+def server_timing(profile, elapsed):
+    return f'db;dur={profile.seconds * 1000:.2f};desc="{profile.count} queries", app;dur={elapsed * 1000:.2f}'
+
+@app.after_request
+def record_request_metrics(response):
+    started = g.pop('request_started', None)
+    if started is None:
+        return response
+    elapsed = g.request_elapsed = time.perf_counter() - started
+    profile = g.query_profile
+    response.headers['Server-Timing'] = server_timing(profile, elapsed)
+    request_metrics.observe(request.endpoint or 'unmatched', request.method, response.status_code, elapsed, profile)
+    log_request(response, elapsed, profile)
+    if app.logger.isEnabledFor(logging.DEBUG):
+        for sql, seconds in profile.statements:
+            app.logger.debug('%s %.2f ms: %s', request.path, seconds * 1000, ' '.join(sql.split()))
+    return response
+
+# --- Schema Migrations ---
+# Each migration runs once, in order, inside its own transaction; the applied
+# version is tracked in PRAGMA user_version. Never edit a shipped migration,
+# append a new one instead.
+DEFAULT_CATEGORIES = [
+    ('Concert', 'Live music performances'),
+    ('Conference', 'Professional conferences and seminars'),
+    ('Workshop', 'Educational workshops and training'),
+    ('Sports', 'Sporting events and competitions'),
+    ('Arts', 'Art exhibitions and cultural events'),
+    ('Food & Drink', 'Food festivals and culinary events'),
+    ('Networking', 'Business networking events'),
+    ('Other', 'Other types of events')
+]
+
+def _migration_base_schema(conn):
     # Users Table
     conn.execute('''CREATE TABLE IF NOT EXISTS users (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -61,37 +656,388 @@ def init_db():
         description TEXT
     )''')
     
-    # Insert default categories if they don't exist
-    default_categories = [
-        ('Concert', 'Live music performances'),
-        ('Conference', 'Professional conferences and seminars'),
-        ('Workshop', 'Educational workshops and training'),
-        ('Sports', 'Sporting events and competitions'),
-        ('Arts', 'Art exhibitions and cultural events'),
-        ('Food & Drink', 'Food festivals and culinary events'),
-        ('Networking', 'Business networking events'),
-        ('Other', 'Other types of events')
-    ]
-    
-    for category_name, description in default_categories:
+    conn.executemany('INSERT OR IGNORE INTO categories (name, description) VALUES (?, ?)',
+                     DEFAULT_CATEGORIES)
+
+def _migration_hot_query_indexes(conn):
+    # my_tickets, profile and the user dashboard (user_id), has_ticket in event_detail (user_id, event_id)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tickets_user_event ON tickets (user_id, event_id)')
+    # Per-event ticket counts and quantity sums are answered from the index alone
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tickets_event_quantity ON tickets (event_id, quantity)')
+    # Organizer dashboard and payments, already in date order
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_events_organizer_date ON events (organizer_id, date_time)')
+    # events_list: status filter ordered by date, with and without a category filter
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_events_status_date ON events (status, date_time)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_events_status_category_date ON events (status, category, date_time)')
+
+def _migration_user_payment_columns(conn):
+    # save_payment_method has always written these, but they were never created
+    columns = {row['name'] for row in conn.execute('PRAGMA table_info(users)')}
+    if 'payment_method' not in columns:
+        conn.execute('ALTER TABLE users ADD COLUMN payment_method TEXT')
+    if 'card_last_four' not in columns:
+        conn.execute('ALTER TABLE users ADD COLUMN card_last_four TEXT')
+
+def _migration_events_search_index(conn):
+    # External-content FTS5 index over events; the triggers keep it in step with
+    # every INSERT/UPDATE/DELETE on events, whichever route makes the change
+    conn.execute('''CREATE VIRTUAL TABLE IF NOT EXISTS events_fts USING fts5(
+        title, description, location,
+        content='events', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3'
+    )''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS events_fts_insert AFTER INSERT ON events BEGIN
+        INSERT INTO events_fts (rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS events_fts_delete AFTER DELETE ON events BEGIN
+        INSERT INTO events_fts (events_fts, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+    END''')
+    conn.execute('''CREATE TRIGGER IF NOT EXISTS events_fts_update
+        AFTER UPDATE OF title, description, location ON events BEGIN
+        INSERT INTO events_fts (events_fts, rowid, title, description, location)
+        VALUES ('delete', old.id, old.title, old.description, old.location);
+        INSERT INTO events_fts (rowid, title, description, location)
+        VALUES (new.id, new.title, new.description, new.location);
+    END''')
+    conn.execute("INSERT INTO events_fts (events_fts) VALUES ('rebuild')")
+
+def _migration_ticket_inventory(conn):
+    # Seats sold per event, maintained by purchase_tickets() so capacity checks never count tickets
+    conn.execute('ALTER TABLE events ADD COLUMN tickets_sold INTEGER NOT NULL DEFAULT 0')
+    conn.execute('''UPDATE events SET tickets_sold = (
+        SELECT COALESCE(SUM(quantity), 0) FROM tickets WHERE tickets.event_id = events.id
+    )''')
+    # Seats reserved while a buyer is on the checkout page; expired rows are simply ignored
+    conn.execute('''CREATE TABLE IF NOT EXISTS ticket_holds (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        event_id INTEGER NOT NULL,
+        user_id INTEGER NOT NULL,
+        quantity INTEGER NOT NULL,
+        expires_at REAL NOT NULL,
+        FOREIGN KEY (event_id) REFERENCES events (id),
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_ticket_holds_event_expiry ON ticket_holds (event_id, expires_at)')
+
+def _migration_sales_stats(conn):
+    # Price actually paid, so revenue doesn't change when an organizer edits the event price
+    conn.execute('ALTER TABLE tickets ADD COLUMN unit_price REAL')
+    conn.execute('UPDATE tickets SET unit_price = (SELECT price FROM events WHERE events.id = tickets.event_id)')
+    conn.execute('''CREATE TABLE IF NOT EXISTS event_stats (
+        event_id INTEGER PRIMARY KEY,
+        orders INTEGER NOT NULL DEFAULT 0,
+        gross_revenue REAL NOT NULL DEFAULT 0,
+        last_sale_at TEXT,
+        FOREIGN KEY (event_id) REFERENCES events (id)
+    )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS user_stats (
+        user_id INTEGER PRIMARY KEY,
+        orders INTEGER NOT NULL DEFAULT 0,
+        tickets INTEGER NOT NULL DEFAULT 0,
+        total_spent REAL NOT NULL DEFAULT 0,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )''')
+    _rebuild_event_user_stats(conn)
+
+def _migration_organizer_rollups(conn):
+    # Organizer totals, per-day and per-category sales for dashboard_org
+    conn.execute('''CREATE TABLE IF NOT EXISTS organizer_stats (
+        organizer_id INTEGER PRIMARY KEY,
+        orders INTEGER NOT NULL DEFAULT 0,
+        tickets INTEGER NOT NULL DEFAULT 0,
+        gross_revenue REAL NOT NULL DEFAULT 0,
+        FOREIGN KEY (organizer_id) REFERENCES users (id)
+    )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS organizer_daily_sales (
+        organizer_id INTEGER NOT NULL,
+        day TEXT NOT NULL,
+        orders INTEGER NOT NULL DEFAULT 0,
+        tickets INTEGER NOT NULL DEFAULT 0,
+        gross_revenue REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (organizer_id, day)
+    ) WITHOUT ROWID''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS organizer_category_sales (
+        organizer_id INTEGER NOT NULL,
+        category TEXT NOT NULL,
+        orders INTEGER NOT NULL DEFAULT 0,
+        tickets INTEGER NOT NULL DEFAULT 0,
+        gross_revenue REAL NOT NULL DEFAULT 0,
+        PRIMARY KEY (organizer_id, category)
+    ) WITHOUT ROWID''')
+    _rebuild_organizer_rollups(conn)
+
+def _migration_background_jobs(conn):
+    # Queue for post-commit work, and the QR images and receipts it produces.
+    # run_after doubles as the lease deadline while a job is running.
+    conn.execute('''CREATE TABLE IF NOT EXISTS jobs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        kind TEXT NOT NULL,
+        payload TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'queued',
+        attempts INTEGER NOT NULL DEFAULT 0,
+        run_after REAL NOT NULL,
+        last_error TEXT,
+        created_at TEXT NOT NULL
+    )''')
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_due ON jobs (run_after) WHERE status != 'failed'")
+    conn.execute('''CREATE TABLE IF NOT EXISTS ticket_assets (
+        ticket_id INTEGER PRIMARY KEY,
+        qr_svg TEXT NOT NULL,
+        created_at TEXT NOT NULL,
+        delivered_at TEXT,
+        FOREIGN KEY (ticket_id) REFERENCES tickets (id)
+    )''')
+
+def _migration_sessions(conn):
+    # Session data lives here; the cookie only carries '<id>.<version>'
+    conn.execute('''CREATE TABLE IF NOT EXISTS sessions (
+        id TEXT PRIMARY KEY,
+        user_id INTEGER,
+        data TEXT NOT NULL,
+        version INTEGER NOT NULL DEFAULT 1,
+        expires_at REAL NOT NULL
+    )''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_user ON sessions (user_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_sessions_expiry ON sessions (expires_at)')
+
+def _migration_payout_ledger(conn):
+    # Append-only money movements; corrections are new entries, never edits
+    conn.execute('''CREATE TABLE IF NOT EXISTS ledger_entries (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        organizer_id INTEGER NOT NULL,
+        kind TEXT NOT NULL CHECK (kind IN ('sale', 'fee', 'payout', 'payout_reversal')),
+        amount REAL NOT NULL,
+        balance_after REAL NOT NULL,
+        ticket_id INTEGER,
+        payout_id INTEGER,
+        created_at TEXT NOT NULL,
+        FOREIGN KEY (organizer_id) REFERENCES users (id)
+    )''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_ledger_organizer ON ledger_entries (organizer_id, id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_ledger_ticket ON ledger_entries (ticket_id) WHERE ticket_id IS NOT NULL')
+    for action in ('UPDATE', 'DELETE'):
+        conn.execute(f'''CREATE TRIGGER IF NOT EXISTS ledger_entries_no_{action.lower()}
+                         BEFORE {action} ON ledger_entries
+                         BEGIN SELECT RAISE(ABORT, 'ledger entries are append-only'); END''')
+    # Running totals per organizer, updated with every entry
+    conn.execute('''CREATE TABLE IF NOT EXISTS organizer_balances (
+        organizer_id INTEGER PRIMARY KEY,
+        available REAL NOT NULL DEFAULT 0,
+        sales REAL NOT NULL DEFAULT 0,
+        fees REAL NOT NULL DEFAULT 0,
+        paid_out REAL NOT NULL DEFAULT 0,
+        pending_payouts REAL NOT NULL DEFAULT 0,
+        last_entry_id INTEGER
+    )''')
+    conn.execute('''CREATE TABLE IF NOT EXISTS payouts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        organizer_id INTEGER NOT NULL,
+        amount REAL NOT NULL,
+        destination TEXT NOT NULL,
+        status TEXT NOT NULL DEFAULT 'pending' CHECK (status IN ('pending', 'paid', 'failed')),
+        idempotency_key TEXT NOT NULL,
+        processor_ref TEXT,
+        failure_reason TEXT,
+        requested_at TEXT NOT NULL,
+        settled_at TEXT,
+        UNIQUE (organizer_id, idempotency_key),
+        FOREIGN KEY (organizer_id) REFERENCES users (id)
+    )''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_payouts_organizer ON payouts (organizer_id, id)')
+    post_missing_sales(conn)
+
+def _migration_ticket_checkin(conn):
+    # A QR code is the ticket at the door, so it must name exactly one ticket.
+    # Copies of an older code (if any) get the ticket id appended; the first keeps it.
+    conn.execute('''UPDATE tickets SET qr_code = qr_code || '-' || id
+                    WHERE qr_code IS NOT NULL
+                      AND id NOT IN (SELECT MIN(id) FROM tickets WHERE qr_code IS NOT NULL GROUP BY qr_code)''')
+    conn.execute('CREATE UNIQUE INDEX IF NOT EXISTS idx_tickets_qr_code ON tickets (qr_code)')
+    # One row per redeemed ticket: the primary key is what makes a code single-use
+    conn.execute('''CREATE TABLE IF NOT EXISTS checkins (
+        ticket_id INTEGER PRIMARY KEY,
+        event_id INTEGER NOT NULL,
+        quantity INTEGER NOT NULL,
+        scanned_at TEXT NOT NULL,
+        recorded_at TEXT NOT NULL,
+        device_id TEXT,
+        offline INTEGER NOT NULL DEFAULT 0,
+        FOREIGN KEY (ticket_id) REFERENCES tickets (id)
+    )''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_checkins_event ON checkins (event_id)')
+    # Scans a door device accepted while offline but the server refused on upload
+    conn.execute('''CREATE TABLE IF NOT EXISTS checkin_conflicts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        event_id INTEGER NOT NULL,
+        qr_code TEXT NOT NULL,
+        reason TEXT NOT NULL CHECK (reason IN ('already_used', 'unknown', 'wrong_event')),
+        device_id TEXT NOT NULL,
+        scanned_at TEXT NOT NULL,
+        ticket_id INTEGER,
+        first_device_id TEXT,
+        first_scanned_at TEXT,
+        recorded_at TEXT NOT NULL,
+        UNIQUE (event_id, device_id, qr_code, scanned_at)
+    )''')
+
+def _migration_event_time_columns(conn):
+    # The datetime-local form fields used to store 'YYYY-MM-DDTHH:MM'; one format keeps text order chronological
+    conn.execute("UPDATE events SET date_time = replace(date_time, 'T', ' ') WHERE date_time LIKE '____-__-__T%'")
+    # Integer copies of the date columns for range filters (see Event Times). Generated
+    # columns can never disagree with the text they come from, whichever code path writes it.
+    conn.execute("ALTER TABLE events ADD COLUMN starts_at INTEGER "
+                 "GENERATED ALWAYS AS (CAST(strftime('%s', date_time) AS INTEGER)) VIRTUAL")
+    conn.execute("ALTER TABLE tickets ADD COLUMN purchased_at INTEGER "
+                 "GENERATED ALWAYS AS (CAST(strftime('%s', purchase_date) AS INTEGER)) VIRTUAL")
+    for name in ('idx_events_organizer_date', 'idx_events_status_date', 'idx_events_status_category_date'):
+        conn.execute(f'DROP INDEX IF EXISTS {name}')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_events_organizer_starts ON events (organizer_id, starts_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_events_status_starts ON events (status, starts_at)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_events_status_category_starts ON events (status, category, starts_at)')
+    # The archive job's scan for events that are over, whatever their status
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_events_starts ON events (starts_at)')
+    # Sales reports: one organizer's tickets within a purchase date range
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tickets_event_purchased ON tickets (event_id, purchased_at)')
+    # Past events and their tickets, moved out of the hot tables by archive_past_events().
+    # Sales counters, rollups and ledger entries stay where they are.
+    conn.execute('''CREATE TABLE IF NOT EXISTS events_archive (
+        id INTEGER PRIMARY KEY,
+        organizer_id INTEGER,
+        title TEXT NOT NULL,
+        description TEXT,
+        location TEXT NOT NULL,
+        date_time TEXT NOT NULL,
+        starts_at INTEGER,
+        price REAL NOT NULL,
+        capacity INTEGER,
+        category TEXT,
+        status TEXT,
+        image_url TEXT,
+        created_at TEXT,
+        tickets_sold INTEGER NOT NULL DEFAULT 0,
+        orders INTEGER NOT NULL DEFAULT 0,
+        gross_revenue REAL NOT NULL DEFAULT 0,
+        archived_at TEXT NOT NULL
+    )''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_events_archive_organizer ON events_archive (organizer_id, starts_at)')
+    conn.execute('''CREATE TABLE IF NOT EXISTS tickets_archive (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER,
+        event_id INTEGER NOT NULL,
+        purchase_date TEXT,
+        purchased_at INTEGER,
+        quantity INTEGER,
+        unit_price REAL,
+        qr_code TEXT,
+        checked_in_at TEXT,
+        archived_at TEXT NOT NULL
+    )''')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tickets_archive_user ON tickets_archive (user_id)')
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_tickets_archive_event ON tickets_archive (event_id, purchased_at)')
+    # The archive job reschedules itself after every run
+    job_queue.enqueue(conn, 'archive_events', {})
+
+def _migration_user_versions(conn):
+    # Bumped by invalidate_user(); sessions keep the user record only while its version is current
+    conn.execute('ALTER TABLE users ADD COLUMN version INTEGER NOT NULL DEFAULT 0')
+
+def _migration_cache_versions(conn):
+    # When each cached namespace's data last changed (see Response Cache). Triggers keep the
+    # rows current in the same transaction as the change, whichever code path or process makes it.
+    conn.execute('''CREATE TABLE IF NOT EXISTS cache_versions (
+        namespace TEXT PRIMARY KEY,
+        version REAL NOT NULL
+    )''')
+    now = "(julianday('now') - 2440587.5) * 86400.0"
+
+    def bump(namespace):
+        # Strictly increasing, even for two changes within a clock tick
+        return f'''INSERT INTO cache_versions (namespace, version) VALUES ({namespace}, {now})
+                   ON CONFLICT (namespace) DO UPDATE SET version = max(excluded.version, version + 0.001);'''
+    # '' is the version of anything that has not changed since this migration
+    conn.execute(bump("''"))
+    # A new event gets its own row too: a read snapshot taken before it existed must not serve its page
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS events_version_insert AFTER INSERT ON events BEGIN
+        {bump("'event:' || NEW.id")}
+        {bump("'events_list'")}
+    END''')
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS events_version_update AFTER UPDATE ON events BEGIN
+        {bump("'event:' || NEW.id")}
+    END''')
+    # Sales only move tickets_sold, which the listing doesn't show
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS events_version_update_listing
+        AFTER UPDATE OF organizer_id, title, description, location, date_time, price, capacity, category, status
+        ON events BEGIN
+        {bump("'events_list'")}
+    END''')
+    conn.execute(f'''CREATE TRIGGER IF NOT EXISTS events_version_delete AFTER DELETE ON events BEGIN
+        {bump("'event:' || OLD.id")}
+        {bump("'events_list'")}
+    END''')
+
+MIGRATIONS = [
+    (1, 'base schema and default categories', _migration_base_schema),
+    (2, 'indexes for ticket and event hot queries', _migration_hot_query_indexes),
+    (3, 'payment method columns on users', _migration_user_payment_columns),
+    (4, 'full-text search index over events', _migration_events_search_index),
+    (5, 'tickets_sold counter and checkout holds', _migration_ticket_inventory),
+    (6, 'materialized event and user sales stats', _migration_sales_stats),
+    (7, 'organizer analytics rollups', _migration_organizer_rollups),
+    (8, 'background job queue and ticket assets', _migration_background_jobs),
+    (9, 'server-side sessions', _migration_sessions),
+    (10, 'payout ledger and organizer balances', _migration_payout_ledger),
+    (11, 'unique ticket QR codes and door check-ins', _migration_ticket_checkin),
+    (12, 'integer event and purchase times, and the event archive', _migration_event_time_columns),
+    (13, 'user record versions', _migration_user_versions),
+    (14, 'cache versions kept by triggers', _migration_cache_versions),
+]
+
+def schema_version(conn):
+    return conn.execute('PRAGMA user_version').fetchone()[0]
+
+def migrate(conn, target=None):
+    """Apply pending migrations up to target (default: latest), returning the versions applied"""
+    applied = []
+    for version, description, apply in MIGRATIONS:
+        if target is not None and version > target:
+            break
+        if schema_version(conn) >= version:
+            continue
+        # BEGIN IMMEDIATE takes the write lock first so concurrent workers booting
+        # at once apply each migration exactly once
+        conn.execute('BEGIN IMMEDIATE')
         try:
-            conn.execute('INSERT INTO categories (name, description) VALUES (?, ?)', 
-                        (category_name, description))
-        except sqlite3.IntegrityError:
-            pass  # Category already exists
-    
-    conn.commit()
-    conn.close()
+            if schema_version(conn) >= version:
+                conn.rollback()
+                continue
+            apply(conn)
+            conn.execute(f'PRAGMA user_version = {version}')
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        applied.append(version)
+        app.logger.info('Applied migration %s: %s', version, description)
+    return applied
 
-def populate_sample_events():
-    """Populate database with realistic club and bar events"""
+@app.cli.command('migrate')
+@click.option('--seed', is_flag=True, help='Add the sample events if the database has no events yet.')
+def migrate_command(seed):
+    """Apply pending schema migrations (run once per deployment, before starting workers)."""
     conn = get_db()
-    
+    applied = migrate(conn)
+    print(f"Schema at version {schema_version(conn)} (applied: {applied or 'none'})")
+    if seed:
+        print(f"Added {populate_sample_events(conn)} sample events to database")
+
+def populate_sample_events(conn):
+    """Populate database with realistic club and bar events; returns how many were added"""
     # Check if events already exist
     event_count = conn.execute('SELECT COUNT(*) FROM events').fetchone()[0]
     if event_count > 0:
-        conn.close()
-        return
+        return 0
     
     # Create a dummy organizer user if none exists
     user_count = conn.execute('SELECT COUNT(*) FROM users').fetchone()[0]
@@ -108,122 +1054,2387 @@ def populate_sample_events():
         # Use first user as organizer
         organizer_id = conn.execute('SELECT id FROM users LIMIT 1').fetchone()[0]
     
-    # Realistic club/bar events with diverse images
-    sample_events = [
-        {
-            'title': 'Midnight Jazz Sessions',
-            'description': 'Intimate jazz night featuring local musicians. Cocktails and small plates served throughout the evening.',
-            'location': 'Blue Note Lounge, Downtown District',
-            'date_time': '2026-01-15 21:00',
-            'price': 25.00,
-            'capacity': 80,
-            'category': 'Music',
-            'image_url': 'https://images.unsplash.com/photo-1511671782779-c97d3d27a1d4?auto=format&fit=crop&w=800&q=80'
-        },
-        {
-            'title': 'Electro Night Festival',
-            'description': 'All-night electronic dance music festival with top DJs. Open bar until midnight.',
-            'location': 'Club Pulse, Entertainment Quarter',
-            'date_time': '2026-01-18 22:00',
-            'price': 45.00,
-            'capacity': 300,
-            'category': 'Music',
-            'image_url': 'https://images.unsplash.com/photo-1470229722913-7c0e2dbbafd3?auto=format&fit=crop&w=800&q=80'
-        },
-        {
-            'title': 'Craft Beer Tasting',
-            'description': 'Sample 20+ local craft beers with food pairings. Meet the brewers and learn about brewing techniques.',
-            'location': 'Hop House Brewery, Industrial District',
-            'date_time': '2026-01-20 18:30',
-            'price': 35.00,
-            'capacity': 60,
-            'category': 'Food & Drink',
-            'image_url': 'https://images.unsplash.com/photo-1585345242804-9c0f1b4a2c4d?auto=format&fit=crop&w=800&q=80'
-        },
-        {
-            'title': 'Rooftop Sunset Cocktails',
-            'description': 'Elegant rooftop party with signature cocktails and panoramic city views. Dress code: smart casual.',
-            'location': 'Sky Lounge Hotel, Financial District',
-            'date_time': '2026-01-22 17:00',
-            'price': 60.00,
-            'capacity': 120,
-            'category': 'Food & Drink',
-            'image_url': 'https://images.unsplash.com/photo-1552566626-52f8b828add9?auto=format&fit=crop&w=800&q=80'
-        },
-        {
-            'title': 'Live Acoustic Evening',
-            'description': 'Relaxed acoustic performances in an intimate setting. Wine and cheese platters available.',
-            'location': 'The Wooden Spoon, Arts District',
-            'date_time': '2026-01-25 19:30',
-            'price': 20.00,
-            'capacity': 50,
-            'category': 'Music',
-            'image_url': 'https://images.unsplash.com/photo-1470225620780-dba8ba36b745?auto=format&fit=crop&w=800&q=80'
-        },
-        {
-            'title': 'Whiskey Wednesday',
-            'description': 'Premium whiskey tasting with master distiller. Learn about different whiskey varieties and aging processes.',
-            'location': 'The Oak Barrel, Heritage Street',
-            'date_time': '2026-01-29 19:00',
-            'price': 40.00,
-            'capacity': 40,
-            'category': 'Food & Drink',
-            'image_url': 'https://images.unsplash.com/photo-1609833055954-5c1e3dc20973?auto=format&fit=crop&w=800&q=80'
-        },
-        {
-            'title': 'Latin Night Fiesta',
-            'description': 'Vibrant Latin music and dance night. Professional instructors for salsa and bachata lessons.',
-            'location': 'Casa Latina Club, Cultural Quarter',
-            'date_time': '2026-02-01 20:30',
-            'price': 30.00,
-            'capacity': 150,
-            'category': 'Music',
-            'image_url': 'https://images.unsplash.com/photo-1509670811598-834b6d3be3b3?auto=format&fit=crop&w=800&q=80'
-        },
-        {
-            'title': 'Champagne & Caviar Brunch',
-            'description': 'Luxury brunch experience with premium champagne and caviar service. Live piano accompaniment.',
-            'location': 'Grand Royale Hotel, Luxury District',
-            'date_time': '2026-02-05 11:00',
-            'price': 85.00,
-            'capacity': 80,
-            'category': 'Food & Drink',
-            'image_url': 'https://images.unsplash.com/photo-1559847844-d8a8bf309bc8?auto=format&fit=crop&w=800&q=80'
-        }
-    ]
+    # Realistic club/bar events with diverse images
+    sample_events = [
+        {
+            'title': 'Midnight Jazz Sessions',
+            'description': 'Intimate jazz night featuring local musicians. Cocktails and small plates served throughout the evening.',
+            'location': 'Blue Note Lounge, Downtown District',
+            'date_time': '2026-01-15 21:00',
+            'price': 25.00,
+            'capacity': 80,
+            'category': 'Music',
+            'image_url': 'https://images.unsplash.com/photo-1511671782779-c97d3d27a1d4?auto=format&fit=crop&w=800&q=80'
+        },
+        {
+            'title': 'Electro Night Festival',
+            'description': 'All-night electronic dance music festival with top DJs. Open bar until midnight.',
+            'location': 'Club Pulse, Entertainment Quarter',
+            'date_time': '2026-01-18 22:00',
+            'price': 45.00,
+            'capacity': 300,
+            'category': 'Music',
+            'image_url': 'https://images.unsplash.com/photo-1470229722913-7c0e2dbbafd3?auto=format&fit=crop&w=800&q=80'
+        },
+        {
+            'title': 'Craft Beer Tasting',
+            'description': 'Sample 20+ local craft beers with food pairings. Meet the brewers and learn about brewing techniques.',
+            'location': 'Hop House Brewery, Industrial District',
+            'date_time': '2026-01-20 18:30',
+            'price': 35.00,
+            'capacity': 60,
+            'category': 'Food & Drink',
+            'image_url': 'https://images.unsplash.com/photo-1585345242804-9c0f1b4a2c4d?auto=format&fit=crop&w=800&q=80'
+        },
+        {
+            'title': 'Rooftop Sunset Cocktails',
+            'description': 'Elegant rooftop party with signature cocktails and panoramic city views. Dress code: smart casual.',
+            'location': 'Sky Lounge Hotel, Financial District',
+            'date_time': '2026-01-22 17:00',
+            'price': 60.00,
+            'capacity': 120,
+            'category': 'Food & Drink',
+            'image_url': 'https://images.unsplash.com/photo-1552566626-52f8b828add9?auto=format&fit=crop&w=800&q=80'
+        },
+        {
+            'title': 'Live Acoustic Evening',
+            'description': 'Relaxed acoustic performances in an intimate setting. Wine and cheese platters available.',
+            'location': 'The Wooden Spoon, Arts District',
+            'date_time': '2026-01-25 19:30',
+            'price': 20.00,
+            'capacity': 50,
+            'category': 'Music',
+            'image_url': 'https://images.unsplash.com/photo-1470225620780-dba8ba36b745?auto=format&fit=crop&w=800&q=80'
+        },
+        {
+            'title': 'Whiskey Wednesday',
+            'description': 'Premium whiskey tasting with master distiller. Learn about different whiskey varieties and aging processes.',
+            'location': 'The Oak Barrel, Heritage Street',
+            'date_time': '2026-01-29 19:00',
+            'price': 40.00,
+            'capacity': 40,
+            'category': 'Food & Drink',
+            'image_url': 'https://images.unsplash.com/photo-1609833055954-5c1e3dc20973?auto=format&fit=crop&w=800&q=80'
+        },
+        {
+            'title': 'Latin Night Fiesta',
+            'description': 'Vibrant Latin music and dance night. Professional instructors for salsa and bachata lessons.',
+            'location': 'Casa Latina Club, Cultural Quarter',
+            'date_time': '2026-02-01 20:30',
+            'price': 30.00,
+            'capacity': 150,
+            'category': 'Music',
+            'image_url': 'https://images.unsplash.com/photo-1509670811598-834b6d3be3b3?auto=format&fit=crop&w=800&q=80'
+        },
+        {
+            'title': 'Champagne & Caviar Brunch',
+            'description': 'Luxury brunch experience with premium champagne and caviar service. Live piano accompaniment.',
+            'location': 'Grand Royale Hotel, Luxury District',
+            'date_time': '2026-02-05 11:00',
+            'price': 85.00,
+            'capacity': 80,
+            'category': 'Food & Drink',
+            'image_url': 'https://images.unsplash.com/photo-1559847844-d8a8bf309bc8?auto=format&fit=crop&w=800&q=80'
+        }
+    ]
+    
+    # Keep the samples' spacing but start them tomorrow, so they are always upcoming
+    shift = datetime.now().date() + timedelta(days=1) - parse_event_time(sample_events[0]['date_time']).date()
+    for event in sample_events:
+        event['date_time'] = (parse_event_time(event['date_time']) + shift).strftime(EVENT_TIME_FORMAT)
+    
+    conn.commit()
+    # Same validated, chunked path as organizer bulk imports
+    result = import_events(conn, organizer_id, enumerate(sample_events, 1))
+    return result['imported']
+
+# --- Event Times ---
+# date_time and purchase_date are local wall-clock text without a zone. Their
+# integer twins (events.starts_at, tickets.purchased_at) are seconds since
+# 1970-01-01 00:00 on that same wall clock, which is what SQLite's strftime('%s')
+# yields for zoneless text. Compare them with wall_clock_epoch(), never time.time().
+EVENT_TIME_FORMAT = '%Y-%m-%d %H:%M'
+EVENT_TIME_INPUT_FORMATS = (EVENT_TIME_FORMAT, '%Y-%m-%dT%H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S')
+
+def parse_event_time(text):
+    """datetime from 'YYYY-MM-DD HH:MM' (a T separator and seconds are accepted too); raises ValueError"""
+    for fmt in EVENT_TIME_INPUT_FORMATS:
+        try:
+            return datetime.strptime(text, fmt)
+        except ValueError:
+            continue
+    raise ValueError(f'date_time {text!r} is not YYYY-MM-DD HH:MM')
+
+def wall_clock_epoch(moment=None):
+    """A naive local datetime (default: now, to the minute) on the starts_at / purchased_at scale"""
+    moment = moment or datetime.now().replace(second=0, microsecond=0)
+    return int(moment.replace(tzinfo=timezone.utc).timestamp())
+
+# --- Pagination ---
+# Listing routes use keyset (cursor) pagination: each page seeks past the last
+# (sort key, id) it returned, so page N costs the same as page 1.
+PAGE_SIZE = 24
+MAX_PAGE_SIZE = 100
+DASHBOARD_EVENTS = 4
+DASHBOARD_TICKETS = 4
+DASHBOARD_ORG_EVENTS = 3
+
+def page_size():
+    """Page size requested via ?per_page=, clamped to 1..MAX_PAGE_SIZE"""
+    try:
+        size = int(request.args.get('per_page', PAGE_SIZE))
+    except ValueError:
+        size = PAGE_SIZE
+    return max(1, min(size, MAX_PAGE_SIZE))
+
+def encode_cursor(sort_key, row_id):
+    raw = json.dumps([sort_key, row_id], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """Return (sort_key, id) from an opaque cursor, or None if it is missing or malformed"""
+    if not cursor:
+        return None
+    try:
+        sort_key, row_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(row_id, int) or not isinstance(sort_key, (str, int, float)):
+        return None
+    return sort_key, row_id
+
+def paginate(rows, size, sort_column):
+    """Trim a LIMIT size + 1 result to one page and build the cursor for the next one"""
+    if len(rows) <= size:
+        return rows, None
+    rows = rows[:size]
+    return rows, encode_cursor(rows[-1][sort_column], rows[-1]['id'])
+
+# --- Ticket Purchases ---
+# Every seat-changing operation runs inside one short BEGIN IMMEDIATE transaction
+# that re-checks availability (capacity - tickets_sold - live holds), so concurrent
+# buyers can never oversell an event. Work that doesn't need the lock happens first.
+HOLD_SECONDS = 10 * 60
+MAX_TICKETS_PER_ORDER = 10
+
+class PurchaseError(Exception):
+    """A hold or purchase was refused; the message is safe to show to the buyer"""
+
+def generate_qr_code(user_id, event_id):
+    # The code alone admits its holder at the door (see Door Check-in), so it must not be guessable
+    return f"EVENTLINK-TICKET-{uuid.uuid4().hex[:16]}-{user_id}-{event_id}"
+
+def parse_quantity(value):
+    """Ticket quantity from a form or query value, clamped to 1..MAX_TICKETS_PER_ORDER"""
+    try:
+        quantity = int(value or 1)
+    except (TypeError, ValueError):
+        quantity = 1
+    return max(1, min(quantity, MAX_TICKETS_PER_ORDER))
+
+def _event_for_sale(conn, event_id):
+    event = conn.execute('SELECT id, organizer_id, category, capacity, tickets_sold, status, price FROM events WHERE id = ?',
+                         (event_id,)).fetchone()
+    if event is None or event['status'] != 'active':
+        raise PurchaseError('This event is not on sale')
+    return event
+
+def _seats_available(conn, event, now):
+    """Seats not yet sold or held, or None when the event has no capacity limit"""
+    if not event['capacity']:
+        return None
+    held = conn.execute('SELECT COALESCE(SUM(quantity), 0) FROM ticket_holds WHERE event_id = ? AND expires_at > ?',
+                        (event['id'], now)).fetchone()[0]
+    return event['capacity'] - event['tickets_sold'] - held
+
+def _check_seats(conn, event, quantity, now):
+    available = _seats_available(conn, event, now)
+    if available is not None and available < quantity:
+        if available <= 0:
+            raise PurchaseError('Sorry, this event is sold out')
+        raise PurchaseError(f'Sorry, only {available} tickets are left for this event')
+
+def place_hold(conn, event_id, user_id, quantity=1, seconds=HOLD_SECONDS):
+    """Reserve seats for a buyer during checkout; purchase_tickets() converts the hold"""
+    now = time.time()
+    with write_transaction(conn):
+        event = _event_for_sale(conn, event_id)
+        # One hold per buyer per event: re-opening checkout replaces the old one.
+        # Expired holds for the event are swept in the same statement.
+        conn.execute('DELETE FROM ticket_holds WHERE event_id = ? AND (user_id = ? OR expires_at <= ?)',
+                     (event_id, user_id, now))
+        _check_seats(conn, event, quantity, now)
+        cursor = conn.execute('INSERT INTO ticket_holds (event_id, user_id, quantity, expires_at) VALUES (?, ?, ?, ?)',
+                              (event_id, user_id, quantity, now + seconds))
+    return cursor.lastrowid
+
+def _sell(conn, event_id, user_id, quantity, qr_code, purchase_date, now):
+    """Sell the seats inside an open write transaction; returns the new ticket's (id, qr_code)"""
+    event = _event_for_sale(conn, event_id)
+    # Releasing the buyer's own hold first hands its seats straight back to them:
+    # nobody else could take them in between because we hold the write lock
+    conn.execute('DELETE FROM ticket_holds WHERE event_id = ? AND user_id = ?', (event_id, user_id))
+    _check_seats(conn, event, quantity, now)
+    cursor = conn.execute('''INSERT INTO tickets (user_id, event_id, purchase_date, quantity, unit_price, qr_code)
+                             VALUES (?, ?, ?, ?, ?, ?)''',
+                          (user_id, event_id, purchase_date, quantity, event['price'], qr_code))
+    record_sale(conn, event, user_id, quantity, event['price'], purchase_date)
+    post_sale(conn, event['organizer_id'], cursor.lastrowid, quantity * event['price'], purchase_date)
+    # QR rendering and the receipt e-mail run after commit, off the request path
+    job_queue.enqueue(conn, 'issue_ticket', {'ticket_id': cursor.lastrowid})
+    return cursor.lastrowid, qr_code
+
+def purchase_tickets(conn, event_id, user_id, quantity=1):
+    """Atomically sell quantity seats to a buyer, converting their checkout hold if they have one.
+
+    Returns the new ticket's (id, qr_code); raises PurchaseError if the seats are gone.
+    """
+    qr_code = generate_qr_code(user_id, event_id)
+    purchase_date = datetime.now().strftime("%Y-%m-%d %H:%M")
+    with write_transaction(conn):
+        ticket = _sell(conn, event_id, user_id, quantity, qr_code, purchase_date, time.time())
+    publish_availability(conn, [event_id])
+    return ticket
+
+# Group commit: in an on-sale spike every buyer otherwise queues for the write
+# lock to run a transaction of their own. With PURCHASE_BATCH_SIZE above 1,
+# request threads hand purchases to one writer thread per process instead. It
+# takes up to PURCHASE_BATCH_SIZE queued purchases, runs each under its own
+# SAVEPOINT in one transaction, and answers every caller only after the COMMIT;
+# a refused purchase rolls back to its savepoint alone. By default a batch is
+# whatever queued up while the previous one committed, so a lone buyer never
+# waits; PURCHASE_BATCH_LATENCY_MS lets the writer hold a batch open for more.
+# A caller waits at most PURCHASE_TIMEOUT seconds for its batch to commit.
+PURCHASE_BATCH_SIZE = int(os.environ.get('EVENTLINK_PURCHASE_BATCH_SIZE', 64))
+PURCHASE_BATCH_LATENCY_MS = float(os.environ.get('EVENTLINK_PURCHASE_BATCH_LATENCY_MS', 0))
+PURCHASE_TIMEOUT = float(os.environ.get('EVENTLINK_PURCHASE_TIMEOUT', 30))
+
+class PurchaseBatcher:
+    """Single writer thread that commits concurrent purchases together"""
+
+    def __init__(self, pool, batch_size=PURCHASE_BATCH_SIZE, latency_ms=PURCHASE_BATCH_LATENCY_MS,
+                 timeout=PURCHASE_TIMEOUT):
+        self.pool = pool
+        self.batch_size = batch_size
+        self.latency = latency_ms / 1000
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._queue = None
+        self._pid = None
+        self.stats = {'batches': 0, 'purchases': 0, 'refused': 0, 'failed_batches': 0, 'largest_batch': 0,
+                      'timeouts': 0}
+
+    def purchase(self, event_id, user_id, quantity=1):
+        """Queue a purchase and wait for the commit of its batch; same result and errors as purchase_tickets()"""
+        self._start()
+        done = Future()
+        self._queue.put((event_id, user_id, quantity, generate_qr_code(user_id, event_id),
+                         datetime.now().strftime("%Y-%m-%d %H:%M"), done))
+        try:
+            return done.result(self.timeout)
+        except FuturesTimeout:
+            # Still queued or committing, so it may yet go through: don't invite a second purchase
+            self.stats['timeouts'] += 1
+            raise PurchaseError('Your purchase is taking longer than usual. '
+                                'Check My Tickets before trying again.') from None
+
+    def _start(self):
+        # Threads don't survive a fork, so each worker process starts its own writer
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._queue = queue.Queue()
+            threading.Thread(target=self._run, args=(self._queue,), name='purchase-writer', daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self, pending):
+        conn = None
+        while True:
+            batch = [pending.get()]
+            deadline = time.monotonic() + self.latency
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(pending.get(timeout=max(0, deadline - time.monotonic())))
+                except queue.Empty:
+                    break
+            # Nothing may end this thread: every later purchase() would wait on it in vain
+            try:
+                if conn is None:
+                    # A dedicated connection: the writer must never wait on the request pool
+                    conn = self.pool._connect()
+                self._commit(conn, batch)
+            except Exception as e:
+                app.logger.exception('Purchase writer failed on a batch of %s', len(batch))
+                for *_, done in batch:
+                    if not done.done():
+                        done.set_exception(e)
+                if conn is not None:
+                    try:
+                        conn.rollback()
+                    except sqlite3.Error:
+                        conn = None  # reopened for the next batch
+
+    def _commit(self, conn, batch):
+        now = time.time()
+        sold = []
+        try:
+            with write_transaction(conn):
+                for event_id, user_id, quantity, qr_code, purchase_date, done in batch:
+                    conn.execute('SAVEPOINT purchase')
+                    try:
+                        sold.append((event_id, done, _sell(conn, event_id, user_id, quantity, qr_code, purchase_date, now)))
+                    except Exception as e:
+                        conn.execute('ROLLBACK TO purchase')
+                        self.stats['refused'] += 1
+                        done.set_exception(e)
+                    conn.execute('RELEASE purchase')
+        except Exception as e:
+            # The transaction never committed: nothing in the batch was sold
+            app.logger.exception('Purchase batch of %s failed', len(batch))
+            self.stats['failed_batches'] += 1
+            for *_, done in batch:
+                if not done.done():
+                    done.set_exception(e)
+            return
+        self.stats['batches'] += 1
+        self.stats['purchases'] += len(sold)
+        self.stats['largest_batch'] = max(self.stats['largest_batch'], len(batch))
+        for event_id, done, ticket in sold:
+            done.set_result(ticket)
+        try:
+            publish_availability(conn, [event_id for event_id, _, _ in sold])
+        except Exception:
+            # The seats are sold either way; watchers catch up on the next change
+            app.logger.exception('Publishing availability after a purchase batch failed')
+
+    def snapshot(self):
+        return dict(self.stats, batch_size=self.batch_size, latency_ms=self.latency * 1000,
+                    queued=self._queue.qsize() if self._queue is not None else 0)
+
+purchase_batcher = PurchaseBatcher(db_pool) if PURCHASE_BATCH_SIZE > 1 else None
+
+def buy_tickets(event_id, user_id, quantity=1):
+    """purchase_tickets() for request handlers, through the group-commit writer when batching is on"""
+    if purchase_batcher is None:
+        return purchase_tickets(get_db(), event_id, user_id, quantity)
+    return purchase_batcher.purchase(event_id, user_id, quantity)
+
+# --- Sales Stats ---
+# Counters read by event_detail, payments, profile and the organizer dashboard.
+# They are updated in the purchase transaction, so pages never aggregate the
+# tickets table; `flask reconcile-stats` checks them against it.
+UNCATEGORIZED = 'Uncategorized'
+
+def record_sale(conn, event, user_id, quantity, unit_price, sold_at):
+    """Apply one order to the sales counters and rollups; call inside the purchase transaction.
+
+    event must carry id, organizer_id and category. Category rollups keep the
+    category the event had when the sale happened.
+    """
+    event_id = event['id']
+    amount = quantity * unit_price
+    conn.execute('UPDATE events SET tickets_sold = tickets_sold + ? WHERE id = ?', (quantity, event_id))
+    conn.execute('''INSERT INTO event_stats (event_id, orders, gross_revenue, last_sale_at) VALUES (?, 1, ?, ?)
+                    ON CONFLICT (event_id) DO UPDATE SET orders = orders + 1,
+                        gross_revenue = gross_revenue + excluded.gross_revenue,
+                        last_sale_at = excluded.last_sale_at''', (event_id, amount, sold_at))
+    conn.execute('''INSERT INTO user_stats (user_id, orders, tickets, total_spent) VALUES (?, 1, ?, ?)
+                    ON CONFLICT (user_id) DO UPDATE SET orders = orders + 1,
+                        tickets = tickets + excluded.tickets,
+                        total_spent = total_spent + excluded.total_spent''', (user_id, quantity, amount))
+    conn.execute('''INSERT INTO organizer_stats (organizer_id, orders, tickets, gross_revenue) VALUES (?, 1, ?, ?)
+                    ON CONFLICT (organizer_id) DO UPDATE SET orders = orders + 1,
+                        tickets = tickets + excluded.tickets,
+                        gross_revenue = gross_revenue + excluded.gross_revenue''',
+                 (event['organizer_id'], quantity, amount))
+    conn.execute('''INSERT INTO organizer_daily_sales (organizer_id, day, orders, tickets, gross_revenue) VALUES (?, ?, 1, ?, ?)
+                    ON CONFLICT (organizer_id, day) DO UPDATE SET orders = orders + 1,
+                        tickets = tickets + excluded.tickets,
+                        gross_revenue = gross_revenue + excluded.gross_revenue''',
+                 (event['organizer_id'], sold_at[:10], quantity, amount))
+    conn.execute('''INSERT INTO organizer_category_sales (organizer_id, category, orders, tickets, gross_revenue) VALUES (?, ?, 1, ?, ?)
+                    ON CONFLICT (organizer_id, category) DO UPDATE SET orders = orders + 1,
+                        tickets = tickets + excluded.tickets,
+                        gross_revenue = gross_revenue + excluded.gross_revenue''',
+                 (event['organizer_id'], event['category'] or UNCATEGORIZED, quantity, amount))
+
+def rebuild_sales_stats(conn):
+    """Recompute every counter from the tickets tables and post unledgered sales (run inside a transaction)"""
+    _rebuild_event_user_stats(conn)
+    _rebuild_organizer_rollups(conn)
+    post_missing_sales(conn)
+
+def _rebuild_event_user_stats(conn):
+    conn.execute('''UPDATE events SET tickets_sold = (
+        SELECT COALESCE(SUM(quantity), 0) FROM tickets WHERE tickets.event_id = events.id
+    )''')
+    conn.execute('DELETE FROM event_stats')
+    conn.execute('''INSERT INTO event_stats (event_id, orders, gross_revenue, last_sale_at)
+                    SELECT event_id, COUNT(*), COALESCE(SUM(quantity * unit_price), 0), MAX(purchase_date)
+                    FROM tickets GROUP BY event_id''')
+    conn.execute('DELETE FROM user_stats')
+    conn.execute(f'''INSERT INTO user_stats (user_id, orders, tickets, total_spent)
+                     SELECT user_id, COUNT(*), COALESCE(SUM(quantity), 0), COALESCE(SUM(quantity * unit_price), 0)
+                     FROM ({_all_sales(conn)}) GROUP BY user_id''')
+
+def _all_sales(conn):
+    """SELECT over every sale, live and archived: user_id, organizer_id, category, purchase_date, quantity, unit_price.
+
+    organizer_id is NULL for tickets whose event was deleted.
+    """
+    live = '''SELECT t.user_id, e.organizer_id, e.category, t.purchase_date, t.quantity, t.unit_price
+              FROM tickets t LEFT JOIN events e ON t.event_id = e.id'''
+    if conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'tickets_archive'").fetchone() is None:
+        return live  # migrations before 12 rebuild stats too
+    return live + '''
+              UNION ALL
+              SELECT t.user_id, e.organizer_id, e.category, t.purchase_date, t.quantity, t.unit_price
+              FROM tickets_archive t LEFT JOIN events_archive e ON t.event_id = e.id'''
+
+def _rebuild_organizer_rollups(conn):
+    # Rebuilt category rollups use each event's current category
+    all_sales = _all_sales(conn)
+    def sales(key):
+        return f'''SELECT organizer_id, {key} as bucket, COUNT(*) as orders, COALESCE(SUM(quantity), 0) as tickets,
+                          COALESCE(SUM(quantity * unit_price), 0) as gross
+                   FROM ({all_sales}) WHERE organizer_id IS NOT NULL GROUP BY organizer_id, bucket'''
+    conn.execute('DELETE FROM organizer_stats')
+    conn.execute('INSERT INTO organizer_stats (organizer_id, orders, tickets, gross_revenue) '
+                 'SELECT organizer_id, orders, tickets, gross FROM (' + sales('NULL') + ')')
+    conn.execute('DELETE FROM organizer_daily_sales')
+    conn.execute('INSERT INTO organizer_daily_sales (organizer_id, day, orders, tickets, gross_revenue) '
+                 'SELECT organizer_id, bucket, orders, tickets, gross FROM (' + sales('substr(purchase_date, 1, 10)') + ')')
+    conn.execute('DELETE FROM organizer_category_sales')
+    conn.execute('INSERT INTO organizer_category_sales (organizer_id, category, orders, tickets, gross_revenue) '
+                 'SELECT organizer_id, bucket, orders, tickets, gross FROM (' + sales(f"COALESCE(NULLIF(category, ''), '{UNCATEGORIZED}')") + ')')
+
+def find_stats_drift(conn):
+    """Compare the counters with the tickets tables and return a list of mismatch descriptions"""
+    drift = []
+    rows = conn.execute('''
+        SELECT e.id, e.tickets_sold, COALESCE(s.orders, 0) as orders, COALESCE(s.gross_revenue, 0) as gross,
+               COALESCE(t.seats, 0) as actual_seats, COALESCE(t.orders, 0) as actual_orders,
+               COALESCE(t.gross, 0) as actual_gross
+        FROM events e
+        LEFT JOIN event_stats s ON s.event_id = e.id
+        LEFT JOIN (SELECT event_id, SUM(quantity) as seats, COUNT(*) as orders, SUM(quantity * unit_price) as gross
+                   FROM tickets GROUP BY event_id) t ON t.event_id = e.id
+        WHERE e.tickets_sold != COALESCE(t.seats, 0) OR COALESCE(s.orders, 0) != COALESCE(t.orders, 0)
+           OR ABS(COALESCE(s.gross_revenue, 0) - COALESCE(t.gross, 0)) > 0.005
+    ''')
+    for row in rows:
+        drift.append(f"event {row['id']}: seats {row['tickets_sold']} vs {row['actual_seats']}, "
+                     f"orders {row['orders']} vs {row['actual_orders']}, gross {row['gross']:.2f} vs {row['actual_gross']:.2f}")
+    rows = conn.execute(f'''
+        SELECT t.user_id, COALESCE(s.tickets, 0) as tickets, COALESCE(s.total_spent, 0) as spent,
+               t.seats as actual_tickets, t.spent as actual_spent
+        FROM (SELECT user_id, SUM(quantity) as seats, COALESCE(SUM(quantity * unit_price), 0) as spent
+              FROM ({_all_sales(conn)}) GROUP BY user_id) t
+        LEFT JOIN user_stats s ON s.user_id = t.user_id
+        WHERE COALESCE(s.tickets, 0) != t.seats OR ABS(COALESCE(s.total_spent, 0) - t.spent) > 0.005
+    ''')
+    for row in rows:
+        drift.append(f"user {row['user_id']}: tickets {row['tickets']} vs {row['actual_tickets']}, "
+                     f"spent {row['spent']:.2f} vs {row['actual_spent']:.2f}")
+    rows = conn.execute(f'''
+        SELECT t.organizer_id, COALESCE(s.tickets, 0) as tickets, COALESCE(s.gross_revenue, 0) as gross,
+               t.seats as actual_tickets, t.gross as actual_gross
+        FROM (SELECT organizer_id, SUM(quantity) as seats, COALESCE(SUM(quantity * unit_price), 0) as gross
+              FROM ({_all_sales(conn)}) WHERE organizer_id IS NOT NULL GROUP BY organizer_id) t
+        LEFT JOIN organizer_stats s ON s.organizer_id = t.organizer_id
+        WHERE COALESCE(s.tickets, 0) != t.seats OR ABS(COALESCE(s.gross_revenue, 0) - t.gross) > 0.005
+    ''')
+    for row in rows:
+        drift.append(f"organizer {row['organizer_id']}: tickets {row['tickets']} vs {row['actual_tickets']}, "
+                     f"gross {row['gross']:.2f} vs {row['actual_gross']:.2f}")
+    unposted = conn.execute('''SELECT COUNT(*) FROM tickets t JOIN events e ON e.id = t.event_id
+                               WHERE NOT EXISTS (SELECT 1 FROM ledger_entries l WHERE l.ticket_id = t.id)''').fetchone()[0]
+    if unposted:
+        drift.append(f"ledger: {unposted} tickets have no sale entry")
+    rows = conn.execute('''
+        SELECT l.organizer_id, COALESCE(b.available, 0) as available, l.total as actual
+        FROM (SELECT organizer_id, SUM(amount) as total FROM ledger_entries GROUP BY organizer_id) l
+        LEFT JOIN organizer_balances b ON b.organizer_id = l.organizer_id
+        WHERE ABS(COALESCE(b.available, 0) - l.total) > 0.005
+    ''')
+    for row in rows:
+        drift.append(f"balance {row['organizer_id']}: available {row['available']:.2f} vs ledger {row['actual']:.2f}")
+    return drift
+
+ANALYTICS_DAYS = 30
+
+def organizer_analytics(conn, organizer_id, days=ANALYTICS_DAYS):
+    """Dashboard figures for one organizer, read from the rollup tables only"""
+    totals = conn.execute('SELECT orders, tickets, gross_revenue FROM organizer_stats WHERE organizer_id = ?',
+                          (organizer_id,)).fetchone()
+    today = datetime.now().date()
+    first_day = today - timedelta(days=days - 1)
+    by_day = {row['day']: row for row in conn.execute(
+        'SELECT day, tickets, gross_revenue FROM organizer_daily_sales WHERE organizer_id = ? AND day >= ?',
+        (organizer_id, first_day.isoformat()))}
+    # One bucket per day, including days without sales
+    sales_over_time = []
+    for offset in range(days):
+        day = (first_day + timedelta(days=offset)).isoformat()
+        row = by_day.get(day)
+        sales_over_time.append({'day': day, 'tickets': row['tickets'] if row else 0,
+                                'revenue': row['gross_revenue'] if row else 0.0})
+    categories = conn.execute('''SELECT category, orders, tickets, gross_revenue FROM organizer_category_sales
+                                 WHERE organizer_id = ? ORDER BY gross_revenue DESC''', (organizer_id,)).fetchall()
+    return {
+        'revenue': totals['gross_revenue'] if totals else 0.0,
+        'attendees': totals['tickets'] if totals else 0,
+        'orders': totals['orders'] if totals else 0,
+        'recent_revenue': sum(bucket['revenue'] for bucket in sales_over_time),
+        'recent_attendees': sum(bucket['tickets'] for bucket in sales_over_time),
+        'peak_day_revenue': max(bucket['revenue'] for bucket in sales_over_time),
+        'sales_over_time': sales_over_time,
+        'categories': categories,
+    }
+
+@app.cli.command('reconcile-stats')
+@click.option('--fix', is_flag=True, help='Rebuild the counters from the tickets table if they drifted.')
+def reconcile_stats_command(fix):
+    """Verify the materialized sales counters against the tickets table."""
+    conn = get_db()
+    drift = find_stats_drift(conn)
+    for line in drift:
+        print(line)
+    if drift and fix:
+        with write_transaction(conn):
+            rebuild_sales_stats(conn)
+        print(f"Rebuilt sales stats ({len(drift)} mismatches fixed)")
+    elif drift:
+        raise SystemExit(1)
+    else:
+        print("Sales stats match the tickets table")
+
+# --- Background Jobs ---
+# Work that can wait until after the response (QR images, receipt e-mails) is
+# queued in the jobs table by the transaction that needs it, so a job exists
+# exactly when its data has committed. Worker threads claim jobs atomically,
+# so web workers and `flask run-jobs` processes can all share one queue.
+# Finished jobs are deleted; jobs that keep failing stay behind as 'failed'.
+JOB_WORKERS = int(os.environ.get('EVENTLINK_JOB_WORKERS', 2))
+JOB_POLL_SECONDS = float(os.environ.get('EVENTLINK_JOB_POLL_SECONDS', 1.0))
+JOB_LEASE_SECONDS = 5 * 60
+JOB_MAX_ATTEMPTS = 5
+EMAIL_DELAY = float(os.environ.get('EVENTLINK_EMAIL_DELAY', 0.2))
+
+JOB_HANDLERS = {}
+
+def job_handler(kind):
+    """Register fn(conn, payload) as the handler for a job kind"""
+    def register(fn):
+        JOB_HANDLERS[kind] = fn
+        return fn
+    return register
+
+class JobQueue:
+    """SQLite-backed job queue with a lazily started pool of worker threads"""
+
+    def __init__(self, pool, workers=JOB_WORKERS, poll=JOB_POLL_SECONDS):
+        self.pool = pool
+        self.workers = workers
+        self.poll = poll
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._threads = []
+        self._pid = None
+        self.stats = {'done': 0, 'retried': 0, 'failed': 0}
+
+    def enqueue(self, conn, kind, payload, delay=0):
+        """Queue a job in conn's open transaction; workers see it once that commits"""
+        conn.execute('INSERT INTO jobs (kind, payload, run_after, created_at) VALUES (?, ?, ?, ?)',
+                     (kind, json.dumps(payload, sort_keys=True), time.time() + delay, datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        self._wakeup.set()
+
+    def start(self):
+        """Start this process's worker threads; a no-op when already running or workers is 0"""
+        if self.workers <= 0 or self._pid == os.getpid():
+            return
+        with self._lock:
+            # Threads don't survive a fork, so each worker process starts its own
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._stop.clear()
+            self._threads = [threading.Thread(target=self._work, name=f'job-worker-{i}', daemon=True)
+                             for i in range(self.workers)]
+            for thread in self._threads:
+                thread.start()
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._pid = None
+
+    def claim(self, conn):
+        """Take the next due job, or one whose worker died mid-run, leasing it to the caller"""
+        now = time.time()
+        # Every worker thread polls, so only take the write lock when there is a job to claim
+        if conn.execute("SELECT 1 FROM jobs WHERE status != 'failed' AND run_after <= ? LIMIT 1",
+                        (now,)).fetchone() is None:
+            return None
+        with write_transaction(conn):
+            return conn.execute('''UPDATE jobs SET status = 'running', attempts = attempts + 1, run_after = ?
+                                   WHERE id = (SELECT id FROM jobs WHERE status != 'failed' AND run_after <= ?
+                                               ORDER BY run_after LIMIT 1)
+                                   RETURNING id, kind, payload, attempts''',
+                                (now + JOB_LEASE_SECONDS, now)).fetchone()
+
+    def run_one(self, conn):
+        """Claim and run one job; returns False when nothing is due"""
+        job = self.claim(conn)
+        if job is None:
+            return False
+        try:
+            JOB_HANDLERS[job['kind']](conn, json.loads(job['payload']))
+        except Exception as e:
+            if conn.in_transaction:
+                conn.rollback()
+            app.logger.exception('Job %s (%s) failed on attempt %s', job['id'], job['kind'], job['attempts'])
+            with write_transaction(conn):
+                if job['attempts'] >= JOB_MAX_ATTEMPTS:
+                    conn.execute("UPDATE jobs SET status = 'failed', last_error = ? WHERE id = ?", (repr(e), job['id']))
+                    self.stats['failed'] += 1
+                else:
+                    conn.execute("UPDATE jobs SET status = 'queued', run_after = ?, last_error = ? WHERE id = ?",
+                                 (time.time() + 2 ** job['attempts'], repr(e), job['id']))
+                    self.stats['retried'] += 1
+        else:
+            conn.execute('DELETE FROM jobs WHERE id = ?', (job['id'],))
+            conn.commit()
+            self.stats['done'] += 1
+        return True
+
+    def drain(self):
+        """Run due jobs on the calling thread until none are left; returns how many ran"""
+        ran = 0
+        with self.pool.connection() as conn:
+            while self.run_one(conn):
+                ran += 1
+        return ran
+
+    def _work(self):
+        while not self._stop.is_set():
+            try:
+                # A connection is only borrowed while there is work, so idle
+                # workers don't hold pool slots that requests need
+                with self.pool.connection() as conn:
+                    while not self._stop.is_set() and self.run_one(conn):
+                        pass
+            except sqlite3.Error:
+                app.logger.exception('Job worker %s hit a database error', threading.current_thread().name)
+            self._wakeup.wait(self.poll)
+            self._wakeup.clear()
+
+    def snapshot(self, conn):
+        counts = dict(conn.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+        return dict(self.stats, queued=counts.get('queued', 0), running=counts.get('running', 0),
+                    failed_jobs=counts.get('failed', 0), workers=len(self._threads) if self._pid == os.getpid() else 0)
+
+job_queue = JobQueue(db_pool)
+
+@app.before_request
+def start_job_workers():
+    # Web workers process jobs too; started on the first request so the CLI doesn't
+    job_queue.start()
+
+def render_qr_svg(data):
+    """SVG QR code for a ticket; without the optional qrcode package, a plain badge showing the code"""
+    if qrcode is not None:
+        return qrcode.make(data, image_factory=qrcode.image.svg.SvgPathImage).to_string(encoding='unicode')
+    label = html.escape(data.split('-')[2][:6])
+    return ('<svg xmlns="http://www.w3.org/2000/svg" width="100" height="100" viewBox="0 0 100 100">'
+            '<rect width="100" height="100" fill="#212529"/>'
+            '<text x="50" y="46" fill="#fff" font-size="10" text-anchor="middle">QR CODE</text>'
+            f'<text x="50" y="60" fill="#fff" font-size="10" text-anchor="middle">{label}</text></svg>')
+
+def send_receipt(ticket):
+    """Stand-in for the e-mail provider: waits like an SMTP round trip and logs the receipt"""
+    time.sleep(EMAIL_DELAY)
+    app.logger.info('Receipt for ticket %s (%s x %s) sent to %s',
+                    ticket['id'], ticket['quantity'], ticket['title'], ticket['email'])
+
+@job_handler('issue_ticket')
+def issue_ticket(conn, payload):
+    """Render a new ticket's QR image and e-mail the receipt; safe to re-run after a failure"""
+    ticket = conn.execute('''SELECT t.id, t.qr_code, t.quantity, e.title, u.email
+                             FROM tickets t
+                             JOIN events e ON e.id = t.event_id
+                             JOIN users u ON u.id = t.user_id
+                             WHERE t.id = ?''', (payload['ticket_id'],)).fetchone()
+    if ticket is None:
+        return  # the event was deleted in the meantime
+    asset = conn.execute('SELECT delivered_at FROM ticket_assets WHERE ticket_id = ?', (ticket['id'],)).fetchone()
+    if asset is None:
+        conn.execute('INSERT INTO ticket_assets (ticket_id, qr_svg, created_at) VALUES (?, ?, ?)',
+                     (ticket['id'], render_qr_svg(ticket['qr_code']), datetime.now().strftime('%Y-%m-%d %H:%M:%S')))
+        conn.commit()
+    if asset is None or asset['delivered_at'] is None:
+        send_receipt(ticket)
+        conn.execute('UPDATE ticket_assets SET delivered_at = ? WHERE ticket_id = ?',
+                     (datetime.now().strftime('%Y-%m-%d %H:%M:%S'), ticket['id']))
+        conn.commit()
+
+@app.cli.command('run-jobs')
+@click.option('--workers', type=int, default=JOB_WORKERS, help='Worker threads.')
+@click.option('--once', is_flag=True, help='Run the jobs that are due, then exit.')
+def run_jobs_command(workers, once):
+    """Process background jobs in the foreground."""
+    if once:
+        click.echo(f'Ran {job_queue.drain()} jobs.')
+        return
+    job_queue.workers = workers
+    job_queue.start()
+    click.echo(f'Running {workers} job workers; Ctrl+C to stop.')
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        job_queue.stop()
+
+@app.cli.command('issue-missing-tickets')
+def issue_missing_tickets_command():
+    """Queue QR rendering for tickets that have no stored QR image yet."""
+    conn = get_db()
+    with write_transaction(conn):
+        missing = conn.execute('''SELECT t.id FROM tickets t
+                                  JOIN events e ON e.id = t.event_id
+                                  JOIN users u ON u.id = t.user_id
+                                  WHERE NOT EXISTS (SELECT 1 FROM ticket_assets a WHERE a.ticket_id = t.id)''').fetchall()
+        for row in missing:
+            job_queue.enqueue(conn, 'issue_ticket', {'ticket_id': row['id']})
+    click.echo(f'Queued {len(missing)} tickets; run `flask run-jobs` to process them.')
+
+# --- Payout Ledger ---
+# Every sale, platform fee and payout is an append-only row in ledger_entries
+# carrying the organizer's balance after it. organizer_balances holds the same
+# running totals, so the available balance is a single-row read. Entries are
+# posted in the transaction that moves the money (purchase, payout request,
+# settlement). Payout requests carry an idempotency key, so a resubmitted form
+# returns the first payout instead of debiting twice. A job stands in for the
+# payment processor and settles each payout after PAYOUT_SETTLE_SECONDS; a
+# failed payout is credited back with a 'payout_reversal' entry.
+PLATFORM_FEE_RATE = 0.10
+MIN_PAYOUT = 10.00
+PAYOUT_SETTLE_SECONDS = float(os.environ.get('EVENTLINK_PAYOUT_SETTLE_SECONDS', 5))
+PAYOUT_FAILURE_RATE = float(os.environ.get('EVENTLINK_PAYOUT_FAILURE_RATE', 0))
+
+class PayoutError(Exception):
+    """A payout request was refused; the message is safe to show to the organizer"""
+
+def platform_fee(gross):
+    return round(gross * PLATFORM_FEE_RATE, 2)
+
+def post_ledger(conn, organizer_id, entries, created_at=None):
+    """Append (kind, amount, ticket_id, payout_id) entries and roll the balance snapshot forward (inside a transaction)"""
+    created_at = created_at or datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    row = conn.execute('SELECT available FROM organizer_balances WHERE organizer_id = ?', (organizer_id,)).fetchone()
+    balance = row['available'] if row else 0
+    deltas = {'sale': 0, 'fee': 0, 'payout': 0}
+    for kind, amount, ticket_id, payout_id in entries:
+        balance = round(balance + amount, 2)
+        entry_id = conn.execute('''INSERT INTO ledger_entries (organizer_id, kind, amount, balance_after, ticket_id, payout_id, created_at)
+                                   VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                                (organizer_id, kind, amount, balance, ticket_id, payout_id, created_at)).lastrowid
+        deltas['payout' if kind == 'payout_reversal' else kind] += amount
+    conn.execute('''INSERT INTO organizer_balances (organizer_id, available, sales, fees, paid_out, last_entry_id)
+                    VALUES (?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (organizer_id) DO UPDATE SET
+                        available = excluded.available,
+                        sales = ROUND(sales + excluded.sales, 2),
+                        fees = ROUND(fees + excluded.fees, 2),
+                        paid_out = ROUND(paid_out + excluded.paid_out, 2),
+                        last_entry_id = excluded.last_entry_id''',
+                 (organizer_id, balance, deltas['sale'], -deltas['fee'], -deltas['payout'], entry_id))
+    return balance
+
+def post_sale(conn, organizer_id, ticket_id, gross, created_at):
+    """Credit a ticket sale and debit its platform fee"""
+    gross = round(gross, 2)
+    post_ledger(conn, organizer_id, [('sale', gross, ticket_id, None), ('fee', -platform_fee(gross), ticket_id, None)],
+                created_at)
+
+def post_missing_sales(conn):
+    """Append sale and fee entries for tickets the ledger hasn't seen, then refresh the balances (inside a transaction)"""
+    conn.execute('''
+        WITH missing AS (
+            SELECT e.organizer_id, t.id as ticket_id, t.purchase_date, ROUND(t.quantity * t.unit_price, 2) as gross
+            FROM tickets t
+            JOIN events e ON e.id = t.event_id
+            WHERE NOT EXISTS (SELECT 1 FROM ledger_entries l WHERE l.ticket_id = t.id)
+        ), entries AS (
+            SELECT organizer_id, ticket_id, purchase_date, 0 as seq, 'sale' as kind, gross as amount FROM missing
+            UNION ALL
+            SELECT organizer_id, ticket_id, purchase_date, 1, 'fee', -ROUND(gross * :fee, 2) FROM missing
+        )
+        INSERT INTO ledger_entries (organizer_id, kind, amount, balance_after, ticket_id, created_at)
+        SELECT organizer_id, kind, amount,
+               ROUND(COALESCE((SELECT available FROM organizer_balances b WHERE b.organizer_id = entries.organizer_id), 0)
+                     + SUM(amount) OVER (PARTITION BY organizer_id ORDER BY ticket_id, seq), 2),
+               ticket_id, purchase_date
+        FROM entries
+        ORDER BY organizer_id, ticket_id, seq
+    ''', {'fee': PLATFORM_FEE_RATE})
+    rebuild_organizer_balances(conn)
+
+def rebuild_organizer_balances(conn):
+    """Recompute every balance snapshot from the ledger (inside a transaction)"""
+    conn.execute('DELETE FROM organizer_balances')
+    conn.execute('''
+        INSERT INTO organizer_balances (organizer_id, available, sales, fees, paid_out, pending_payouts, last_entry_id)
+        SELECT l.organizer_id,
+               ROUND(SUM(l.amount), 2),
+               ROUND(SUM(CASE WHEN l.kind = 'sale' THEN l.amount ELSE 0 END), 2),
+               ROUND(-SUM(CASE WHEN l.kind = 'fee' THEN l.amount ELSE 0 END), 2),
+               ROUND(-SUM(CASE WHEN l.kind IN ('payout', 'payout_reversal') THEN l.amount ELSE 0 END), 2),
+               COALESCE((SELECT SUM(p.amount) FROM payouts p WHERE p.organizer_id = l.organizer_id AND p.status = 'pending'), 0),
+               MAX(l.id)
+        FROM ledger_entries l
+        GROUP BY l.organizer_id
+    ''')
+
+def organizer_balance(conn, organizer_id):
+    row = conn.execute('SELECT * FROM organizer_balances WHERE organizer_id = ?', (organizer_id,)).fetchone()
+    return row or {'available': 0, 'sales': 0, 'fees': 0, 'paid_out': 0, 'pending_payouts': 0}
+
+def request_payout(conn, organizer_id, amount, destination, idempotency_key):
+    """Debit a payout and queue its settlement; returns (payout, created), where a repeated key returns the first payout"""
+    amount = round(amount, 2)
+    with write_transaction(conn):
+        payout = conn.execute('SELECT * FROM payouts WHERE organizer_id = ? AND idempotency_key = ?',
+                              (organizer_id, idempotency_key)).fetchone()
+        if payout is not None:
+            return payout, False
+        if amount < MIN_PAYOUT:
+            raise PayoutError(f'Minimum payout amount is ${MIN_PAYOUT:.2f}')
+        available = organizer_balance(conn, organizer_id)['available']
+        if amount > available:
+            raise PayoutError(f'Insufficient balance: ${available:.2f} is available for payout')
+        payout = conn.execute('''INSERT INTO payouts (organizer_id, amount, destination, idempotency_key, requested_at)
+                                 VALUES (?, ?, ?, ?, ?) RETURNING *''',
+                              (organizer_id, amount, destination, idempotency_key,
+                               datetime.now().strftime('%Y-%m-%d %H:%M:%S'))).fetchone()
+        post_ledger(conn, organizer_id, [('payout', -amount, None, payout['id'])])
+        conn.execute('UPDATE organizer_balances SET pending_payouts = ROUND(pending_payouts + ?, 2) WHERE organizer_id = ?',
+                     (amount, organizer_id))
+        job_queue.enqueue(conn, 'settle_payout', {'payout_id': payout['id']}, delay=PAYOUT_SETTLE_SECONDS)
+    return payout, True
+
+@job_handler('settle_payout')
+def settle_payout(conn, payload):
+    """Payment processor stand-in: marks a pending payout paid, or failed and credited back"""
+    failed = random.random() < PAYOUT_FAILURE_RATE
+    with write_transaction(conn):
+        payout = conn.execute('''UPDATE payouts SET status = ?, processor_ref = ?, failure_reason = ?, settled_at = ?
+                                 WHERE id = ? AND status = 'pending'
+                                 RETURNING id, organizer_id, amount''',
+                              ('failed' if failed else 'paid', f'po_{secrets.token_hex(8)}',
+                               'Declined by the payment processor' if failed else None,
+                               datetime.now().strftime('%Y-%m-%d %H:%M:%S'), payload['payout_id'])).fetchone()
+        if payout is None:
+            return  # already settled
+        conn.execute('UPDATE organizer_balances SET pending_payouts = ROUND(pending_payouts - ?, 2) WHERE organizer_id = ?',
+                     (payout['amount'], payout['organizer_id']))
+        if failed:
+            post_ledger(conn, payout['organizer_id'], [('payout_reversal', payout['amount'], None, payout['id'])])
+
+# --- Event Archive ---
+# Events that started more than ARCHIVE_AFTER_DAYS ago move, with their tickets
+# and check-ins, from the hot tables into events_archive / tickets_archive, so
+# listings, purchases and door scans work on tables sized by what is still
+# coming up rather than by the platform's whole history. The sales counters,
+# rollups and ledger are not touched: profile, dashboards and balances still
+# count archived sales, and `flask reconcile-stats` checks both tables.
+# Moves run in ARCHIVE_BATCH_SIZE transactions, so purchases wait on the write
+# lock for one batch at most. A perpetual 'archive_events' job runs them daily.
+ARCHIVE_AFTER_DAYS = int(os.environ.get('EVENTLINK_ARCHIVE_AFTER_DAYS', 30))
+ARCHIVE_BATCH_SIZE = 500
+ARCHIVE_INTERVAL = 24 * 3600
+
+archive_stats = {'runs': 0, 'events': 0, 'tickets': 0}
+
+ARCHIVE_DUE_SQL = 'SELECT id FROM events WHERE starts_at < ? ORDER BY starts_at LIMIT ?'
+
+def archive_past_events(conn, before, limit=ARCHIVE_BATCH_SIZE):
+    """Archive up to limit events starting before `before` (see wall_clock_epoch) in one transaction.
+
+    Returns (events, tickets) moved; (0, 0) once nothing is left to archive.
+    """
+    archived_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+    with write_transaction(conn):
+        ids = [row['id'] for row in conn.execute(ARCHIVE_DUE_SQL, (before, limit))]
+        if not ids:
+            return 0, 0
+        batch = json.dumps(ids)
+        conn.execute('''INSERT INTO events_archive (id, organizer_id, title, description, location, date_time, starts_at,
+                                                    price, capacity, category, status, image_url, created_at,
+                                                    tickets_sold, orders, gross_revenue, archived_at)
+                        SELECT e.id, e.organizer_id, e.title, e.description, e.location, e.date_time, e.starts_at,
+                               e.price, e.capacity, e.category, e.status, e.image_url, e.created_at,
+                               e.tickets_sold, COALESCE(s.orders, 0), COALESCE(s.gross_revenue, 0), ?
+                        FROM events e LEFT JOIN event_stats s ON s.event_id = e.id
+                        WHERE e.id IN (SELECT value FROM json_each(?))''', (archived_at, batch))
+        tickets = conn.execute('''INSERT INTO tickets_archive (id, user_id, event_id, purchase_date, purchased_at, quantity,
+                                                               unit_price, qr_code, checked_in_at, archived_at)
+                                  SELECT t.id, t.user_id, t.event_id, t.purchase_date, t.purchased_at, t.quantity,
+                                         t.unit_price, t.qr_code, c.scanned_at, ?
+                                  FROM tickets t LEFT JOIN checkins c ON c.ticket_id = t.id
+                                  WHERE t.event_id IN (SELECT value FROM json_each(?))''', (archived_at, batch)).rowcount
+        conn.execute('''DELETE FROM ticket_assets WHERE ticket_id IN (
+                            SELECT id FROM tickets WHERE event_id IN (SELECT value FROM json_each(?)))''', (batch,))
+        for table, column in (('checkins', 'event_id'), ('checkin_conflicts', 'event_id'), ('ticket_holds', 'event_id'),
+                              ('tickets', 'event_id'), ('event_stats', 'event_id'), ('events', 'id')):
+            conn.execute(f'DELETE FROM {table} WHERE {column} IN (SELECT value FROM json_each(?))', (batch,))
+    archive_stats['events'] += len(ids)
+    archive_stats['tickets'] += tickets
+    return len(ids), tickets
+
+def archive_due_events(conn, days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE):
+    """Archive every event that started more than days ago, batch by batch; returns (events, tickets) moved"""
+    before = wall_clock_epoch() - days * 24 * 3600
+    events = tickets = 0
+    while True:
+        moved_events, moved_tickets = archive_past_events(conn, before, batch_size)
+        if not moved_events:
+            break
+        events += moved_events
+        tickets += moved_tickets
+    archive_stats['runs'] += 1
+    return events, tickets
+
+@job_handler('archive_events')
+def archive_events_job(conn, payload):
+    """Archive past events, then schedule the next run unless one is already queued"""
+    events, tickets = archive_due_events(conn)
+    if events:
+        app.logger.info('Archived %s events and %s tickets', events, tickets)
+    with write_transaction(conn):
+        queued = conn.execute("SELECT 1 FROM jobs WHERE kind = 'archive_events' AND status = 'queued'").fetchone()
+        if queued is None:
+            job_queue.enqueue(conn, 'archive_events', {}, delay=ARCHIVE_INTERVAL)
+
+@app.cli.command('archive-events')
+@click.option('--days', type=int, default=ARCHIVE_AFTER_DAYS, help='Archive events that started more than this many days ago.')
+@click.option('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE, help='Events moved per transaction.')
+def archive_events_command(days, batch_size):
+    """Move past events and their tickets out of the hot tables now."""
+    events, tickets = archive_due_events(get_db(), days, batch_size)
+    click.echo(f'Archived {events} events and {tickets} tickets.')
+
+# --- Response Cache ---
+# Query results and rendered pages for the public event pages. Keys live under
+# versioned namespaces ('events_list', 'event:<id>'). The versions are rows in
+# the cache_versions table, bumped by triggers on events in the same transaction
+# as the change, so every worker sees a new version at once and every key under
+# the old one goes stale; old entries age out. The version doubles as the ETag
+# and Last-Modified time for conditional requests, identical on every worker.
+#
+# The default in-process LRU is per worker. Set EVENTLINK_CACHE_URL=sqlite:///path
+# to share one cache between all workers on a host.
+CACHE_URL = os.environ.get('EVENTLINK_CACHE_URL', '')
+CACHE_TTL = int(os.environ.get('EVENTLINK_CACHE_TTL', 60))
+CACHE_SIZE = int(os.environ.get('EVENTLINK_CACHE_SIZE', 2048))
+
+class LRUCache:
+    """Thread-safe in-process LRU cache with a per-entry TTL"""
+
+    def __init__(self, max_entries=CACHE_SIZE):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[1] is not None and item[1] <= time.monotonic():
+                del self._data[key]
+                item = None
+            if item is None:
+                self.stats['misses'] += 1
+                return None
+            self._data.move_to_end(key)
+            self.stats['hits'] += 1
+            return item[0]
+
+    def set(self, key, value, ttl=CACHE_TTL):
+        expires_at = time.monotonic() + ttl if ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.stats['evictions'] += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, backend='memory', entries=len(self._data))
+
+class SQLiteCache:
+    """Cache shared by every worker process on a host, kept in its own SQLite file.
+
+    A local stand-in for a networked cache such as Redis or memcached: same
+    get/set/delete interface, values are pickled.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = OFF')  # losing a cache entry on power failure is harmless
+            conn.execute('CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB, expires_at REAL)')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def get(self, key):
+        row = self._conn().execute('SELECT value, expires_at FROM cache WHERE key = ?', (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            self.stats['misses'] += 1
+            return None
+        self.stats['hits'] += 1
+        return pickle.loads(row[0])
+
+    def set(self, key, value, ttl=CACHE_TTL):
+        conn = self._conn()
+        conn.execute('INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)',
+                     (key, pickle.dumps(value), time.time() + ttl if ttl else None))
+        if random.random() < 0.01:
+            # Occasionally sweep expired entries so the file doesn't grow without bound
+            self.stats['evictions'] += conn.execute('DELETE FROM cache WHERE expires_at <= ?', (time.time(),)).rowcount
+
+    def delete(self, key):
+        self._conn().execute('DELETE FROM cache WHERE key = ?', (key,))
+
+    def snapshot(self):
+        return dict(self.stats, backend='sqlite', path=self.path)
+
+def make_cache(url):
+    if not url or url == 'memory://':
+        return LRUCache()
+    if url.startswith('sqlite:///'):
+        return SQLiteCache(url[len('sqlite:///'):])
+    raise ValueError(f'Unsupported EVENTLINK_CACHE_URL: {url}')
+
+response_cache = make_cache(CACHE_URL)
+
+def cache_version(namespace):
+    """Current version (the time its data last changed) of a cache namespace, from the cache_versions table"""
+    sql = "SELECT max(version) FROM cache_versions WHERE namespace IN (?, '')"
+    if 'db' in g or READ_MODE != 'snapshot':
+        conn = g.db if 'db' in g else get_read_db()
+        return conn.execute(sql, (namespace,)).fetchone()[0]
+    # The snapshot may predate the change; the version decides whether it can be used at all
+    with read_pool.connection() as conn:
+        conn.profile = g.get('query_profile')
+        try:
+            return conn.execute(sql, (namespace,)).fetchone()[0]
+        finally:
+            conn.profile = None
+
+def cached(namespace, version, key, loader, ttl=CACHE_TTL):
+    """Return the cached value for key in a namespace version, computing it with loader() on a miss"""
+    full_key = f'{namespace}:{version!r}:{key}'
+    value = response_cache.get(full_key)
+    if value is None:
+        value = loader()
+        if value is not None:
+            response_cache.set(full_key, value, ttl)
+    return value
+
+def conditional_response(version, vary, render):
+    """Build a response validated by ETag/Last-Modified, replying 304 without calling render() when the client is current.
+
+    vary lists everything besides the namespace version that changes the page (user, role, params).
+    Pending flash messages are not part of it: the pages validated this way don't show them, so
+    they wait for a page that does (login, role selection) instead of turning off 304s until then.
+    """
+    etag = hashlib.sha1(json.dumps([version, *vary], default=str).encode()).hexdigest()[:20]
+    last_modified = datetime.fromtimestamp(int(version), timezone.utc)
+    if request.if_none_match:
+        not_modified = request.if_none_match.contains_weak(etag)
+    else:
+        not_modified = request.if_modified_since is not None and last_modified <= request.if_modified_since
+    response = app.response_class(status=304) if not_modified else make_response(render())
+    response.set_etag(etag, weak=True)
+    response.last_modified = last_modified
+    # The page depends on the session cookie: browsers may keep it but must revalidate
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    response.vary.add('Cookie')
+    return response
+
+# --- Live Availability ---
+# Event pages keep their seat counts current during an on-sale instead of being
+# reloaded: by polling /event/<id>/availability.json, or over
+# /event/<id>/availability, a server-sent events stream of the counts. Every
+# commit that changes an event's sales or capacity publishes the new counts once
+# to the availability backend; one hub per process hands each change to all of
+# its streams for that event, so a thousand watchers cost one notification, not
+# a thousand queries. Streams that fall behind skip straight to the latest counts.
+#
+# The default backend only reaches streams in the publishing process. Set
+# EVENTLINK_AVAILABILITY_URL=sqlite:///path to share changes between all workers
+# on a host: one listener thread per worker polls for them.
+#
+# Streams are opt-in (EVENTLINK_LIVE_AVAILABILITY=stream): an open stream holds a
+# request thread (or greenlet) until it ends after STREAM_SECONDS and the browser
+# reconnects. EVENTLINK_WORKER_THREADS must then say how many each worker has
+# (gunicorn --threads, or --worker-connections for an async worker class); at
+# most STREAM_THREAD_SHARE of them hold streams, so the rest keep serving pages.
+# Only signed-in visitors open a stream, and never on a worker that handles one
+# request at a time. Everyone else, and anyone refused a stream, polls every
+# AVAILABILITY_REFRESH_SECONDS; the poll is answered from the cache, mostly with a 304.
+AVAILABILITY_URL = os.environ.get('EVENTLINK_AVAILABILITY_URL', '')
+AVAILABILITY_POLL = float(os.environ.get('EVENTLINK_AVAILABILITY_POLL', 0.25))
+AVAILABILITY_REFRESH_SECONDS = 15
+LIVE_AVAILABILITY = os.environ.get('EVENTLINK_LIVE_AVAILABILITY', 'poll')
+WORKER_THREADS = int(os.environ.get('EVENTLINK_WORKER_THREADS', 0))
+STREAM_THREAD_SHARE = 0.5
+MAX_STREAMS = int(WORKER_THREADS * STREAM_THREAD_SHARE) if LIVE_AVAILABILITY == 'stream' else 0
+STREAM_SECONDS = 300
+STREAM_KEEPALIVE = 15
+STREAM_RETRY_SECONDS = 5
+
+class MemoryAvailabilityBackend:
+    """Hands changes straight to this process's hub"""
+    shared = False
+
+    def __init__(self):
+        self._deliver = None
+
+    def listen(self, deliver):
+        self._deliver = deliver
+
+    def publish(self, event_id, payload):
+        if self._deliver is not None:
+            self._deliver(event_id, payload)
+
+    def snapshot(self):
+        return {'backend': 'memory'}
+
+class SQLiteAvailabilityBackend:
+    """Availability changes shared by every worker process on a host, kept in their own SQLite file.
+
+    A local stand-in for a pub/sub channel such as Redis: publish() appends a
+    change, and one listener thread per process picks up new ones every poll
+    interval and hands them to the hub, however many streams it has open.
+    """
+    shared = True
+
+    def __init__(self, path, poll=AVAILABILITY_POLL):
+        self.path = path
+        self.poll = poll
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pid = None
+        self.stats = {'published': 0, 'received': 0, 'errors': 0}
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = OFF')  # a lost change is superseded by the next one
+            conn.execute('''CREATE TABLE IF NOT EXISTS changes (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT, event_id INTEGER NOT NULL, payload TEXT NOT NULL, created_at REAL NOT NULL)''')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def publish(self, event_id, payload):
+        conn = self._conn()
+        conn.execute('INSERT INTO changes (event_id, payload, created_at) VALUES (?, ?, ?)',
+                     (event_id, json.dumps(payload), time.time()))
+        self.stats['published'] += 1
+        if random.random() < 0.01:
+            # Listeners are at most a poll interval behind, so old changes can go
+            conn.execute('DELETE FROM changes WHERE created_at < ?', (time.time() - 60,))
+
+    def listen(self, deliver):
+        # Threads don't survive a fork, so each worker process starts its own listener
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            last = self._conn().execute('SELECT COALESCE(MAX(seq), 0) FROM changes').fetchone()[0]
+            threading.Thread(target=self._run, args=(deliver, last), name='availability-listener', daemon=True).start()
+            self._pid = os.getpid()
+
+    def _run(self, deliver, last):
+        while True:
+            time.sleep(self.poll)
+            try:
+                rows = self._conn().execute('SELECT seq, event_id, payload FROM changes WHERE seq > ? ORDER BY seq',
+                                            (last,)).fetchall()
+            except sqlite3.Error:
+                app.logger.exception('Reading availability changes failed')
+                self.stats['errors'] += 1
+                continue
+            for seq, event_id, payload in rows:
+                last = seq
+                self.stats['received'] += 1
+                deliver(event_id, json.loads(payload))
+
+    def snapshot(self):
+        return dict(self.stats, backend='sqlite', path=self.path)
+
+def make_availability_backend(url):
+    if not url or url == 'memory://':
+        return MemoryAvailabilityBackend()
+    if url.startswith('sqlite:///'):
+        return SQLiteAvailabilityBackend(url[len('sqlite:///'):])
+    raise ValueError(f'Unsupported EVENTLINK_AVAILABILITY_URL: {url}')
+
+class AvailabilityHub:
+    """The single publisher of availability changes to the streams open in this process"""
+
+    def __init__(self, backend, max_streams=MAX_STREAMS):
+        self.backend = backend
+        self.max_streams = max_streams
+        self._lock = threading.Lock()
+        # event_id -> [sequence number, latest payload, condition, streams]
+        self._events = {}
+        self._streams = 0
+        self.stats = {'published': 0, 'delivered': 0, 'refused': 0}
+
+    def watched(self, event_ids):
+        """The event ids some stream may be following: any, when the backend is shared between processes"""
+        if self.backend.shared:
+            return set(event_ids)
+        with self._lock:
+            return {event_id for event_id in event_ids if event_id in self._events}
+
+    def publish(self, event_id, payload):
+        self.stats['published'] += 1
+        self.backend.publish(event_id, payload)
+
+    def deliver(self, event_id, payload):
+        """Called by the backend once per change, however many streams follow the event"""
+        with self._lock:
+            watched = self._events.get(event_id)
+            if watched is None:
+                return
+            watched[0] += 1
+            watched[1] = payload
+            watched[2].notify_all()
+            self.stats['delivered'] += 1
+
+    def subscribe(self, event_id):
+        """Start following an event; returns its current sequence number, or None when the process has no room for another stream"""
+        self.backend.listen(self.deliver)
+        with self._lock:
+            if self._streams >= self.max_streams:
+                self.stats['refused'] += 1
+                return None
+            self._streams += 1
+            watched = self._events.setdefault(event_id, [0, None, threading.Condition(self._lock), 0])
+            watched[3] += 1
+            return watched[0]
+
+    def refuse(self):
+        """Count a stream turned away before subscribing"""
+        with self._lock:
+            self.stats['refused'] += 1
+
+    def unsubscribe(self, event_id):
+        with self._lock:
+            self._streams -= 1
+            watched = self._events[event_id]
+            watched[3] -= 1
+            if not watched[3]:
+                del self._events[event_id]
+
+    def wait(self, event_id, seen, timeout):
+        """Block until the event changes after sequence number seen; returns (seq, payload), or None on timeout"""
+        with self._lock:
+            watched = self._events[event_id]
+            if not watched[2].wait_for(lambda: watched[0] > seen, timeout):
+                return None
+            return watched[0], watched[1]
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, streams=self._streams, events=len(self._events), max_streams=self.max_streams,
+                        backend=self.backend.snapshot())
+
+availability_hub = AvailabilityHub(make_availability_backend(AVAILABILITY_URL))
+
+def availability_payload(row):
+    remaining = max(row['capacity'] - row['tickets_sold'], 0) if row['capacity'] else None
+    return {'event_id': row['id'], 'tickets_sold': row['tickets_sold'], 'capacity': row['capacity'],
+            'remaining': remaining}
+
+def publish_availability(conn, event_ids):
+    """Push the seat counts of events whose sales or capacity just changed; call after the commit"""
+    event_ids = sorted(availability_hub.watched(event_ids))
+    if not event_ids:
+        return
+    try:
+        rows = conn.execute(f'SELECT id, capacity, tickets_sold FROM events WHERE id IN ({",".join("?" * len(event_ids))})',
+                            event_ids).fetchall()
+        for row in rows:
+            availability_hub.publish(row['id'], availability_payload(row))
+    except Exception:
+        # The sale itself has committed; streams catch up with the next change
+        app.logger.exception('Publishing availability for events %s failed', event_ids)
+
+def check_live_availability():
+    """Warn at startup when streams were asked for but the workers have no threads to spare for them"""
+    if LIVE_AVAILABILITY == 'stream' and MAX_STREAMS < 1:
+        app.logger.warning('EVENTLINK_LIVE_AVAILABILITY=stream needs EVENTLINK_WORKER_THREADS set to the request '
+                           'threads per worker (at least %d); event pages will poll instead', int(1 / STREAM_THREAD_SHARE))
+
+def worker_can_stream(environ):
+    """Whether this worker serves requests concurrently, so a stream doesn't block it"""
+    if environ.get('wsgi.multithread'):
+        return True
+    # Async workers (gevent, eventlet) report wsgi.multithread false but patch threading into greenlets
+    for module, patched in (('gevent.monkey', 'is_module_patched'), ('eventlet.patcher', 'is_monkey_patched')):
+        if module in sys.modules and getattr(sys.modules[module], patched)('threading'):
+            return True
+    return False
+
+def availability_mode():
+    """How this visitor's event page follows the seat counts: 'stream' or 'poll'"""
+    if availability_hub.max_streams and 'user_id' in session and worker_can_stream(request.environ):
+        return 'stream'
+    return 'poll'
+
+def sse_message(event, data):
+    return f'event: {event}\ndata: {json.dumps(data)}\n\n'
+
+@app.route('/event/<int:event_id>/availability.json')
+def event_availability_counts(event_id):
+    """The event's seat counts, for pages that poll instead of streaming"""
+    namespace = f'event:{event_id}'
+    version = cache_version(namespace)
+    conn = get_read_db(since=version)
+
+    def load_counts():
+        row = conn.execute('SELECT id, capacity, tickets_sold FROM events WHERE id = ?', (event_id,)).fetchone()
+        return availability_payload(row) if row else None
+    counts = cached(namespace, version, 'availability', load_counts)
+    if counts is None:
+        return jsonify(error='Event not found'), 404
+    return conditional_response(version, [event_id], lambda: jsonify(counts))
+
+@app.route('/event/<int:event_id>/availability')
+def event_availability(event_id):
+    """Server-sent events: the event's seat counts now and after every change"""
+    if availability_mode() != 'stream':
+        # EventSource gives up on an error status, and the page falls back to polling
+        availability_hub.refuse()
+        return 'Live streams are off, poll availability.json instead', 503
+    seen = availability_hub.subscribe(event_id)
+    if seen is None:
+        return 'Too many live streams, try again later', 503, {'Retry-After': str(STREAM_RETRY_SECONDS)}
+    response = None
+    try:
+        # Read after subscribing, so a change committed in between is still sent
+        row = get_read_db(since=cache_version(f'event:{event_id}')).execute(
+            'SELECT id, capacity, tickets_sold FROM events WHERE id = ?', (event_id,)).fetchone()
+        if row is None:
+            return 'Event not found', 404
+
+        def stream(seen):
+            yield f'retry: {STREAM_RETRY_SECONDS * 1000}\n'
+            yield sse_message('availability', availability_payload(row))
+            deadline = time.monotonic() + STREAM_SECONDS
+            while (left := deadline - time.monotonic()) > 0:
+                update = availability_hub.wait(event_id, seen, min(STREAM_KEEPALIVE, left))
+                if update is None:
+                    # Also how a closed connection is noticed
+                    yield ': keep-alive\n\n'
+                    continue
+                seen, payload = update
+                yield sse_message('availability', payload)
+
+        response = Response(stream(seen), mimetype='text/event-stream')
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'  # nginx: pass events through unbuffered
+        response.call_on_close(lambda: availability_hub.unsubscribe(event_id))
+        return response
+    finally:
+        if response is None:
+            availability_hub.unsubscribe(event_id)
+
+# --- Read Routing ---
+# Read-only pages (event listings, event detail, payments, profile) query
+# through get_read_db() instead of get_db(). Reads get their own pool, so a slow
+# report can't take the connections purchases need. EVENTLINK_READ_MODE picks
+# the connections reads use:
+#   'ro' (default)  mode=ro connections to the live database. Under WAL they read
+#                   committed data and never hold up the writer.
+#   'snapshot'      a copy refreshed in the background with the backup API, opened
+#                   immutable so reading it takes no locks at all. A snapshot is
+#                   used only while it is younger than READ_MAX_STALENESS seconds
+#                   and taken after the page's data last changed; otherwise the
+#                   read falls back to the live read-only pool.
+#   'primary'       no routing; reads share the writer's pool.
+# Writes always go through get_db() and write_transaction().
+READ_MODE = os.environ.get('EVENTLINK_READ_MODE', 'ro')
+READ_MAX_STALENESS = float(os.environ.get('EVENTLINK_READ_MAX_STALENESS', 5.0))
+READ_SNAPSHOT_PATH = os.environ.get('EVENTLINK_READ_SNAPSHOT', DB_NAME + '-snapshot')
+
+class SnapshotReplica:
+    """Copy of the database for reads, refreshed by a background thread in each process.
+
+    The copy's mtime is set to when the copy started, so it holds every commit
+    made before that time. Processes take turns through a lock file, and one
+    that finds the copy still fresh leaves it alone.
+    """
+
+    def __init__(self, source, path, max_staleness=READ_MAX_STALENESS):
+        self.source = source
+        self.path = path
+        self.max_staleness = max_staleness
+        self.interval = max_staleness / 2
+        self._lock = threading.Lock()
+        self._pid = None
+        self.stats = {'refreshes': 0, 'failures': 0}
+
+    def taken_at(self):
+        try:
+            return os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return None
+
+    def usable(self, since=None):
+        """True when the copy is within the staleness bound and no older than since"""
+        taken_at = self.taken_at()
+        return (taken_at is not None and time.time() - taken_at <= self.max_staleness
+                and (since is None or taken_at >= since))
+
+    def refresh(self, force=False):
+        """Copy the live database unless another process is at it or just did; True if this call copied"""
+        with open(self.path + '.lock', 'a') as lock:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    return False
+            taken_at = self.taken_at()
+            if not force and taken_at is not None and time.time() - taken_at < self.interval:
+                return False
+            started = time.time()
+            tmp = f'{self.path}.{os.getpid()}.tmp'
+            try:
+                source, target = sqlite3.connect(self.source), sqlite3.connect(tmp)
+                try:
+                    # One step: a single read transaction on the source, which never blocks the writer
+                    source.backup(target)
+                    # Immutable readers can't use a WAL file, so the copy gets a rollback journal
+                    target.execute('PRAGMA journal_mode = DELETE')
+                finally:
+                    target.close()
+                    source.close()
+                os.utime(tmp, (started, started))
+                os.replace(tmp, self.path)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+            self.stats['refreshes'] += 1
+            return True
+
+    def start(self):
+        """Start this process's refresh thread; threads don't survive a fork, so each worker starts its own"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self._run, name='read-snapshot', daemon=True).start()
+
+    def _run(self):
+        while True:
+            try:
+                self.refresh()
+            except Exception:
+                self.stats['failures'] += 1
+                app.logger.exception('Refreshing the read snapshot %s failed', self.path)
+            time.sleep(self.interval)
+
+    def snapshot(self):
+        taken_at = self.taken_at()
+        return dict(self.stats, path=self.path, max_staleness=self.max_staleness,
+                    age=round(time.time() - taken_at, 3) if taken_at is not None else None)
+
+read_pool = ConnectionPool(DB_NAME, readonly=True)
+snapshot_replica = SnapshotReplica(DB_NAME, READ_SNAPSHOT_PATH) if READ_MODE == 'snapshot' else None
+snapshot_pool = ConnectionPool(READ_SNAPSHOT_PATH, immutable=True) if snapshot_replica else None
+
+def get_read_db(since=None):
+    """Connection for a read-only page; since is the version (a timestamp) its data must be at least as new as"""
+    if READ_MODE == 'primary':
+        return get_db()
+    if 'read_db' not in g:
+        pool = read_pool
+        if snapshot_replica is not None and snapshot_replica.usable(since):
+            pool = snapshot_pool
+        g.read_db = pool.acquire()
+        g.read_db_pool = pool
+        g.read_db.profile = g.get('query_profile')
+    return g.read_db
+
+def user_writes_version():
+    """When the signed-in user last changed something, so their own pages read their writes"""
+    return session.get('writes_at')
+
+@app.before_request
+def start_snapshot_refresher():
+    if snapshot_replica is not None:
+        snapshot_replica.start()
+
+@app.after_request
+def note_user_writes(response):
+    profile = g.get('query_profile')
+    if snapshot_replica is not None and profile is not None and profile.wrote and 'user_id' in session:
+        # Kept in the session, which every worker reads the same way
+        session['writes_at'] = time.time()
+    return response
+
+# --- Password Hashing ---
+# Password hashes are deliberately slow, so they run in a process pool rather
+# than on the request thread, and at most HASH_QUEUE_LIMIT may be waiting or
+# running per web worker: past that, login and signup answer 503 with
+# Retry-After instead of piling up. Size HASH_WORKERS so that web workers times
+# hash workers roughly matches the cores. Set HASH_WORKERS to 0 to hash inline.
+# The pool's processes are spawned, not forked: by the time the first password
+# is hashed the web process runs the log writer, job workers and purchase
+# batcher, and a fork copies whatever locks those threads hold at that moment.
+# (A spawned process re-imports the main script, so scripts that import this
+# module and log users in need the usual `if __name__ == '__main__':` guard.)
+PASSWORD_HASH_METHOD = os.environ.get('EVENTLINK_PASSWORD_HASH_METHOD', 'scrypt:32768:8:1')
+HASH_WORKERS = int(os.environ.get('EVENTLINK_HASH_WORKERS', os.cpu_count() or 1))
+HASH_QUEUE_LIMIT = int(os.environ.get('EVENTLINK_HASH_QUEUE_LIMIT', 4 * max(HASH_WORKERS, 1)))
+HASH_TIMEOUT = float(os.environ.get('EVENTLINK_HASH_TIMEOUT', 10.0))
+HASH_RETRY_AFTER = 2
+
+class PasswordHashBusy(Exception):
+    """The hashing pool is saturated (queue full or timed out); the client should retry shortly"""
+
+class PasswordHasher:
+    """Runs password hashing and verification in a bounded process pool"""
+
+    def __init__(self, method=PASSWORD_HASH_METHOD, workers=HASH_WORKERS, limit=HASH_QUEUE_LIMIT, timeout=HASH_TIMEOUT):
+        self.method = method
+        self.workers = workers
+        self.limit = limit
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._pending = 0
+        self.stats = {'hashed': 0, 'verified': 0, 'rehashed': 0, 'rejected': 0}
+
+    def _pool(self):
+        with self._lock:
+            # A pool inherited across a fork has no live workers, so each process builds its own
+            if self._pid != os.getpid():
+                self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                     mp_context=multiprocessing.get_context('spawn'))
+                self._pid = os.getpid()
+            return self._executor
+
+    def start(self):
+        """Build this process's pool now rather than on the first login"""
+        if self.workers > 0:
+            self._pool()
+
+    def _count(self, stat):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def _done(self, future=None):
+        with self._lock:
+            self._pending -= 1
+
+    def _run(self, fn, *args):
+        with self._lock:
+            if self._pending >= self.limit:
+                self.stats['rejected'] += 1
+                raise PasswordHashBusy('Password hashing queue is full')
+            self._pending += 1
+        if self.workers <= 0:
+            try:
+                return fn(*args)
+            finally:
+                self._done()
+        try:
+            future = self._pool().submit(fn, *args)
+        except BaseException:
+            self._done()
+            raise
+        # A hash that is already running can't be cancelled, so it stays pending until it
+        # really finishes, even when the request has stopped waiting for it
+        future.add_done_callback(self._done)
+        try:
+            return future.result(self.timeout)
+        except FuturesTimeout:
+            future.cancel()
+            raise PasswordHashBusy(f'Password hashing took longer than {self.timeout}s')
+
+    def hash(self, password):
+        self._count('hashed')
+        return self._run(generate_password_hash, password, self.method)
+
+    def needs_rehash(self, stored):
+        return stored.split('$', 1)[0] != self.method
+
+    def verify(self, stored, password):
+        """Check a password; returns (ok, new_hash), where new_hash is set when the
+        stored hash used other parameters and should be replaced"""
+        self._count('verified')
+        if not self._run(check_password_hash, stored, password):
+            return False, None
+        if not self.needs_rehash(stored):
+            return True, None
+        self._count('rehashed')
+        return True, self._run(generate_password_hash, password, self.method)
+
+    def snapshot(self):
+        with self._lock:
+            return dict(self.stats, pending=self._pending, limit=self.limit, workers=self.workers, method=self.method)
+
+password_hasher = PasswordHasher()
+
+@app.errorhandler(PasswordHashBusy)
+def password_hash_busy(e):
+    flash('We are handling a lot of sign-ins right now. Please try again in a moment.')
+    mode = 'signup' if request.endpoint == 'signup' else 'login'
+    return render_template('login.html', mode=mode), 503, {'Retry-After': str(HASH_RETRY_AFTER)}
+
+# --- Sessions ---
+# Server-side sessions: the cookie carries only '<session id>.<version>' and the
+# data lives in the sessions table, fronted by a per-process LRU. Every save bumps
+# the version and re-sends the cookie, so a cached copy is only used when it is
+# the one the client last saw; a write made by another worker is never hidden.
+#
+# The logged-in user's record is cached in the session too (see current_user),
+# and is used while its version matches users.version. After changing a user row
+# call invalidate_user(), which bumps that version. The version is read from the
+# database on every request (one primary-key lookup) rather than cached, so a
+# revoked role stops working at once in every worker, not after a cache expiry.
+SESSION_CACHE_TTL = int(os.environ.get('EVENTLINK_SESSION_CACHE_TTL', CACHE_TTL))
+SESSION_CACHE_SIZE = int(os.environ.get('EVENTLINK_SESSION_CACHE_SIZE', 10000))
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Session dict that knows its id and stored version, and whether it changed"""
+
+    def __init__(self, initial=None, sid=None, version=0):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.version = version
+        self.replaced_sid = None
+        self.modified = False
+
+    def regenerate(self):
+        """Move the data to a fresh id on login, so an id planted before login is worthless"""
+        if self.sid:
+            self.replaced_sid = self.sid
+        self.sid = None
+        self.modified = True
+
+class SessionStore:
+    """Session rows in SQLite with an in-process LRU in front"""
+
+    def __init__(self, cache):
+        self.cache = cache
+        self.serializer = TaggedJSONSerializer()
+
+    def load(self, conn, sid, version):
+        """Return (version, data) for a live session, or None"""
+        entry = self.cache.get(sid)
+        if entry is None or entry[0] != version:
+            row = conn.execute('SELECT version, data FROM sessions WHERE id = ? AND expires_at > ?',
+                               (sid, time.time())).fetchone()
+            if row is None:
+                return None
+            entry = (row['version'], row['data'])
+            self.cache.set(sid, entry, SESSION_CACHE_TTL)
+        # The serialized form is cached so requests never share a mutable dict
+        return entry[0], self.serializer.loads(entry[1])
+
+    def save(self, conn, sid, data, expires_at):
+        """Write a session and return its new version"""
+        payload = self.serializer.dumps(data)
+        version = conn.execute('''INSERT INTO sessions (id, user_id, data, expires_at) VALUES (?, ?, ?, ?)
+                                  ON CONFLICT (id) DO UPDATE SET user_id = excluded.user_id, data = excluded.data,
+                                      version = version + 1, expires_at = excluded.expires_at
+                                  RETURNING version''',
+                               (sid, data.get('user_id'), payload, expires_at)).fetchone()[0]
+        if random.random() < 0.01:
+            # Occasionally sweep expired sessions so the table doesn't grow without bound
+            conn.execute('DELETE FROM sessions WHERE expires_at <= ?', (time.time(),))
+        conn.commit()
+        self.cache.set(sid, (version, payload), SESSION_CACHE_TTL)
+        return version
+
+    def delete(self, conn, sid):
+        conn.execute('DELETE FROM sessions WHERE id = ?', (sid,))
+        conn.commit()
+        self.cache.delete(sid)
+
+    def forget_user(self, conn, user_id):
+        """Drop the cached user record from every session of a user"""
+        sids = [row[0] for row in conn.execute("UPDATE sessions SET data = json_remove(data, '$.user') "
+                                               'WHERE user_id = ? RETURNING id', (user_id,)).fetchall()]
+        conn.commit()
+        for sid in sids:
+            self.cache.delete(sid)
+
+class SQLiteSessionInterface(SessionInterface):
+    """Flask session interface backed by a SessionStore"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def open_session(self, app, request):
+        # Flask opens the session before any before_request hook, and loading
+        # one reads the sessions table, so this is where setup must happen first
+        ensure_setup()
+        sid, _, version = request.cookies.get(self.get_cookie_name(app), '').partition('.')
+        if sid and version.isdigit():
+            loaded = self.store.load(get_db(), sid, int(version))
+            if loaded is not None:
+                return ServerSession(loaded[1], sid, loaded[0])
+        return ServerSession()
+
+    def save_session(self, app, session, response):
+        if session is None:
+            # open_session() raised, and this response is the error page
+            return
+        self._save(app, session, response)
+        # Saving runs after the after_request hooks, so its statements are added to Server-Timing here
+        profile = g.get('query_profile')
+        if profile is not None and 'request_elapsed' in g:
+            response.headers['Server-Timing'] = server_timing(profile, g.request_elapsed)
+
+    def _save(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain, path = self.get_cookie_domain(app), self.get_cookie_path(app)
+        secure, samesite = self.get_cookie_secure(app), self.get_cookie_samesite(app)
+        httponly = self.get_cookie_httponly(app)
+        if session.replaced_sid:
+            self.store.delete(get_db(), session.replaced_sid)
+        if not session.modified:
+            return
+        if not session:
+            if session.sid:
+                self.store.delete(get_db(), session.sid)
+                response.delete_cookie(name, domain=domain, path=path, secure=secure, samesite=samesite, httponly=httponly)
+            return
+        session.sid = session.sid or secrets.token_urlsafe(32)
+        expires_at = time.time() + app.permanent_session_lifetime.total_seconds()
+        session.version = self.store.save(get_db(), session.sid, dict(session), expires_at)
+        response.set_cookie(name, f'{session.sid}.{session.version}', expires=self.get_expiration_time(app, session),
+                            domain=domain, path=path, secure=secure, samesite=samesite, httponly=httponly)
+        response.vary.add('Cookie')
+
+session_store = SessionStore(LRUCache(SESSION_CACHE_SIZE))
+app.session_interface = SQLiteSessionInterface(session_store)
+
+def remember_user(row):
+    """Cache a users row (minus the password hash) in the session and sync role and name"""
+    user = {key: row[key] for key in row.keys() if key != 'password'}
+    session.update(user=user, role=user['role'], name=user['full_name'])
+    g.current_user = user
+    return user
+
+def user_version(user_id):
+    """users.version for a user, or None when the account is gone"""
+    row = get_db().execute('SELECT version FROM users WHERE id = ?', (user_id,)).fetchone()
+    return row[0] if row else None
+
+def current_user():
+    """The logged-in user's record, memoized per request and cached in the session until invalidated"""
+    if 'current_user' in g:
+        return g.current_user
+    user_id = session.get('user_id')
+    if user_id is None:
+        g.current_user = None
+        return None
+    user = session.get('user')
+    if user is not None and user.get('version') == user_version(user_id):
+        g.current_user = user
+        return user
+    row = get_db().execute('SELECT * FROM users WHERE id = ?', (user_id,)).fetchone()
+    if row is None:
+        # The account no longer exists
+        session.clear()
+        g.current_user = None
+        return None
+    return remember_user(row)
+
+def invalidate_user(conn, user_id):
+    """Call after changing a users row: every session of that user reloads the record"""
+    conn.execute('UPDATE users SET version = version + 1 WHERE id = ?', (user_id,))
+    session_store.forget_user(conn, user_id)  # commits the new version too
+    if session.get('user_id') == user_id:
+        session.pop('user', None)
+        g.pop('current_user', None)
+
+@app.before_request
+def load_current_user():
+    # Keeps session['role'] in step with the database when another session changed it
+    if 'user_id' in session:
+        current_user()
+
+# --- Rate Limiting ---
+# Token buckets in front of the endpoints a bot surge goes for: sign-in and
+# sign-up per client IP, purchases per IP and per user. The limiter runs right
+# after the request profile starts, ahead of the other before_request hooks, so
+# a rejected request costs one bucket update on top of loading its session
+# (which Flask does before any hook: one indexed read when it carries a cookie),
+# and a flood is turned away with a 429 instead of queuing in front of real buyers. Behind a reverse proxy, set
+# EVENTLINK_PROXY_HOPS to the number of proxies so the client IP is read from
+# X-Forwarded-For.
+#
+# Checkout also goes through a per-event waiting room: every buyer who opens it
+# takes the next place in line, and places are admitted at ADMISSION_RATE per
+# second after an initial burst of ADMISSION_BURST. A buyer whose place hasn't
+# come up yet gets a 503 holding page with Retry-After set to the expected wait;
+# once admitted, they have HOLD_SECONDS to pay. ADMISSION_RATE=0 turns it off.
+#
+# Buckets and lines are per worker by default, so the limits apply per worker.
+# Set EVENTLINK_RATE_LIMIT_URL=sqlite:///path to share them between all workers
+# on a host, as with the response cache.
+RATE_LIMIT_ENABLED = os.environ.get('EVENTLINK_RATE_LIMIT', '1') != '0'
+RATE_LIMIT_URL = os.environ.get('EVENTLINK_RATE_LIMIT_URL', '')
+PROXY_HOPS = int(os.environ.get('EVENTLINK_PROXY_HOPS', 0))
+ADMISSION_RATE = float(os.environ.get('EVENTLINK_ADMISSION_RATE', 10))
+ADMISSION_BURST = int(os.environ.get('EVENTLINK_ADMISSION_BURST', 100))
+RATE_LIMIT_KEYS = 100_000  # buckets kept in memory; the least recently used are dropped (i.e. refilled)
+
+# endpoint: (limited methods, ((key, requests, per seconds), ...)), each a bucket of
+# `requests` tokens refilled over `per` seconds. IP limits are checked first as they need no session.
+RATE_LIMITS = {
+    'login': ({'POST'}, (('ip', 10, 60),)),
+    'signup': ({'POST'}, (('ip', 5, 60),)),
+    'process_payment': ({'POST'}, (('ip', 120, 60), ('user', 10, 60))),
+    'buy_ticket': ({'GET'}, (('ip', 120, 60), ('user', 10, 60))),
+}
+
+if PROXY_HOPS:
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=PROXY_HOPS)
+
+class RateLimited(Exception):
+    """A client went over one of RATE_LIMITS; retry_after is in whole seconds"""
+
+    def __init__(self, retry_after):
+        super().__init__(f'Rate limit exceeded, retry in {retry_after}s')
+        self.retry_after = retry_after
+
+def _take_token(state, rate, burst, now):
+    """Token bucket step from state (tokens, updated) or None for a full bucket.
+    Returns (new state, seconds until a token is available), the wait being 0 when one was taken."""
+    tokens, updated = state or (burst, now)
+    tokens = min(burst, tokens + (now - updated) * rate)
+    if tokens >= 1:
+        return (tokens - 1, now), 0
+    return (tokens, now), (1 - tokens) / rate
+
+def _line_step(state, rate, burst, now, place):
+    """Waiting room step from state (issued, front, updated) or None for an empty line.
+    Places up to `front` are admitted; the front advances at rate but never more than
+    burst places past the last one issued, so an idle line can't bank admissions.
+    A caller without a place (or holding one from before the line was reset) joins at the back.
+    Returns (new state, place, front)."""
+    issued, front, updated = state or (0, burst, now)
+    front = min(front + (now - updated) * rate, issued + burst)
+    if place is None or place > issued:
+        issued += 1
+        place = issued
+    return (issued, front, now), place, front
+
+class MemoryRateLimitStore:
+    """Token buckets and waiting-room lines for this worker process"""
+
+    def __init__(self, max_keys=RATE_LIMIT_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lines = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst):
+        with self._lock:
+            state, wait = _take_token(self._buckets.pop(key, None), rate, burst, time.time())
+            self._buckets[key] = state
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def line(self, name, rate, burst, place=None):
+        with self._lock:
+            self._lines[name], place, front = _line_step(self._lines.get(name), rate, burst, time.time(), place)
+        return place, front
+
+    def snapshot(self):
+        with self._lock:
+            return {'backend': 'memory', 'buckets': len(self._buckets), 'lines': len(self._lines)}
+
+class SQLiteRateLimitStore:
+    """Buckets and lines shared by every worker process on a host, kept in their own SQLite file.
+
+    A local stand-in for a shared store such as Redis, where take() and line()
+    would each be a small script; here each step is one IMMEDIATE transaction.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+
+    def _conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute('PRAGMA journal_mode = WAL')
+            conn.execute('PRAGMA synchronous = OFF')  # a lost bucket just refills early
+            conn.execute('CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL, updated REAL) WITHOUT ROWID')
+            conn.execute('CREATE TABLE IF NOT EXISTS lines (name TEXT PRIMARY KEY, issued INTEGER, front REAL, updated REAL)')
+            self._local.conn, self._local.pid = conn, os.getpid()
+        return conn
+
+    def take(self, key, rate, burst):
+        conn = self._conn()
+        with write_transaction(conn):
+            row = conn.execute('SELECT tokens, updated FROM buckets WHERE key = ?', (key,)).fetchone()
+            state, wait = _take_token(row, rate, burst, time.time())
+            conn.execute('INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)', (key, *state))
+            if random.random() < 0.01:
+                # Occasionally sweep long-idle buckets, which would have refilled anyway
+                conn.execute('DELETE FROM buckets WHERE updated <= ?', (time.time() - 3600,))
+        return wait
+
+    def line(self, name, rate, burst, place=None):
+        conn = self._conn()
+        with write_transaction(conn):
+            row = conn.execute('SELECT issued, front, updated FROM lines WHERE name = ?', (name,)).fetchone()
+            state, place, front = _line_step(row, rate, burst, time.time(), place)
+            conn.execute('INSERT OR REPLACE INTO lines (name, issued, front, updated) VALUES (?, ?, ?, ?)', (name, *state))
+        return place, front
+
+    def snapshot(self):
+        return {'backend': 'sqlite', 'path': self.path}
+
+def make_rate_limit_store(url):
+    if not url or url == 'memory://':
+        return MemoryRateLimitStore()
+    if url.startswith('sqlite:///'):
+        return SQLiteRateLimitStore(url[len('sqlite:///'):])
+    raise ValueError(f'Unsupported EVENTLINK_RATE_LIMIT_URL: {url}')
+
+class RateLimiter:
+    """Applies RATE_LIMITS to requests and runs the checkout waiting room"""
+
+    def __init__(self, store, limits=RATE_LIMITS, admission_rate=ADMISSION_RATE,
+                 admission_burst=ADMISSION_BURST, admission_ttl=HOLD_SECONDS):
+        self.store = store
+        self.limits = limits
+        self.admission_rate = admission_rate
+        self.admission_burst = admission_burst
+        self.admission_ttl = admission_ttl
+        self.stats = {'limited': 0, 'admitted': 0, 'waiting': 0}
+
+    def check(self, endpoint, method, ip, user_id):
+        """Take a token from each bucket that applies; raises RateLimited when one is empty"""
+        methods, limits = self.limits.get(endpoint, ((), ()))
+        if method not in methods:
+            return
+        for key, requests, per in limits:
+            ident = ip if key == 'ip' else user_id
+            if ident is None:
+                continue
+            wait = self.store.take(f'{endpoint}:{key}:{ident}', requests / per, requests)
+            if wait:
+                self.stats['limited'] += 1
+                raise RateLimited(math.ceil(wait))
+
+    def admit(self, event_id):
+        """Let the signed-in user into checkout for an event. Returns 0 once admitted,
+        otherwise the expected wait in seconds; the place in line is kept in the session."""
+        if self.admission_rate <= 0:
+            return 0
+        key, now = str(event_id), time.time()
+        passes = session.get('checkout_passes', {})
+        if passes.get(key, 0) > now:
+            return 0
+        places = session.get('checkout_places', {})
+        place, front = self.store.line(f'checkout:{event_id}', self.admission_rate, self.admission_burst,
+                                       places.get(key))
+        if place <= front:
+            self.stats['admitted'] += 1
+            session['checkout_passes'] = {k: v for k, v in passes.items() if v > now} | {key: now + self.admission_ttl}
+            if key in places:
+                session['checkout_places'] = {k: v for k, v in places.items() if k != key}
+            return 0
+        self.stats['waiting'] += 1
+        if places.get(key) != place:
+            session['checkout_places'] = places | {key: place}
+        return max(1, math.ceil((place - front) / self.admission_rate))
+
+    def snapshot(self):
+        return dict(self.stats, enabled=RATE_LIMIT_ENABLED, admission_rate=self.admission_rate,
+                    admission_burst=self.admission_burst, store=self.store.snapshot())
+
+rate_limiter = RateLimiter(make_rate_limit_store(RATE_LIMIT_URL))
+
+def enforce_rate_limits():
+    if RATE_LIMIT_ENABLED and request.endpoint in rate_limiter.limits:
+        rate_limiter.check(request.endpoint, request.method, request.remote_addr, session.get('user_id'))
+
+# Hooks run in registration order; this one goes before loading the current user and
+# starting background threads, but after the profile so 429s are still timed and logged
+_hooks = app.before_request_funcs.setdefault(None, [])
+_hooks.insert(_hooks.index(start_request_profile) + 1, enforce_rate_limits)
+
+@app.errorhandler(RateLimited)
+def rate_limited(e):
+    headers = {'Retry-After': str(e.retry_after)}
+    if request.endpoint in ('login', 'signup'):
+        flash('Too many attempts from your network. Please wait a minute and try again.')
+        return render_template('login.html', mode=request.endpoint), 429, headers
+    return render_template('waiting_room.html', title='Too many requests',
+                           message='You are sending requests faster than we can take them.',
+                           retry_after=e.retry_after, retry_url=None), 429, headers
+
+def waiting_room_response(event_id, wait):
+    """503 holding page for a buyer still in the checkout line; browsers retry it via the Refresh header"""
+    retry_url = url_for('checkout', event_id=event_id, quantity=request.values.get('quantity'))
+    page = render_template('waiting_room.html', title="You're in line",
+                           message='This event is in high demand, so buyers are let into checkout a few at a time. '
+                                   'Keep this page open: it moves on by itself when it is your turn.',
+                           retry_after=wait, retry_url=retry_url)
+    return page, 503, {'Retry-After': str(wait), 'Refresh': f'{wait}; url={retry_url}'}
+
+# --- Bulk Import / Export ---
+# Organizers can load events from CSV or JSON Lines and download their events
+# and ticket sales. Both directions stream: an import is parsed and validated
+# row by row and inserted in executemany chunks inside one write transaction;
+# an export is produced by a generator reading the cursor in chunks.
+# (Note that the import holds the write lock until it is done.)
+EVENT_IMPORT_FIELDS = ('title', 'description', 'location', 'date_time', 'price', 'capacity', 'category', 'image_url', 'status')
+EVENT_STATUSES = ('active', 'cancelled', 'completed')
+IMPORT_CHUNK_SIZE = 1000
+MAX_IMPORT_ERRORS = 100
+EXPORT_CHUNK_SIZE = 1000
+
+def read_import_rows(stream, fmt):
+    """Yield (line number, raw dict) from a text stream of CSV or JSON Lines; unparsable lines yield a str error"""
+    if fmt == 'csv':
+        reader = csv.DictReader(stream)
+        for row in reader:
+            yield reader.line_num, row
+        return
+    for line_no, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            yield line_no, 'not valid JSON'
+            continue
+        yield line_no, row if isinstance(row, dict) else 'expected a JSON object'
+
+def validate_event_row(raw):
+    """Turn one raw import row into an events tuple (in EVENT_IMPORT_FIELDS order); raises ValueError"""
+    def text(name, required=False, limit=200):
+        value = raw.get(name)
+        value = str(value).strip() if value is not None else ''
+        if required and not value:
+            raise ValueError(f'{name} is required')
+        if len(value) > limit:
+            raise ValueError(f'{name} is longer than {limit} characters')
+        return value or None
+    
+    date_time = parse_event_time(text('date_time', required=True)).strftime(EVENT_TIME_FORMAT)
+    try:
+        price = float(raw.get('price') or 0)
+        capacity = int(raw['capacity']) if raw.get('capacity') not in (None, '') else None
+    except (TypeError, ValueError, OverflowError):
+        raise ValueError('price and capacity must be numbers')
+    if not math.isfinite(price):
+        raise ValueError('price and capacity must be numbers')
+    if price < 0 or (capacity is not None and capacity <= 0):
+        raise ValueError('price must be >= 0 and capacity > 0')
+    status = text('status') or 'active'
+    if status not in EVENT_STATUSES:
+        raise ValueError(f'status must be one of {", ".join(EVENT_STATUSES)}')
+    return (text('title', required=True), text('description', limit=5000), text('location', required=True),
+            date_time, price, capacity, text('category', limit=50), text('image_url', limit=500), status)
+
+def import_events(conn, organizer_id, rows, strict=False):
+    """Insert events for an organizer from (line number, raw row) pairs in one transaction.
+
+    Invalid rows are skipped and reported, or with strict=True abort the whole import.
+    Returns {'imported', 'skipped', 'errors': [(line, message), ...]}.
+    """
+    result = {'imported': 0, 'skipped': 0, 'errors': []}
+    def insert(chunk):
+        conn.executemany('''INSERT INTO events (organizer_id, title, description, location, date_time,
+                                                price, capacity, category, image_url, status)
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', chunk)
+        result['imported'] += len(chunk)
     
-    # Insert sample events with proper organizer ID
-    for event in sample_events:
+    with write_transaction(conn):
+        chunk = []
+        for line_no, raw in rows:
+            try:
+                if isinstance(raw, str):
+                    raise ValueError(raw)
+                chunk.append((organizer_id,) + validate_event_row(raw))
+            except ValueError as e:
+                result['skipped'] += 1
+                if len(result['errors']) < MAX_IMPORT_ERRORS:
+                    result['errors'].append((line_no, str(e)))
+                if strict:
+                    raise ValueError(f'line {line_no}: {e}') from None
+                continue
+            if len(chunk) >= IMPORT_CHUNK_SIZE:
+                insert(chunk)
+                chunk = []
+        if chunk:
+            insert(chunk)
+    return result
+
+def import_format(filename, content_type=''):
+    """'csv' or 'jsonl' from an upload's file name or content type"""
+    if filename.lower().endswith(('.jsonl', '.ndjson', '.json')) or 'json' in content_type:
+        return 'jsonl'
+    return 'csv'
+
+# Both include the organizer's archived events and sales. Each is two queries run
+# one after the other, archived rows first (the archive holds the older events), so
+# each walks its indexes in order: one ORDER BY across a UNION would sort the
+# whole export in a temp b-tree before the first row goes out.
+EVENT_EXPORT_QUERIES = ('''
+    SELECT id, title, description, location, date_time, price, capacity, category,
+           image_url, status, tickets_sold, gross_revenue
+    FROM events_archive
+    WHERE organizer_id = ?1
+    ORDER BY starts_at, id''', '''
+    SELECT e.id, e.title, e.description, e.location, e.date_time, e.price, e.capacity, e.category,
+           e.image_url, e.status, e.tickets_sold, COALESCE(s.gross_revenue, 0) AS gross_revenue
+    FROM events e
+    LEFT JOIN event_stats s ON s.event_id = e.id
+    WHERE e.organizer_id = ?1
+    ORDER BY e.starts_at, e.id''')
+
+TICKET_EXPORT_QUERIES = ('''
+    SELECT t.id AS ticket_id, e.id AS event_id, e.title AS event_title, e.date_time AS event_date,
+           t.purchase_date, t.quantity, t.unit_price, t.quantity * t.unit_price AS total,
+           u.full_name AS buyer_name, u.email AS buyer_email
+    FROM events_archive e
+    JOIN tickets_archive t ON t.event_id = e.id
+    JOIN users u ON u.id = t.user_id
+    WHERE e.organizer_id = ?1
+    ORDER BY e.starts_at, e.id, t.purchased_at, t.id''', '''
+    SELECT t.id, e.id, e.title, e.date_time, t.purchase_date, t.quantity, t.unit_price, t.quantity * t.unit_price,
+           u.full_name, u.email
+    FROM events e
+    JOIN tickets t ON t.event_id = e.id
+    JOIN users u ON u.id = t.user_id
+    WHERE e.organizer_id = ?1
+    ORDER BY e.starts_at, e.id, t.purchased_at, t.id''')
+
+def export_chunks(conn, query, params, fmt):
+    """Generate CSV or JSON Lines text for a query, fetching EXPORT_CHUNK_SIZE rows at a time.
+
+    query may also be a tuple of queries with the same columns, exported one after the other.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    columns = None
+    for sql in (query,) if isinstance(query, str) else query:
+        cursor = conn.execute(sql, params)
+        if columns is None:
+            columns = [c[0] for c in cursor.description]
+            if fmt == 'csv':
+                writer.writerow(columns)
+        while True:
+            rows = cursor.fetchmany(EXPORT_CHUNK_SIZE)
+            if not rows:
+                break
+            if fmt == 'csv':
+                writer.writerows(rows)
+            else:
+                buffer.writelines(json.dumps(dict(zip(columns, row))) + '\n' for row in rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+        cursor.close()
+    if buffer.tell():
+        yield buffer.getvalue()  # a CSV header with no rows under it
+
+def export_rows(query, params, fmt):
+    """export_chunks() on a read-only connection of its own"""
+    # The response body is produced after the request has ended, so it can't use
+    # get_db(); a slow download holds a read connection, never one purchases need
+    with read_pool.connection() as conn:
+        yield from export_chunks(conn, query, params, fmt)
+
+def export_response(query, params, fmt, name):
+    mimetype = 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
+    filename = f'eventlink-{name}-{datetime.now():%Y%m%d}.{fmt}'
+    return Response(export_rows(query, params, fmt), mimetype=mimetype,
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+@app.cli.command('import-events')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--organizer', 'organizer_email', required=True, help='E-mail of the organizer who owns the events.')
+@click.option('--format', 'fmt', type=click.Choice(['csv', 'jsonl']), help='Defaults to the file extension.')
+@click.option('--strict', is_flag=True, help='Import nothing if any row is invalid.')
+def import_events_command(path, organizer_email, fmt, strict):
+    """Bulk-import events from a CSV or JSON Lines file."""
+    conn = get_db()
+    organizer = conn.execute('SELECT id FROM users WHERE email = ?', (organizer_email,)).fetchone()
+    if organizer is None:
+        raise click.ClickException(f'No user with e-mail {organizer_email}')
+    with open(path, newline='', encoding='utf-8-sig') as stream:
         try:
-            conn.execute('''
-                INSERT INTO events (organizer_id, title, description, location, date_time, 
-                                  price, capacity, category, image_url)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                organizer_id,
-                event['title'],
-                event['description'],
-                event['location'],
-                event['date_time'],
-                event['price'],
-                event['capacity'],
-                event['category'],
-                event['image_url']
-            ))
-        except sqlite3.Error as e:
-            print(f"Error inserting event {event['title']}: {e}")
-    
-    conn.commit()
-    conn.close()
-    print(f"Added {len(sample_events)} sample events to database")
+            result = import_events(conn, organizer['id'], read_import_rows(stream, fmt or import_format(path)), strict)
+        except ValueError as e:
+            raise click.ClickException(f'Import aborted, nothing was imported: {e}')
+    for line_no, message in result['errors']:
+        click.echo(f'line {line_no}: {message}', err=True)
+    click.echo(f"Imported {result['imported']} events, skipped {result['skipped']}.")
 
-# Initialize DB immediately
-with app.app_context():
-    init_db()
-    populate_sample_events()
+# --- Sales Reports ---
+# Downloadable sales reports for /payments, filtered by purchase date, archived
+# sales included. Running totals come from window functions, so the last line of
+# a report carries its totals. The per-day report reads the organizer_daily_sales rollup and is always
+# streamed. The per-ticket report streams too, except for organizers with more
+# than REPORT_ASYNC_ORDERS orders: then a background job writes it to
+# REPORTS_DIR once and later downloads are served from that file. A new sale
+# changes the file name, so a cached report is never stale.
+REPORT_ASYNC_ORDERS = int(os.environ.get('EVENTLINK_REPORT_ASYNC_ORDERS', 50000))
+REPORTS_DIR = os.environ.get('EVENTLINK_REPORTS_DIR', os.path.join(os.path.dirname(os.path.abspath(DB_NAME)), 'reports'))
+REPORT_MAX_AGE = 24 * 3600
+
+SALES_REPORTS = {
+    'tickets': '''
+        SELECT ticket_id, purchase_date, event_id, event_title, quantity, unit_price,
+               ROUND(quantity * unit_price, 2) AS gross,
+               ROUND(quantity * unit_price * :fee, 2) AS fee,
+               ROUND(quantity * unit_price * (1 - :fee), 2) AS net,
+               SUM(quantity) OVER running AS running_tickets,
+               ROUND(SUM(quantity * unit_price) OVER running, 2) AS running_gross,
+               ROUND(SUM(quantity * unit_price) OVER running * (1 - :fee), 2) AS running_net
+        FROM (SELECT t.id AS ticket_id, t.purchase_date, t.purchased_at, e.id AS event_id, e.title AS event_title,
+                     t.quantity, t.unit_price
+              FROM events e
+              JOIN tickets t ON t.event_id = e.id
+              WHERE e.organizer_id = :organizer
+                AND t.purchased_at >= CAST(strftime('%s', :start) AS INTEGER)
+                AND t.purchased_at < CAST(strftime('%s', :end) AS INTEGER)
+              UNION ALL
+              SELECT t.id, t.purchase_date, t.purchased_at, e.id, e.title, t.quantity, t.unit_price
+              FROM events_archive e
+              JOIN tickets_archive t ON t.event_id = e.id
+              WHERE e.organizer_id = :organizer
+                AND t.purchased_at >= CAST(strftime('%s', :start) AS INTEGER)
+                AND t.purchased_at < CAST(strftime('%s', :end) AS INTEGER))
+        WINDOW running AS (ORDER BY purchased_at, ticket_id ROWS UNBOUNDED PRECEDING)
+        ORDER BY purchased_at, ticket_id''',
+    'daily': '''
+        SELECT day, orders, tickets,
+               ROUND(gross_revenue, 2) AS gross,
+               ROUND(gross_revenue * :fee, 2) AS fees,
+               ROUND(gross_revenue * (1 - :fee), 2) AS net,
+               ROUND(SUM(gross_revenue) OVER running, 2) AS running_gross,
+               ROUND(SUM(gross_revenue) OVER running * (1 - :fee), 2) AS running_net
+        FROM organizer_daily_sales
+        WHERE organizer_id = :organizer AND day >= :start AND day < :end
+        WINDOW running AS (ORDER BY day ROWS UNBOUNDED PRECEDING)
+        ORDER BY day''',
+}
+
+def report_date_range(start, end):
+    """Validate YYYY-MM-DD bounds (both optional, end inclusive) into a half-open [start, end) text range"""
+    try:
+        start = datetime.strptime(start, '%Y-%m-%d').strftime('%Y-%m-%d') if start else '0000-01-01'
+        end = (datetime.strptime(end, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d') if end else '9999-12-31'
+    except ValueError:
+        raise ValueError('Report dates must be in YYYY-MM-DD format')
+    if end <= start:
+        raise ValueError('The report end date is before its start date')
+    return start, end
+
+def report_path(kind, fmt, params, orders):
+    """Where the cached report for these parameters and sales count lives"""
+    digest = hashlib.sha1(json.dumps([kind, params, orders], sort_keys=True).encode()).hexdigest()[:16]
+    return os.path.join(REPORTS_DIR, f"{params['organizer']}-{kind}-{digest}.{fmt}")
+
+@job_handler('sales_report')
+def build_sales_report(conn, payload):
+    """Write a report to disk for sales_report() to serve, replacing it atomically"""
+    os.makedirs(REPORTS_DIR, exist_ok=True)
+    partial = payload['path'] + '.partial'
+    with open(partial, 'w', newline='', encoding='utf-8') as f:
+        for chunk in export_chunks(conn, SALES_REPORTS[payload['kind']], payload['params'], payload['format']):
+            f.write(chunk)
+    os.replace(partial, payload['path'])
+    # Reports for older sales counts are never requested again
+    cutoff = time.time() - REPORT_MAX_AGE
+    for entry in os.scandir(REPORTS_DIR):
+        if entry.is_file() and entry.stat().st_mtime < cutoff:
+            os.remove(entry.path)
 
 # --- Routes ---
 
+# A buyer's tickets with their events, live and archived (see Event Archive), for :user_id.
+# Archived tickets have no QR code image: the door can no longer scan them.
+BUYER_TICKETS_SQL = '''
+    SELECT t.id, t.event_id, t.purchase_date, t.quantity, t.qr_code, e.title, e.date_time, e.starts_at,
+           e.location, e.price, e.image_url, u.full_name AS organizer_name,
+           a.ticket_id IS NOT NULL AS qr_ready, 0 AS archived
+    FROM tickets t
+    JOIN events e ON t.event_id = e.id
+    JOIN users u ON e.organizer_id = u.id
+    LEFT JOIN ticket_assets a ON a.ticket_id = t.id
+    WHERE t.user_id = :user_id
+    UNION ALL
+    SELECT t.id, t.event_id, t.purchase_date, t.quantity, t.qr_code, e.title, e.date_time, e.starts_at,
+           e.location, e.price, e.image_url, u.full_name, 0, 1
+    FROM tickets_archive t
+    JOIN events_archive e ON t.event_id = e.id
+    JOIN users u ON e.organizer_id = u.id
+    WHERE t.user_id = :user_id'''
+
+# The dashboard's most recent tickets
+RECENT_TICKETS_SQL = f'SELECT * FROM ({BUYER_TICKETS_SQL}) ORDER BY id DESC LIMIT :limit'
+
+def my_tickets_query(user_id, cursor, size):
+    """My Tickets' page query, newest events first, as (sql, params)"""
+    query = f'SELECT * FROM ({BUYER_TICKETS_SQL})'
+    params = {'user_id': user_id, 'limit': size + 1}
+    if cursor:
+        query += ' WHERE (starts_at, id) < (:starts_at, :id)'
+        params.update(starts_at=cursor[0], id=cursor[1])
+    return query + ' ORDER BY starts_at DESC, id DESC LIMIT :limit', params
+
 @app.route('/my_tickets')
 def my_tickets():
     """Display user's purchased tickets with QR codes"""
@@ -232,18 +3443,35 @@ def my_tickets():
     
     conn = get_db()
     
-    # Get user's tickets with event details
-    tickets = conn.execute('''
-        SELECT t.*, e.title, e.date_time, e.location, e.price, e.image_url, u.full_name as organizer_name
-        FROM tickets t
-        JOIN events e ON t.event_id = e.id
-        JOIN users u ON e.organizer_id = u.id
-        WHERE t.user_id = ?
-        ORDER BY e.date_time DESC
-    ''', (session['user_id'],)).fetchall()
+    size = page_size()
+    cursor = decode_cursor(request.args.get('cursor'))
+    
+    # Get user's tickets with event details, newest events first, archived events included
+    query, params = my_tickets_query(session['user_id'], cursor, size)
     
-    conn.close()
-    return render_template('my_tickets.html', tickets=tickets)
+    tickets, next_cursor = paginate(conn.execute(query, params).fetchall(), size, 'starts_at')
+    
+    return render_template('my_tickets.html', tickets=tickets, next_cursor=next_cursor,
+                           is_first_page=cursor is None, per_page=size)
+
+@app.route('/ticket/<int:ticket_id>/qr.svg')
+def ticket_qr(ticket_id):
+    """Serve a ticket's QR image, rendered once by the issue_ticket job"""
+    if 'user_id' not in session:
+        return redirect(url_for('login'))
+    
+    asset = get_db().execute('''SELECT a.qr_svg FROM ticket_assets a JOIN tickets t ON t.id = a.ticket_id
+                                WHERE a.ticket_id = ? AND t.user_id = ?''', (ticket_id, session['user_id'])).fetchone()
+    if asset is None:
+        return 'QR code not ready yet', 404
+    
+    response = make_response(asset['qr_svg'])
+    response.headers['Content-Type'] = 'image/svg+xml'
+    # A ticket's QR code never changes
+    response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+    return response
+
+USER_STATS_SQL = 'SELECT tickets as total_tickets, total_spent FROM user_stats WHERE user_id = ?'
 
 @app.route('/profile')
 def profile():
@@ -251,23 +3479,30 @@ def profile():
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    conn = get_db()
-    user = conn.execute('SELECT * FROM users WHERE id = ?', (session['user_id'],)).fetchone()
-    
-    # Get user's ticket statistics
-    stats = conn.execute('''
-        SELECT 
-            COUNT(*) as total_tickets,
-            SUM(e.price) as total_spent
-        FROM tickets t
-        JOIN events e ON t.event_id = e.id
-        WHERE t.user_id = ?
-    ''', (session['user_id'],)).fetchone()
+    conn = get_read_db(since=user_writes_version())
+    user = current_user()
     
-    conn.close()
+    # Get user's ticket statistics (maintained on purchase)
+    stats = conn.execute(USER_STATS_SQL, (session['user_id'],)).fetchone() or {'total_tickets': 0, 'total_spent': 0}
     
     return render_template('profile.html', user=user, stats=stats)
 
+# An organizer's events with their payment data from the per-event counters;
+# the totals across all events ride along on every row as window aggregates
+PAYMENTS_SQL = '''
+    SELECT e.*, 
+           COALESCE(s.orders, 0) as ticket_count,
+           e.tickets_sold as total_tickets_sold,
+           COALESCE(s.gross_revenue, 0) as gross_revenue,
+           COALESCE(s.gross_revenue, 0) * (1 - :fee) as net_revenue,
+           SUM(COALESCE(s.gross_revenue, 0)) OVER () as total_gross,
+           SUM(COALESCE(s.gross_revenue, 0)) OVER () * (1 - :fee) as total_net
+    FROM events e
+    LEFT JOIN event_stats s ON s.event_id = e.id
+    WHERE e.organizer_id = :organizer
+    ORDER BY e.starts_at DESC'''
+RECENT_PAYOUTS_SQL = 'SELECT * FROM payouts WHERE organizer_id = ? ORDER BY id DESC LIMIT 10'
+
 @app.route('/payments')
 def payments():
     """Organizer payments dashboard"""
@@ -278,34 +3513,69 @@ def payments():
         flash('Access denied. Organizers only.')
         return redirect(url_for('dashboard'))
     
-    conn = get_db()
-    
-    # Get organizer's events and payment data
-    events_with_payments = conn.execute('''
-        SELECT e.*, 
-               COUNT(t.id) as ticket_count,
-               SUM(t.quantity) as total_tickets_sold,
-               SUM(e.price * t.quantity) as gross_revenue,
-               SUM(e.price * t.quantity * 0.9) as net_revenue  -- 10% service fee
-        FROM events e
-        LEFT JOIN tickets t ON e.id = t.event_id
-        WHERE e.organizer_id = ?
-        GROUP BY e.id
-        ORDER BY e.date_time DESC
-    ''', (session['user_id'],)).fetchall()
+    conn = get_read_db(since=user_writes_version())
     
-    # Calculate totals
-    total_gross = sum([event['gross_revenue'] or 0 for event in events_with_payments])
-    total_net = sum([event['net_revenue'] or 0 for event in events_with_payments])
-    total_fees = total_gross - total_net
+    # Get organizer's events and payment data, totals included
+    events_with_payments = conn.execute(PAYMENTS_SQL, {'organizer': session['user_id'],
+                                                       'fee': PLATFORM_FEE_RATE}).fetchall()
     
-    conn.close()
+    totals = events_with_payments[0] if events_with_payments else {'total_gross': 0, 'total_net': 0}
+    payouts = conn.execute(RECENT_PAYOUTS_SQL, (session['user_id'],)).fetchall()
     
     return render_template('payments.html', 
                          events=events_with_payments,
-                         total_gross=total_gross,
-                         total_net=total_net,
-                         total_fees=total_fees)
+                         total_gross=totals['total_gross'],
+                         total_net=totals['total_net'],
+                         total_fees=totals['total_gross'] - totals['total_net'],
+                         balance=organizer_balance(conn, session['user_id']),
+                         payouts=payouts,
+                         min_payout=MIN_PAYOUT,
+                         idempotency_key=uuid.uuid4().hex)
+
+@app.route('/payments/report')
+def sales_report():
+    """Download a per-ticket or per-day sales report for a purchase date range as CSV or JSON Lines"""
+    if session.get('role') != 'organizer':
+        flash('Access denied. Organizers only.')
+        return redirect(url_for('dashboard'))
+    
+    kind = request.args.get('kind') if request.args.get('kind') in SALES_REPORTS else 'tickets'
+    fmt = 'jsonl' if request.args.get('format') == 'jsonl' else 'csv'
+    try:
+        start, end = report_date_range(request.args.get('start'), request.args.get('end'))
+    except ValueError as e:
+        flash(str(e))
+        return redirect(url_for('payments'))
+    params = {'organizer': session['user_id'], 'start': start, 'end': end, 'fee': PLATFORM_FEE_RATE}
+    
+    conn = get_db()
+    orders = conn.execute('SELECT orders FROM organizer_stats WHERE organizer_id = ?', (session['user_id'],)).fetchone()
+    orders = orders['orders'] if orders else 0
+    if kind == 'daily' or orders <= REPORT_ASYNC_ORDERS:
+        return export_response(SALES_REPORTS[kind], params, fmt, f'{kind}-sales')
+    
+    # Too big to build while the browser waits: serve the cached file, or have a job build it
+    path = report_path(kind, fmt, params, orders)
+    if os.path.exists(path):
+        return send_file(path, mimetype='text/csv' if fmt == 'csv' else 'application/x-ndjson', as_attachment=True,
+                         download_name=f'eventlink-{kind}-sales-{datetime.now():%Y%m%d}.{fmt}')
+    payload = {'kind': kind, 'format': fmt, 'params': params, 'path': path}
+    # Checked with a plain read first, so refreshing while the job runs doesn't take the write lock
+    find_job = "SELECT id, status FROM jobs WHERE kind = 'sales_report' AND payload = ? ORDER BY status = 'failed' LIMIT 1"
+    job = conn.execute(find_job, (json.dumps(payload, sort_keys=True),)).fetchone()
+    if job is not None and job['status'] == 'failed':
+        # Out of retries: say so, and clear it so that asking again starts a new job
+        conn.execute('DELETE FROM jobs WHERE id = ?', (job['id'],))
+        conn.commit()
+        flash('Your report could not be prepared. Please try again in a few minutes.')
+        return redirect(url_for('payments'))
+    if job is None:
+        with write_transaction(conn):
+            job = conn.execute(find_job, (json.dumps(payload, sort_keys=True),)).fetchone()
+            if job is None or job['status'] == 'failed':
+                job_queue.enqueue(conn, 'sales_report', payload)
+    return ('Your report is being prepared; this page will refresh when it is ready.', 202,
+            {'Retry-After': '5', 'Refresh': '5', 'Content-Type': 'text/plain; charset=utf-8'})
 
 @app.route('/organizer_checkout', methods=['POST'])
 def organizer_checkout():
@@ -317,19 +3587,33 @@ def organizer_checkout():
         flash('Access denied. Organizers only.')
         return redirect(url_for('dashboard'))
     
-    amount = float(request.form.get('amount', 0))
+    try:
+        amount = float(request.form.get('amount', 0))
+    except ValueError:
+        amount = 0
     destination = request.form.get('destination')
     
-    if amount <= 0:
+    # NaN passes every comparison below, and the ledger can't store it
+    if not math.isfinite(amount) or amount <= 0:
         flash('Invalid payout amount')
         return redirect(url_for('payments'))
     
-    if amount < 10.00:
-        flash('Minimum payout amount is $10.00')
+    if not destination:
+        flash('Please choose a payout destination')
         return redirect(url_for('payments'))
     
-    # Simulate payout processing
-    flash(f'Payout request for ${amount:.2f} to {destination} submitted successfully! Funds will be transferred within 3-5 business days.')
+    # The form carries a key rendered with the page, so a double submit is one payout
+    key = request.headers.get('Idempotency-Key') or request.form.get('idempotency_key') or uuid.uuid4().hex
+    try:
+        payout, created = request_payout(get_db(), session['user_id'], amount, destination, key)
+    except PayoutError as e:
+        flash(str(e))
+        return redirect(url_for('payments'))
+    
+    if created:
+        flash(f'Payout request for ${payout["amount"]:.2f} to {payout["destination"]} submitted successfully! Funds will be transferred within 3-5 business days.')
+    else:
+        flash(f'Payout request for ${payout["amount"]:.2f} was already submitted.')
     return redirect(url_for('payments'))
 
 @app.route('/settings')
@@ -338,61 +3622,122 @@ def settings():
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    conn = get_db()
-    user = conn.execute('SELECT * FROM users WHERE id = ?', (session['user_id'],)).fetchone()
-    conn.close()
-    
-    return render_template('settings.html', user=user)
+    return render_template('settings.html', user=current_user())
+
+# --- Event Search ---
+# bm25 column weights for (title, description, location): a hit in the title
+# counts far more than one buried in the description
+SEARCH_WEIGHTS = '10.0, 1.0, 4.0'
+SEARCH_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+def search_match_expression(search_query):
+    """Turn free text into an FTS5 MATCH expression where every word is a prefix term"""
+    # Quoting each token keeps FTS5 operators (AND, NEAR, column:...) in user input literal
+    tokens = SEARCH_TOKEN_RE.findall(search_query or '')[:10]
+    return ' '.join(f'"{token}"*' for token in tokens)
 
 @app.route('/events')
 def events_list():
-    """Display all active events with filtering options"""
+    """Display active events with filtering options: upcoming ones by default, ?view=past for those that started"""
     if 'user_id' not in session:
         return redirect(url_for('login'))
     
-    conn = get_db()
-    
     # Get filter parameters
     category_filter = request.args.get('category', '')
     search_query = request.args.get('search', '')
+    view = 'past' if request.args.get('view') == 'past' else 'upcoming'
     
-    # Build query with filters
-    query = 'SELECT e.*, u.full_name as organizer_name FROM events e JOIN users u ON e.organizer_id = u.id WHERE e.status = ?'
-    params = ['active']
-    
-    if category_filter:
-        query += ' AND e.category = ?'
-        params.append(category_filter)
+    size = page_size()
+    cursor = decode_cursor(request.args.get('cursor'))
+    version = cache_version('events_list')
+    conn = get_read_db(since=version)
+    # Events leave the upcoming view as they start, so the minute is part of the key
+    now = wall_clock_epoch()
+    cache_key = json.dumps([category_filter, search_query, view, now, cursor, size])
     
-    if search_query:
-        query += ' AND (e.title LIKE ? OR e.description LIKE ? OR e.location LIKE ?)'
-        search_term = f'%{search_query}%'
-        params.extend([search_term, search_term, search_term])
+    def load_page():
+        return _events_list_page(conn, category_filter, search_query, cursor, size, view, now)
     
-    query += ' ORDER BY e.date_time ASC'
+    def render():
+        events, next_cursor = cached('events_list', version, 'page:' + cache_key, load_page)
+        # Get all categories for filter dropdown
+        categories = cached('events_list', version, 'categories', lambda: [dict(row) for row in conn.execute(
+            EVENT_CATEGORIES_SQL, ['active'])])
+        return render_template('events_list.html', events=events, categories=categories, 
+                              current_category=category_filter, current_search=search_query, current_view=view,
+                              next_cursor=next_cursor, is_first_page=cursor is None, per_page=size)
     
-    events = conn.execute(query, params).fetchall()
+    return conditional_response(version, [session['user_id'], session.get('role'), cache_key], render)
+
+EVENT_CATEGORIES_SQL = 'SELECT DISTINCT category FROM events WHERE status = ? AND category IS NOT NULL'
+
+def _events_list_page(conn, category_filter, search_query, cursor, size, view='upcoming', now=None):
+    """One page of active events for the given filters, as (events, next_cursor).
+
+    'upcoming' lists events starting at or after now, soonest first; 'past' the
+    ones before it, most recent first.
+    """
+    now = wall_clock_epoch() if now is None else now
+    query, params, sort_key = events_list_query(category_filter, search_query, cursor, size, view, now)
+    events, next_cursor = paginate(conn.execute(query, params).fetchall(), size, sort_key)
+    return [dict(event) for event in events], next_cursor
+
+def events_list_query(category_filter, search_query, cursor, size, view, now):
+    """The events list's page query as (sql, params, the column its cursor sorts on)"""
+    # Build query with filters
+    filters = 'e.status = ? AND e.starts_at ' + ('< ?' if view == 'past' else '>= ?')
+    params = ['active', now]
     
-    # Get all categories for filter dropdown
-    categories = conn.execute('SELECT DISTINCT category FROM events WHERE status = ? AND category IS NOT NULL', ['active']).fetchall()
+    if category_filter:
+        filters += ' AND e.category = ?'
+        params.append(category_filter)
     
-    conn.close()
+    match = search_match_expression(search_query)
+    if match:
+        # Full-text search: rank by relevance, the category filter runs in the same query
+        query = f'''SELECT * FROM (
+                        SELECT e.*, u.full_name as organizer_name, bm25(events_fts, {SEARCH_WEIGHTS}) AS score
+                        FROM events_fts f
+                        JOIN events e ON e.id = f.rowid
+                        JOIN users u ON e.organizer_id = u.id
+                        WHERE events_fts MATCH ? AND {filters}
+                    ) WHERE 1'''
+        params = [match] + params
+        sort_column, id_column, order = 'score', 'id', 'ASC'
+    else:
+        query = f'SELECT e.*, u.full_name as organizer_name FROM events e JOIN users u ON e.organizer_id = u.id WHERE {filters}'
+        sort_column, id_column = 'e.starts_at', 'e.id'
+        order = 'DESC' if view == 'past' else 'ASC'
+        if search_query:
+            # Nothing searchable (only punctuation), so nothing can match
+            query += ' AND 0'
     
-    return render_template('events_list.html', events=events, categories=categories, 
-                          current_category=category_filter, current_search=search_query)
+    if cursor:
+        query += f" AND ({sort_column}, {id_column}) {'<' if order == 'DESC' else '>'} (?, ?)"
+        params.extend(cursor)
+    query += f' ORDER BY {sort_column} {order}, {id_column} {order} LIMIT ?'
+    params.append(size + 1)
+    return query, params, 'score' if match else 'starts_at'
+
+EVENT_DETAIL_SQL = '''
+    SELECT e.*, u.full_name as organizer_name 
+    FROM events e 
+    JOIN users u ON e.organizer_id = u.id 
+    WHERE e.id = ?'''
+HAS_TICKET_SQL = 'SELECT 1 FROM tickets WHERE user_id = ? AND event_id = ? LIMIT 1'
 
 @app.route('/event/<int:event_id>')
 def event_detail(event_id):
     """Display detailed information about a specific event"""
-    conn = get_db()
+    namespace = f'event:{event_id}'
+    version = cache_version(namespace)
+    conn = get_read_db(since=version)
     
     # Get event with organizer info
-    event = conn.execute('''
-        SELECT e.*, u.full_name as organizer_name 
-        FROM events e 
-        JOIN users u ON e.organizer_id = u.id 
-        WHERE e.id = ?
-    ''', (event_id,)).fetchone()
+    def load_event():
+        event = conn.execute(EVENT_DETAIL_SQL, (event_id,)).fetchone()
+        return dict(event) if event else None
+    event = cached(namespace, version, 'row', load_event)
     
     if not event:
         flash('Event not found')
@@ -401,17 +3746,23 @@ def event_detail(event_id):
     # Check if user has purchased ticket for this event
     has_ticket = False
     if 'user_id' in session:
-        ticket = conn.execute('SELECT * FROM tickets WHERE user_id = ? AND event_id = ?', 
-                             (session['user_id'], event_id)).fetchone()
+        ticket = conn.execute(HAS_TICKET_SQL, (session['user_id'], event_id)).fetchone()
         has_ticket = ticket is not None
     
-    # Get ticket count for this event
-    ticket_count = conn.execute('SELECT COUNT(*) as count FROM tickets WHERE event_id = ?', 
-                               (event_id,)).fetchone()['count']
+    # Seats sold are kept on the event row by the purchase engine
+    ticket_count = event['tickets_sold']
     
-    conn.close()
+    def render():
+        # The organizer configures door devices with the event's scanner token
+        door_token = checkin_token(event_id) if session.get('user_id') == event['organizer_id'] else None
+        return render_template('event_detail.html', event=event, has_ticket=has_ticket, ticket_count=ticket_count,
+                               door_token=door_token, availability_mode=availability_mode(),
+                               availability_refresh=AVAILABILITY_REFRESH_SECONDS)
     
-    return render_template('event_detail.html', event=event, has_ticket=has_ticket, ticket_count=ticket_count)
+    if 'user_id' not in session:
+        # Anonymous visitors all see the same page, so cache the rendered HTML
+        return conditional_response(version, [None], lambda: cached(namespace, version, 'anonymous_page', render))
+    return conditional_response(version, [session.get('user_id'), session.get('role'), has_ticket], render)
 
 @app.route('/edit_event/<int:event_id>', methods=['GET', 'POST'])
 def edit_event(event_id):
@@ -430,32 +3781,48 @@ def edit_event(event_id):
         return redirect(url_for('dashboard'))
     
     if request.method == 'POST':
-        # Update event
-        conn.execute('''
-            UPDATE events 
-            SET title = ?, description = ?, location = ?, date_time = ?, 
-                price = ?, capacity = ?, category = ?, status = ?
-            WHERE id = ? AND organizer_id = ?
-        ''', (
-            request.form['title'],
-            request.form.get('description', ''),
-            request.form['location'],
-            request.form['date_time'],
-            float(request.form['price']),
-            int(request.form.get('capacity', 0)) if request.form.get('capacity') else None,
-            request.form.get('category', ''),
-            request.form.get('status', 'active'),
-            event_id,
-            session['user_id']
-        ))
-        conn.commit()
-        conn.close()
+        try:
+            date_time = parse_event_time(request.form['date_time']).strftime(EVENT_TIME_FORMAT)
+            try:
+                price = float(request.form['price'])
+                capacity = int(request.form['capacity']) if request.form.get('capacity') else None
+                if not math.isfinite(price):
+                    raise ValueError
+            except ValueError:
+                raise ValueError('Price and capacity must be numbers')
+            
+            # Update event; sales can't move while the write lock is held, so the
+            # capacity check below still holds when the update lands
+            with write_transaction(conn):
+                sold = conn.execute('SELECT tickets_sold FROM events WHERE id = ?', (event_id,)).fetchone()[0]
+                if capacity and capacity < sold:
+                    raise ValueError(f'Capacity can\'t be lower than the {sold} tickets already sold')
+                conn.execute('''
+                    UPDATE events 
+                    SET title = ?, description = ?, location = ?, date_time = ?, 
+                        price = ?, capacity = ?, category = ?, status = ?
+                    WHERE id = ? AND organizer_id = ?
+                ''', (
+                    request.form['title'],
+                    request.form.get('description', ''),
+                    request.form['location'],
+                    date_time,
+                    price,
+                    capacity,
+                    request.form.get('category', ''),
+                    request.form.get('status', 'active'),
+                    event_id,
+                    session['user_id']
+                ))
+        except ValueError as e:
+            flash(str(e))
+            return redirect(url_for('edit_event', event_id=event_id))
+        publish_availability(conn, [event_id])
         flash('Event updated successfully!')
         return redirect(url_for('dashboard'))
     
     # Get categories for dropdown
     categories = conn.execute('SELECT * FROM categories').fetchall()
-    conn.close()
     
     return render_template('edit_event.html', event=event, categories=categories)
 
@@ -478,7 +3845,6 @@ def delete_event(event_id):
     # Delete event (this will cascade delete tickets due to foreign key constraint)
     conn.execute('DELETE FROM events WHERE id = ?', (event_id,))
     conn.commit()
-    conn.close()
     
     flash('Event deleted successfully!')
     return redirect(url_for('dashboard'))
@@ -495,19 +3861,21 @@ def login():
         email = request.form['email']
         password = request.form['password']
         
-        conn = None
-        try:
-            conn = get_db()
-            user = conn.execute('SELECT * FROM users WHERE email = ?', (email,)).fetchone()
-        finally:
-            if conn:
-                conn.close()
+        user = get_db().execute('SELECT * FROM users WHERE email = ?', (email,)).fetchone()
+        # Give the connection back while the hash runs, so a burst of logins
+        # waiting on the hashing pool doesn't also drain the connection pool
+        return_db()
         
-        if user and check_password_hash(user['password'], password):
+        valid, new_hash = password_hasher.verify(user['password'], password) if user else (False, None)
+        if valid:
+            if new_hash:
+                # Hash parameters changed since this password was stored: upgrade it now that we know it
+                conn = get_db()
+                conn.execute('UPDATE users SET password = ? WHERE id = ?', (new_hash, user['id']))
+                conn.commit()
+            session.regenerate()
             session['user_id'] = user['id']
-            session['role'] = user['role']
-            session['name'] = user['full_name']
-            session.modified = True
+            remember_user(user)
             return redirect(url_for('dashboard'))
         else:
             flash('Invalid credentials')
@@ -518,76 +3886,70 @@ def login():
 def signup():
     if request.method == 'POST':
         email = request.form['email']
-        password = generate_password_hash(request.form['password'])
+        password = password_hasher.hash(request.form['password'])
         full_name = request.form['full_name']
         
-        conn = None
+        conn = get_db()
         try:
-            conn = get_db()
-            cursor = conn.cursor()
-            cursor.execute('INSERT INTO users (email, password, full_name) VALUES (?, ?, ?)',
-                         (email, password, full_name))
+            cursor = conn.execute('INSERT INTO users (email, password, full_name) VALUES (?, ?, ?)',
+                                  (email, password, full_name))
             conn.commit()
             user_id = cursor.lastrowid
-            print(f"DEBUG: User created with ID: {user_id}")
         except sqlite3.IntegrityError:
-            if conn:
-                conn.close()
+            conn.rollback()
             flash('Email already exists')
             return render_template('login.html', mode='signup')
-        except Exception as e:
-            if conn:
-                conn.close()
-            print(f"DEBUG: Database error: {e}")
+        except Exception:
+            conn.rollback()
+            app.logger.exception('Signup failed')
             flash('An error occurred. Please try again.')
             return render_template('login.html', mode='signup')
-        finally:
-            if conn:
-                conn.close()
         
         # Auto-login to set role
+        session.regenerate()
         session['user_id'] = user_id
         session['name'] = full_name
         session['role'] = 'pending'  # Temporary role until selection
         session.modified = True  # Explicitly mark session as modified
-        print(f"DEBUG: User signed up with ID: {user_id}, Session: {dict(session)}")  # Debug line
+        app.logger.info('User %s signed up', user_id)
         return redirect(url_for('select_role'))
             
     return render_template('login.html', mode='signup')
 
 @app.route('/select_role', methods=['GET', 'POST'])
 def select_role():
-    print(f"DEBUG: Accessing select_role. Session: {dict(session)}")  # Debug line
-    print(f"DEBUG: Request method: {request.method}")
-    
     if 'user_id' not in session:
-        print("DEBUG: No user_id in session, redirecting to login")
         flash('Please sign up first')
         return redirect(url_for('login'))
     
     if request.method == 'POST':
         role = request.form['role']
-        print(f"DEBUG: Setting role to: {role} for user_id: {session['user_id']}")
         
-        conn = None
-        try:
-            conn = get_db()
-            conn.execute('UPDATE users SET role = ? WHERE id = ?', (role, session['user_id']))
-            conn.commit()
-        finally:
-            if conn:
-                conn.close()
+        conn = get_db()
+        conn.execute('UPDATE users SET role = ? WHERE id = ?', (role, session['user_id']))
+        conn.commit()
+        invalidate_user(conn, session['user_id'])
         
         session['role'] = role
         session.modified = True  # Explicitly mark session as modified
         flash(f'Welcome! You are now registered as a {role}.')
-        print(f"DEBUG: Role set successfully, session now: {dict(session)}")
-        print(f"DEBUG: Redirecting to dashboard")
+        app.logger.info('User %s registered as %s', session['user_id'], role)
         return redirect(url_for('dashboard'))
         
-    print("DEBUG: Rendering role selection form")
     return render_template('role_selection.html')
 
+# ?1 is now, ?2 the end of the "upcoming" window, ?3 the organizer
+ORGANIZER_SUMMARY_SQL = '''
+    SELECT COUNT(*) + (SELECT COUNT(*) FROM events_archive WHERE organizer_id = ?3) as total_events,
+           COALESCE(SUM(starts_at >= ?1 AND starts_at < ?2), 0) as upcoming_events
+    FROM events WHERE organizer_id = ?3'''
+ORGANIZER_UPCOMING_SQL = '''
+    SELECT e.*, COALESCE(s.gross_revenue, 0) as gross_revenue
+    FROM events e LEFT JOIN event_stats s ON s.event_id = e.id
+    WHERE e.organizer_id = ? AND e.starts_at >= ?
+    ORDER BY e.starts_at ASC, e.id ASC LIMIT ?'''
+UPCOMING_EVENTS_SQL = 'SELECT * FROM events WHERE status = ? AND starts_at >= ? ORDER BY starts_at ASC, id ASC LIMIT ?'
+
 @app.route('/dashboard')
 def dashboard():
     if 'user_id' not in session: return redirect(url_for('login'))
@@ -595,43 +3957,90 @@ def dashboard():
     conn = get_db()
     
     if session['role'] == 'organizer':
-        events = conn.execute('SELECT * FROM events WHERE organizer_id = ?', (session['user_id'],)).fetchall()
-        # Mock analytics
-        revenue = sum([e['price'] for e in events]) * 15 
-        attendees = len(events) * 15
-        conn.close()
-        return render_template('dashboard_org.html', events=events, revenue=revenue, attendees=attendees)
+        now = wall_clock_epoch()
+        summary = conn.execute(ORGANIZER_SUMMARY_SQL, (now, now + 30 * 24 * 3600, session['user_id'])).fetchone()
+        # Only the widget's rows are loaded, not every event the organizer owns
+        events = conn.execute(ORGANIZER_UPCOMING_SQL, (session['user_id'], now, DASHBOARD_ORG_EVENTS)).fetchall()
+        analytics = organizer_analytics(conn, session['user_id'])
+        return render_template('dashboard_org.html', events=events, analytics=analytics,
+                               revenue=analytics['revenue'], attendees=analytics['attendees'],
+                               total_events=summary['total_events'], upcoming_events=summary['upcoming_events'])
     
     else:
-        # Show all events
-        all_events = conn.execute('SELECT * FROM events').fetchall()
-        # Show my tickets
-        my_tickets = conn.execute('''
-            SELECT t.*, e.title, e.date_time, e.location, e.price 
-            FROM tickets t
-            JOIN events e ON t.event_id = e.id
-            WHERE t.user_id = ?
-        ''', (session['user_id'],)).fetchall()
-        conn.close()
-        return render_template('dashboard_user.html', events=all_events, my_tickets=my_tickets)
+        # Show the next few events
+        events = conn.execute(UPCOMING_EVENTS_SQL, ('active', wall_clock_epoch(), DASHBOARD_EVENTS)).fetchall()
+        # Show my most recent tickets
+        my_tickets = conn.execute(RECENT_TICKETS_SQL, {'user_id': session['user_id'],
+                                                       'limit': DASHBOARD_TICKETS}).fetchall()
+        return render_template('dashboard_user.html', events=events, my_tickets=my_tickets)
 
 @app.route('/create_event', methods=['POST'])
 def create_event():
     if session.get('role') != 'organizer': return redirect(url_for('dashboard'))
     
+    try:
+        date_time = parse_event_time(request.form['date_time']).strftime(EVENT_TIME_FORMAT)
+    except ValueError as e:
+        flash(str(e))
+        return redirect(url_for('dashboard'))
+    
     conn = get_db()
     conn.execute('''INSERT INTO events (organizer_id, title, description, location, date_time, price, capacity, category)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)''',
                  (session['user_id'], request.form['title'], request.form.get('description', ''), 
-                  request.form['location'], request.form['date_time'], 
+                  request.form['location'], date_time, 
                   float(request.form['price']), 
                   int(request.form.get('capacity', 0)) if request.form.get('capacity') else None,
                   request.form.get('category', '')))
     conn.commit()
-    conn.close()
     flash('Event created successfully!')
     return redirect(url_for('dashboard'))
 
+@app.route('/events/import', methods=['POST'])
+def import_events_upload():
+    """Bulk-import events from an uploaded file (form) or a raw CSV / JSON Lines request body (API)"""
+    if session.get('role') != 'organizer': return redirect(url_for('dashboard'))
+    
+    upload = request.files.get('file')
+    if upload is not None:
+        fmt = request.form.get('format') or import_format(upload.filename or '', upload.mimetype)
+        stream = io.TextIOWrapper(upload.stream, encoding='utf-8-sig', newline='')
+    else:
+        fmt = request.args.get('format') or import_format('', request.mimetype)
+        stream = io.TextIOWrapper(request.stream, encoding='utf-8-sig', newline='')
+    strict = (request.values.get('strict') or '').lower() in ('1', 'true', 'on')
+    
+    try:
+        result = import_events(get_db(), session['user_id'], read_import_rows(stream, fmt), strict)
+    except (ValueError, UnicodeDecodeError, csv.Error) as e:
+        if upload is None:
+            return jsonify(imported=0, error=str(e)), 400
+        flash(f'Import aborted, nothing was imported: {e}')
+        return redirect(url_for('dashboard'))
+    
+    if upload is None:
+        return jsonify(result)
+    message = f"Imported {result['imported']} events"
+    if result['skipped']:
+        message += f", skipped {result['skipped']} invalid rows (" + '; '.join(
+            f'line {line}: {error}' for line, error in result['errors'][:5]) + ')'
+    flash(message)
+    return redirect(url_for('dashboard'))
+
+@app.route('/events/export')
+def export_events():
+    """Stream the organizer's events with their sales totals as CSV or JSON Lines"""
+    if session.get('role') != 'organizer': return redirect(url_for('dashboard'))
+    fmt = 'jsonl' if request.args.get('format') == 'jsonl' else 'csv'
+    return export_response(EVENT_EXPORT_QUERIES, (session['user_id'],), fmt, 'events')
+
+@app.route('/events/export/tickets')
+def export_ticket_sales():
+    """Stream every ticket sold for the organizer's events as CSV or JSON Lines"""
+    if session.get('role') != 'organizer': return redirect(url_for('dashboard'))
+    fmt = 'jsonl' if request.args.get('format') == 'jsonl' else 'csv'
+    return export_response(TICKET_EXPORT_QUERIES, (session['user_id'],), fmt, 'ticket-sales')
+
 @app.route('/checkout/<int:event_id>')
 def checkout(event_id):
     """Display checkout page for event ticket purchase"""
@@ -639,13 +4048,25 @@ def checkout(event_id):
     
     conn = get_db()
     event = conn.execute('SELECT * FROM events WHERE id = ?', (event_id,)).fetchone()
-    conn.close()
     
     if not event:
         flash('Event not found')
         return redirect(url_for('events_list'))
     
-    return render_template('checkout.html', event=event)
+    wait = rate_limiter.admit(event_id)
+    if wait:
+        return waiting_room_response(event_id, wait)
+    
+    # Hold the seats while the buyer fills in the payment form
+    quantity = parse_quantity(request.args.get('quantity'))
+    try:
+        place_hold(conn, event_id, session['user_id'], quantity)
+    except PurchaseError as e:
+        flash(str(e))
+        return redirect(url_for('event_detail', event_id=event_id))
+    
+    return render_template('checkout.html', event=event, quantity=quantity,
+                           hold_minutes=HOLD_SECONDS // 60, max_quantity=MAX_TICKETS_PER_ORDER)
 
 @app.route('/save_payment_method', methods=['POST'])
 def save_payment_method():
@@ -677,7 +4098,7 @@ def save_payment_method():
         WHERE id = ?
     ''', (masked_card, card_number[-4:], session['user_id']))
     conn.commit()
-    conn.close()
+    invalidate_user(conn, session['user_id'])
     
     flash('Payment method saved successfully!')
     return redirect(url_for('settings'))
@@ -687,56 +4108,381 @@ def process_payment():
     """Process card payment for event ticket"""
     if 'user_id' not in session: return redirect(url_for('login'))
     
-    event_id = request.form.get('event_id')
+    try:
+        event_id = int(request.form.get('event_id', ''))
+    except ValueError:
+        flash('Event not found')
+        return redirect(url_for('events_list'))
     card_number = request.form.get('card_number')
     expiry_date = request.form.get('expiry_date')
     cvv = request.form.get('cvv')
     
     # Validate payment details (basic validation)
-    if not all([event_id, card_number, expiry_date, cvv]):
+    if not all([card_number, expiry_date, cvv]):
         flash('Please fill in all payment details')
-        return redirect(url_for('checkout', event_id=event_id))
+        return redirect(url_for('checkout', event_id=event_id, quantity=request.form.get('quantity')))
     
     # Simulate payment processing
     if len(card_number.replace(' ', '')) != 16:
         flash('Invalid card number')
-        return redirect(url_for('checkout', event_id=event_id))
+        return redirect(url_for('checkout', event_id=event_id, quantity=request.form.get('quantity')))
     
-    conn = get_db()
-    
-    # Generate QR code content
-    import uuid
-    qr_content = f"EVENTLINK-TICKET-{uuid.uuid4().hex[:8]}-{session['user_id']}-{event_id}"
-    
-    # Insert ticket
-    conn.execute('INSERT INTO tickets (user_id, event_id, purchase_date, qr_code) VALUES (?, ?, ?, ?)',
-                 (session['user_id'], event_id, datetime.now().strftime("%Y-%m-%d %H:%M"), qr_content))
-    conn.commit()
-    conn.close()
+    quantity = parse_quantity(request.form.get('quantity'))
+    wait = rate_limiter.admit(event_id)
+    if wait:
+        return waiting_room_response(event_id, wait)
+    try:
+        buy_tickets(event_id, session['user_id'], quantity)
+    except PurchaseError as e:
+        flash(str(e))
+        return redirect(url_for('event_detail', event_id=event_id))
     
-    flash('Payment successful! Ticket purchased.')
+    flash('Payment successful! Ticket purchased.' if quantity == 1 else f'Payment successful! {quantity} tickets purchased.')
     return redirect(url_for('my_tickets'))
 
 @app.route('/buy_ticket/<int:event_id>')
 def buy_ticket(event_id):
     if 'user_id' not in session: return redirect(url_for('login'))
     
-    conn = get_db()
-    # Generate QR code content (ticket ID + user ID + event ID)
-    import uuid
-    qr_content = f"EVENTLINK-TICKET-{uuid.uuid4().hex[:8]}-{session['user_id']}-{event_id}"
-    
-    conn.execute('INSERT INTO tickets (user_id, event_id, purchase_date, qr_code) VALUES (?, ?, ?, ?)',
-                 (session['user_id'], event_id, datetime.now().strftime("%Y-%m-%d %H:%M"), qr_content))
-    conn.commit()
+    wait = rate_limiter.admit(event_id)
+    if wait:
+        return waiting_room_response(event_id, wait)
+    try:
+        buy_tickets(event_id, session['user_id'])
+    except PurchaseError as e:
+        flash(str(e))
+        return redirect(url_for('event_detail', event_id=event_id))
     flash('Ticket purchased successfully!')
     return redirect(url_for('my_tickets'))
 
+@app.route('/health')
+def health():
+    """Liveness probe; internal callers also get connection pool, cache and queue stats"""
+    try:
+        get_db().execute('SELECT 1').fetchone()
+        status = 'ok'
+    except sqlite3.Error:
+        status = 'error'
+    code = 200 if status == 'ok' else 503
+    if not internal_caller():
+        return jsonify(status=status), code
+    reads = {'mode': READ_MODE, 'pool': read_pool.snapshot(),
+             'snapshot': snapshot_replica.snapshot() if snapshot_replica is not None else None}
+    purchases = purchase_batcher.snapshot() if purchase_batcher is not None else None
+    return jsonify(status=status, db_pool=db_pool.snapshot(), reads=reads, purchases=purchases, cache=response_cache.snapshot(),
+                   rate_limits=rate_limiter.snapshot(), password_hashing=password_hasher.snapshot(), checkins=checkin_stats,
+                   archive=archive_stats, availability=availability_hub.snapshot(), logging=log_handler.snapshot(),
+                   jobs=job_queue.snapshot(get_db()) if status == 'ok' else None), code
+
+@app.route('/metrics')
+def metrics():
+    """Prometheus scrape endpoint for this worker, for internal callers only"""
+    if not internal_caller():
+        return 'Forbidden', 403
+    return request_metrics.render(db_pool.snapshot(), password_hasher.snapshot()), 200, {'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'}
+
+@app.context_processor
+def inject_now():
+    # payments.html compares event dates against now()
+    return {'now': datetime.now}
+
 @app.route('/logout')
 def logout():
     session.clear()
     return redirect(url_for('login'))
 
+# --- Door Check-in ---
+# A ticket's QR code is redeemed once, at the door. Codes are found through the
+# unique index on tickets.qr_code, and redeeming one is an INSERT into checkins
+# keyed by ticket id, so two doors scanning the same code at once can't both
+# admit it. Door devices send the event's scanner token (shown to the organizer
+# on the event page) as a bearer token, or use the organizer's own session.
+# Before doors open a device downloads the event's manifest and keeps the codes
+# in a set, so it can go on scanning if the network drops. Offline scans are
+# uploaded in batches and applied in the order they happened in one transaction;
+# anything the device let in that the server would have refused is recorded in
+# checkin_conflicts for the organizer. Uploading the same batch twice is harmless.
+MAX_SYNC_SCANS = 5000
+CHECKIN_TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+CHECKIN_STATUS_CODES = {'admitted': 200, 'already_used': 409, 'unknown': 404, 'wrong_event': 404}
+# Per worker process, reported in /health
+checkin_stats = {'scans': 0, 'admitted': 0, 'already_used': 0, 'unknown': 0, 'wrong_event': 0, 'invalid': 0,
+                 'sync_batches': 0, 'conflicts': 0}
+
+def checkin_token(event_id):
+    """Bearer token for an event's door devices, derived from the app secret"""
+    key = app.secret_key.encode() if isinstance(app.secret_key, str) else app.secret_key
+    return hmac.new(key, f'checkin:{event_id}'.encode(), hashlib.sha256).hexdigest()[:32]
+
+def door_access(conn, event_id):
+    """True if the request carries the event's scanner token or comes from the event's organizer"""
+    if hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {checkin_token(event_id)}'):
+        return True
+    if 'user_id' not in session:
+        return False
+    return conn.execute('SELECT 1 FROM events WHERE id = ? AND organizer_id = ?',
+                        (event_id, session['user_id'])).fetchone() is not None
+
+def scan_time(value, default):
+    """A device's scan timestamp (epoch seconds or ISO 8601) in local time; default when absent"""
+    if value is None or value == '':
+        return default
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        moment = datetime.fromtimestamp(value)
+    else:
+        moment = datetime.fromisoformat(str(value))
+        if moment.tzinfo is not None:
+            moment = moment.astimezone().replace(tzinfo=None)
+    return moment.strftime(CHECKIN_TIME_FORMAT)
+
+TICKET_BY_CODE_SQL = 'SELECT id, event_id, quantity FROM tickets WHERE qr_code = ?'
+CHECKIN_MANIFEST_SQL = '''SELECT t.qr_code, t.quantity, c.scanned_at FROM tickets t
+                          LEFT JOIN checkins c ON c.ticket_id = t.id WHERE t.event_id = ?'''
+
+def redeem_ticket(conn, event_id, code, scanned_at, recorded_at, device_id=None, offline=False):
+    """Admit the ticket with this code at most once; call inside a write transaction.
+
+    Returns a dict whose 'status' is admitted, already_used, unknown or wrong_event.
+    """
+    ticket = conn.execute(TICKET_BY_CODE_SQL, (code,)).fetchone()
+    if ticket is None:
+        return {'status': 'unknown'}
+    if ticket['event_id'] != event_id:
+        return {'status': 'wrong_event'}
+    result = {'ticket_id': ticket['id'], 'quantity': ticket['quantity']}
+    claimed = conn.execute('''INSERT INTO checkins (ticket_id, event_id, quantity, scanned_at, recorded_at, device_id, offline)
+                              VALUES (?, ?, ?, ?, ?, ?, ?)
+                              ON CONFLICT (ticket_id) DO NOTHING RETURNING ticket_id''',
+                           (ticket['id'], event_id, ticket['quantity'], scanned_at, recorded_at, device_id,
+                            int(offline))).fetchone()
+    if claimed is not None:
+        return dict(result, status='admitted', checked_in_at=scanned_at)
+    first = conn.execute('SELECT scanned_at, device_id FROM checkins WHERE ticket_id = ?', (ticket['id'],)).fetchone()
+    if offline and first['device_id'] == device_id and first['scanned_at'] == scanned_at:
+        # The device's own scan, uploaded again
+        return dict(result, status='admitted', checked_in_at=scanned_at)
+    return dict(result, status='already_used', checked_in_at=first['scanned_at'], checked_in_by=first['device_id'])
+
+def sync_scans(conn, event_id, device_id, scans):
+    """Apply a door device's offline scans in the order they happened; returns one result per scan"""
+    now = datetime.now().strftime(CHECKIN_TIME_FORMAT)
+    results = [None] * len(scans)
+    pending = []
+    for i, scan in enumerate(scans):
+        try:
+            code = str(scan['code']).strip()
+            pending.append((scan_time(scan.get('scanned_at'), now), i, code))
+        except (TypeError, KeyError, AttributeError, ValueError, OverflowError, OSError):
+            code = None
+        if not code:
+            results[i] = {'status': 'invalid'}
+    with write_transaction(conn):
+        for scanned_at, i, code in sorted(pending):
+            if not code:
+                continue
+            result = redeem_ticket(conn, event_id, code, scanned_at, now, device_id, offline=True)
+            if result['status'] != 'admitted':
+                # The device already let this guest in
+                checkin_stats['conflicts'] += conn.execute(
+                    '''INSERT OR IGNORE INTO checkin_conflicts (event_id, qr_code, reason, device_id, scanned_at, ticket_id,
+                                                                first_device_id, first_scanned_at, recorded_at)
+                       VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                    (event_id, code, result['status'], device_id, scanned_at, result.get('ticket_id'),
+                     result.get('checked_in_by'), result.get('checked_in_at'), now)).rowcount
+            results[i] = dict(result, code=code, scanned_at=scanned_at)
+    for result in results:
+        checkin_stats['scans'] += 1
+        checkin_stats[result['status']] += 1
+    checkin_stats['sync_batches'] += 1
+    return results
+
+@app.route('/checkin/<int:event_id>/scan', methods=['POST'])
+def checkin_scan(event_id):
+    """Redeem one scanned code at the door (JSON or form: code, device_id)"""
+    conn = get_db()
+    if not door_access(conn, event_id):
+        return jsonify(error='Not allowed to check in guests for this event'), 403
+    data = request.get_json(silent=True) or request.form
+    code = str(data.get('code') or '').strip()
+    checkin_stats['scans'] += 1
+    if not code:
+        checkin_stats['invalid'] += 1
+        return jsonify(status='invalid', error='No code was scanned'), 400
+    now = datetime.now().strftime(CHECKIN_TIME_FORMAT)
+    device_id = data.get('device_id')
+    with write_transaction(conn):
+        result = redeem_ticket(conn, event_id, code, now, now, str(device_id) if device_id else None)
+    checkin_stats[result['status']] += 1
+    return jsonify(result), CHECKIN_STATUS_CODES[result['status']]
+
+@app.route('/checkin/<int:event_id>/sync', methods=['POST'])
+def checkin_sync(event_id):
+    """Upload a door device's offline scans: JSON {device_id, scans: [{code, scanned_at}]}"""
+    conn = get_db()
+    if not door_access(conn, event_id):
+        return jsonify(error='Not allowed to check in guests for this event'), 403
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict) or not data.get('device_id') or not isinstance(data.get('scans'), list):
+        return jsonify(error='Expected JSON with device_id and a list of scans'), 400
+    if len(data['scans']) > MAX_SYNC_SCANS:
+        return jsonify(error=f'Upload at most {MAX_SYNC_SCANS} scans at a time'), 413
+    results = sync_scans(conn, event_id, str(data['device_id']), data['scans'])
+    counts = {}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    return jsonify(event_id=event_id, counts=counts, results=results)
+
+@app.route('/checkin/<int:event_id>/manifest')
+def checkin_manifest(event_id):
+    """Every code for the event with its check-in time, for door devices to preload before doors open"""
+    conn = get_db()
+    if not door_access(conn, event_id):
+        return jsonify(error='Not allowed to check in guests for this event'), 403
+    generated_at = datetime.now().strftime(CHECKIN_TIME_FORMAT)
+    tickets = [[row['qr_code'], row['quantity'], row['scanned_at']]
+               for row in conn.execute(CHECKIN_MANIFEST_SQL, (event_id,))]
+    return jsonify(event_id=event_id, generated_at=generated_at, fields=['code', 'quantity', 'checked_in_at'],
+                   tickets=tickets)
+
+@app.route('/checkin/<int:event_id>')
+def checkin_status(event_id):
+    """Check-in progress for an event and the latest conflicts from offline devices"""
+    conn = get_db()
+    if not door_access(conn, event_id):
+        return jsonify(error='Not allowed to check in guests for this event'), 403
+    sold = conn.execute('SELECT COUNT(*), COALESCE(SUM(quantity), 0) FROM tickets WHERE event_id = ?',
+                        (event_id,)).fetchone()
+    admitted = conn.execute('SELECT COUNT(*), COALESCE(SUM(quantity), 0) FROM checkins WHERE event_id = ?',
+                            (event_id,)).fetchone()
+    conflicts = [dict(row) for row in conn.execute(
+        'SELECT * FROM checkin_conflicts WHERE event_id = ? ORDER BY id DESC LIMIT 100', (event_id,))]
+    return jsonify(event_id=event_id, tickets=sold[0], seats=sold[1], checked_in_tickets=admitted[0],
+                   checked_in_seats=admitted[1], conflicts=conflicts)
+
+# --- Query Plan Checks ---
+# `flask check-query-plans` runs EXPLAIN QUERY PLAN over the SQL the routes
+# actually execute (the constants and query builders above), with sample
+# parameters, so a changed query or a dropped index shows up before deployment.
+_PLAN_NOW = 1767225600
+_REPORT_PARAMS = {'organizer': 1, 'fee': PLATFORM_FEE_RATE, 'start': '2026-01-01', 'end': '2026-02-01'}
+
+def _events_list_plan(category='', search='', cursor=None, view='upcoming'):
+    sql, params, _ = events_list_query(category, search, cursor, PAGE_SIZE, view, _PLAN_NOW)
+    return sql, params
+
+HOT_QUERIES = {
+    'my_tickets': my_tickets_query(1, None, PAGE_SIZE),
+    'my_tickets.next_page': my_tickets_query(1, (_PLAN_NOW, 100), PAGE_SIZE),
+    'dashboard.organizer_summary': (ORGANIZER_SUMMARY_SQL, (_PLAN_NOW, _PLAN_NOW + 30 * 24 * 3600, 1)),
+    'dashboard.organizer_events': (ORGANIZER_UPCOMING_SQL, (1, _PLAN_NOW, DASHBOARD_ORG_EVENTS)),
+    'dashboard.user_events': (UPCOMING_EVENTS_SQL, ('active', _PLAN_NOW, DASHBOARD_EVENTS)),
+    'dashboard.user_tickets': (RECENT_TICKETS_SQL, {'user_id': 1, 'limit': DASHBOARD_TICKETS}),
+    'event_detail': (EVENT_DETAIL_SQL, (1,)),
+    'event_detail.has_ticket': (HAS_TICKET_SQL, (1, 1)),
+    'payments': (PAYMENTS_SQL, {'organizer': 1, 'fee': PLATFORM_FEE_RATE}),
+    'payments.payouts': (RECENT_PAYOUTS_SQL, (1,)),
+    'profile': (USER_STATS_SQL, (1,)),
+    'events_list': _events_list_plan(),
+    'events_list.next_page': _events_list_plan(cursor=(_PLAN_NOW, 100)),
+    'events_list.category': _events_list_plan(category='Concert', cursor=(_PLAN_NOW, 100)),
+    'events_list.past': _events_list_plan(view='past', cursor=(_PLAN_NOW, 100)),
+    'events_list.search': _events_list_plan(search='jazz night', cursor=(-1.5, 100)),
+    'events_list.categories': (EVENT_CATEGORIES_SQL, ('active',)),
+    'checkin.lookup': (TICKET_BY_CODE_SQL, ('EVENTLINK-TICKET-x-1-1',)),
+    'checkin.manifest': (CHECKIN_MANIFEST_SQL, (1,)),
+    'sales_report.tickets': (SALES_REPORTS['tickets'], _REPORT_PARAMS),
+    'sales_report.daily': (SALES_REPORTS['daily'], _REPORT_PARAMS),
+    'archive.due': (ARCHIVE_DUE_SQL, (_PLAN_NOW, ARCHIVE_BATCH_SIZE)),
+}
+
+# Exports stream their rows as the query yields them, so these must not sort in a temp b-tree either
+STREAMED_QUERIES = {
+    'export.events.archived': (EVENT_EXPORT_QUERIES[0], (1,)),
+    'export.events': (EVENT_EXPORT_QUERIES[1], (1,)),
+    'export.tickets.archived': (TICKET_EXPORT_QUERIES[0], (1,)),
+    'export.tickets': (TICKET_EXPORT_QUERIES[1], (1,)),
+}
+
+def check_query_plans(conn):
+    """Return {name: plan_lines} for hot queries that scan a table instead of using an index,
+    and streamed queries that also sort"""
+    problems = {}
+    for name, (sql, params) in {**HOT_QUERIES, **STREAMED_QUERIES}.items():
+        plan = [row['detail'] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, params)]
+        # Scans of subquery results, FTS tables and indexes are fine; a bare table scan is not
+        if any(re.match(r'SCAN \w+$', line) for line in plan) or (
+                name in STREAMED_QUERIES and any(line.startswith('USE TEMP B-TREE') for line in plan)):
+            problems[name] = plan
+    return problems
+
+@app.cli.command('check-query-plans')
+def check_query_plans_command():
+    """Fail if any hot route query falls back to a full table scan."""
+    problems = check_query_plans(get_db())
+    for name, plan in problems.items():
+        print(f"{name}: " + '; '.join(plan))
+    if problems:
+        raise SystemExit(1)
+    print(f"All {len(HOT_QUERIES) + len(STREAMED_QUERIES)} hot queries use an index")
+
+# --- Application Setup ---
+# Importing this module does no database work. Migrations are a deployment step
+# (`flask --app app migrate [--seed]`), and setup only checks that the schema is
+# current: one PRAGMA read on a short-lived connection, so no SQLite handle
+# crosses a fork. Setup runs once per process, in create_app() or lazily when
+# the first request opens its session, before anything reads the database: that
+# covers `gunicorn app:app` and `flask run`, which never call create_app().
+# create_app() also compiles every template up front, so with
+# `gunicorn --preload 'app:create_app()'` workers fork from a warm master, and
+# builds the password hashing pool (a worker forked from the master builds its own).
+AUTO_MIGRATE = os.environ.get('EVENTLINK_AUTO_MIGRATE') == '1'
+SEED_SAMPLE_EVENTS = os.environ.get('EVENTLINK_SEED') == '1'
+
+class SchemaOutdated(RuntimeError):
+    """The database is behind the code's migrations and auto-migration is off"""
+
+_setup_lock = threading.Lock()
+_setup_done = False
+
+def setup_database(migrate_schema=AUTO_MIGRATE, seed=SEED_SAMPLE_EVENTS):
+    """Check the schema version, or bring it up to date, and optionally add the sample events"""
+    latest = MIGRATIONS[-1][0]
+    conn = db_pool._connect()
+    try:
+        version = schema_version(conn)
+        if version < latest:
+            if not migrate_schema:
+                raise SchemaOutdated(f'{DB_NAME} is at schema version {version}, this code needs {latest}; '
+                                     f'run `flask --app app migrate` first')
+            migrate(conn)
+        if seed:
+            populate_sample_events(conn)
+    finally:
+        conn.close()
+
+def warm_templates():
+    """Compile every template now instead of on the first request that renders it"""
+    for name in app.jinja_env.list_templates():
+        app.jinja_env.get_template(name)
+
+def ensure_setup(migrate_schema=AUTO_MIGRATE, seed=SEED_SAMPLE_EVENTS):
+    global _setup_done
+    if _setup_done:
+        return
+    with _setup_lock:
+        if not _setup_done:
+            setup_database(migrate_schema, seed)
+            check_live_availability()
+            _setup_done = True
+
+def create_app(migrate_schema=AUTO_MIGRATE, seed=SEED_SAMPLE_EVENTS):
+    """Application factory for WSGI servers: `gunicorn --preload 'app:create_app()'`"""
+    ensure_setup(migrate_schema, seed)
+    warm_templates()
+    password_hasher.start()
+    return app
+
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5011))
-    app.run(debug=True, host='0.0.0.0', port=port)
\ No newline at end of file
+    # The development server migrates and seeds on its own
+    create_app(migrate_schema=True, seed=True).run(debug=True, host='0.0.0.0', port=port)
\ No newline at end of file
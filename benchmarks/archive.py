@@ -0,0 +1,89 @@
+"""Event archive benchmark: hot table size and route latency before and after archiving.
+
+Seeds a database whose events span 2025-2028 (routes.seed), measures the
+events/tickets tables with their indexes and the main routes, moves every event
+that started more than --days ago into the archive tables, and measures again.
+Reports as JSON:
+
+* hot: rows, bytes and payload bytes (tables plus indexes, from dbstat) of
+  events and tickets. Deleting rows frees a page only once it is empty, and the
+  seeded start dates are random across event ids, so bytes lags payload here;
+* archive: events and tickets moved, total seconds, and the longest single batch,
+  which is the longest a purchase can wait on the write lock because of it;
+* routes: per-route latency and SQL statements, as in benchmarks/routes.py.
+
+    python benchmarks/archive.py
+    python benchmarks/archive.py --scale 100k --requests 200 --batch-size 1000
+
+Exits non-zero if the sales counters no longer match the tickets after archiving.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+import routes
+
+def hot_tables(conn):
+    sizes = {}
+    for table in ('events', 'tickets'):
+        names = [table] + [row[0] for row in conn.execute(
+            "SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = ?", (table,))]
+        size, payload = conn.execute(f'''SELECT COALESCE(SUM(pgsize), 0), COALESCE(SUM(payload), 0) FROM dbstat
+                                         WHERE name IN ({','.join('?' * len(names))})''', names).fetchone()
+        sizes[table] = {'rows': conn.execute(f'SELECT COUNT(*) FROM {table}').fetchone()[0],
+                        'bytes': size, 'payload_bytes': payload}
+    return sizes
+
+def archive(appmod, conn, days, batch_size):
+    before = appmod.wall_clock_epoch() - days * 24 * 3600
+    events = tickets = 0
+    batches = []
+    start = time.perf_counter()
+    while True:
+        t0 = time.perf_counter()
+        moved_events, moved_tickets = appmod.archive_past_events(conn, before, batch_size)
+        if not moved_events:
+            break
+        batches.append(time.perf_counter() - t0)
+        events += moved_events
+        tickets += moved_tickets
+    return {'events': events, 'tickets': tickets, 'batches': len(batches),
+            'seconds': round(time.perf_counter() - start, 2),
+            'longest_batch_ms': round(max(batches, default=0) * 1000, 1)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=list(routes.SCALES), default='10k', help='events and tickets to seed')
+    parser.add_argument('--days', type=int, default=30, help='archive events that started more than this many days ago')
+    parser.add_argument('--batch-size', type=int, default=500, help='events moved per transaction')
+    parser.add_argument('--requests', type=int, default=100, help='measured requests per route')
+    parser.add_argument('--warmup', type=int, default=10, help='unmeasured requests per route')
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='eventlink-archive-'), 'archive.db')
+    appmod = routes.load_app(db_path)
+    routes.seed(appmod, routes.SCALES[args.scale])
+    appmod.job_queue.workers = 0
+    fixture = routes.load_fixture(appmod)
+
+    phases = {}
+    with appmod.db_pool.connection() as conn:
+        phases['before'] = {'hot': hot_tables(conn)}
+        phases['before']['routes'] = routes.run_test_client(appmod, fixture, args.requests, args.warmup, random.Random(1))
+        moved = archive(appmod, conn, args.days, args.batch_size)
+        conn.execute('PRAGMA optimize')
+        phases['after'] = {'hot': hot_tables(conn)}
+        # Routes keep working on the events that are left
+        fixture = routes.load_fixture(appmod)
+        phases['after']['routes'] = routes.run_test_client(appmod, fixture, args.requests, args.warmup, random.Random(1))
+        drift = appmod.find_stats_drift(conn)
+    print(json.dumps({'benchmark': 'archive', 'scale': args.scale, 'days': args.days, 'batch_size': args.batch_size,
+                      'archive': moved, 'drift': drift, **phases}, indent=2))
+    sys.exit(1 if drift else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,210 @@
+"""Live availability benchmark: many watchers of one event during an on-sale.
+
+A buyer purchases one ticket at a time at --rate per second while --watchers
+clients follow the event's seat count: by reloading the event page every
+--interval seconds ('poll', what users did before live counts existed), by
+fetching /event/<id>/availability.json as often with its ETag ('poll-json', what
+event pages do by default), or signed in through /event/<id>/availability
+('stream', with the in-process backend and with the shared SQLite one).
+Reports as JSON, per mode:
+
+* requests and SQL statements the watchers cost the server over the run;
+* purchase_to_screen: time from the start of a purchase until a watcher has a
+  count that includes it, p50/p99 over every watcher and purchase (both polls
+  and a stream that fell behind can jump several purchases at once);
+* missed: purchases some watcher's count never caught up with by the end.
+
+    python benchmarks/availability.py
+    python benchmarks/availability.py --watchers 1000 --seconds 20 --modes stream stream-sqlite
+"""
+import argparse
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+
+import routes
+
+SOLD_RE = re.compile(rb'data-availability="tickets_sold">(\d+)<')
+QUERIES_RE = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return round(samples[min(len(samples) - 1, int(len(samples) * q))] * 1000, 1) if samples else None
+
+class Buyer(threading.Thread):
+    """Buys one ticket every 1/rate seconds, noting when each purchase started"""
+
+    def __init__(self, appmod, event_id, user_id, rate, seconds):
+        super().__init__()
+        self.appmod, self.event_id, self.user_id = appmod, event_id, user_id
+        self.rate, self.seconds = rate, seconds
+        self.started = {}  # tickets_sold after the purchase -> perf_counter at its start
+
+    def run(self):
+        with self.appmod.app.app_context():
+            conn = self.appmod.get_db()
+            sold = conn.execute('SELECT tickets_sold FROM events WHERE id = ?', (self.event_id,)).fetchone()[0]
+        start = time.perf_counter()
+        for i in range(int(self.rate * self.seconds)):
+            delay = start + i / self.rate - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            self.started[sold + i + 1] = time.perf_counter()
+            with self.appmod.app.app_context():
+                self.appmod.buy_tickets(self.event_id, self.user_id, 1)
+
+def poll(appmod, event_id, watchers, interval, stop):
+    counts = {'requests': 0, 'queries': 0}
+    seen, lock = [], threading.Lock()
+
+    def watcher(n):
+        client = appmod.app.test_client()
+        last, mine, requests, queries = None, [], 0, 0
+        time.sleep(interval * n / watchers)  # spread the reloads like real users
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            response = client.get(f'/event/{event_id}')
+            now = time.perf_counter()
+            requests += 1
+            queries += sum(int(q) for q in QUERIES_RE.findall(response.headers.get('Server-Timing', '')))
+            sold = int(SOLD_RE.search(response.data).group(1))
+            if last is not None:
+                mine += [(sold_n, now) for sold_n in range(last + 1, sold + 1)]
+            last = sold
+            stop.wait(max(0, interval - (time.perf_counter() - t0)))
+        with lock:
+            seen.extend(mine)
+            counts['requests'] += requests
+            counts['queries'] += queries
+
+    return watcher, seen, counts, lock
+
+def poll_json(appmod, event_id, watchers, interval, stop):
+    counts = {'requests': 0, 'queries': 0, 'not_modified': 0}
+    seen, lock = [], threading.Lock()
+
+    def watcher(n):
+        client = appmod.app.test_client()
+        last, etag, mine, requests, queries, not_modified = None, None, [], 0, 0, 0
+        time.sleep(interval * n / watchers)
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            response = client.get(f'/event/{event_id}/availability.json',
+                                  headers={'If-None-Match': etag} if etag else {})
+            now = time.perf_counter()
+            requests += 1
+            queries += sum(int(q) for q in QUERIES_RE.findall(response.headers.get('Server-Timing', '')))
+            if response.status_code == 304:
+                not_modified += 1
+            else:
+                etag = response.headers.get('ETag')
+                sold = response.get_json()['tickets_sold']
+                if last is not None:
+                    mine += [(sold_n, now) for sold_n in range(last + 1, sold + 1)]
+                last = sold
+            stop.wait(max(0, interval - (time.perf_counter() - t0)))
+        with lock:
+            seen.extend(mine)
+            counts['requests'] += requests
+            counts['queries'] += queries
+            counts['not_modified'] += not_modified
+
+    return watcher, seen, counts, lock
+
+def stream(appmod, event_id, watchers, interval, stop):
+    counts = {'requests': 0, 'queries': 0}
+    seen, lock = [], threading.Lock()
+
+    def watcher(n):
+        client = appmod.app.test_client()
+        # Streams are for signed-in visitors on a threaded worker
+        with client.session_transaction() as sess:
+            sess['user_id'], sess['role'], sess['name'] = 1, 'user', 'Bench'
+        response = client.get(f'/event/{event_id}/availability', buffered=False,
+                              environ_overrides={'wsgi.multithread': True})
+        last, mine = None, []
+        try:
+            for chunk in response.response:
+                if stop.is_set():
+                    break
+                if not chunk.startswith(b'event: availability'):
+                    continue
+                now = time.perf_counter()
+                sold = json.loads(chunk.split(b'data: ', 1)[1])['tickets_sold']
+                if last is not None:
+                    mine += [(sold_n, now) for sold_n in range(last + 1, sold + 1)]
+                last = sold
+        finally:
+            response.close()
+        with lock:
+            seen.extend(mine)
+            counts['requests'] += 1
+
+    return watcher, seen, counts, lock
+
+def run(appmod, mode, event_id, user_id, args):
+    if mode == 'stream-sqlite':
+        backend = appmod.SQLiteAvailabilityBackend(os.path.join(tempfile.mkdtemp(prefix='eventlink-avail-'), 'changes.db'))
+    else:
+        backend = appmod.MemoryAvailabilityBackend()
+    appmod.availability_hub = appmod.AvailabilityHub(backend, max_streams=args.watchers)
+    appmod.STREAM_KEEPALIVE = 0.5  # so watcher threads notice the end of the run
+    stop = threading.Event()
+    buyer = Buyer(appmod, event_id, user_id, args.rate, args.seconds)
+    factory = {'poll': poll, 'poll-json': poll_json}.get(mode, stream)
+    watcher, seen, counts, lock = factory(appmod, event_id, args.watchers, args.interval, stop)
+    threads = [threading.Thread(target=watcher, args=(n,)) for n in range(args.watchers)]
+    for thread in threads:
+        thread.start()
+    polling = mode.startswith('poll')
+    time.sleep(0.5 if polling else 1.0)  # let the watchers connect
+    start = time.perf_counter()
+    buyer.start()
+    buyer.join()
+    time.sleep(args.interval if polling else 0.5)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for thread in threads:
+        thread.join()
+    if not polling:
+        # One statement per stream to read its starting counts, and one per published change
+        counts['queries'] = counts['requests'] + appmod.availability_hub.stats['published']
+    latencies = [now - buyer.started[sold] for sold, now in seen if sold in buyer.started]
+    purchases = len(buyer.started)
+    return {'mode': mode, 'watchers': args.watchers, 'purchases': purchases,
+            'elapsed_s': round(elapsed, 2), 'watcher_requests': counts['requests'], 'watcher_queries': counts['queries'],
+            'purchase_to_screen_p50_ms': percentile(latencies, 0.5),
+            'purchase_to_screen_p99_ms': percentile(latencies, 0.99),
+            'not_modified': counts.get('not_modified'), 'missed': purchases * args.watchers - len(latencies)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=list(routes.SCALES), default='10k', help='events and tickets to seed')
+    parser.add_argument('--watchers', type=int, default=200, help='clients following the event')
+    parser.add_argument('--interval', type=float, default=1.0, help='seconds between page reloads when polling')
+    parser.add_argument('--rate', type=float, default=5.0, help='purchases per second')
+    parser.add_argument('--seconds', type=float, default=10.0, help='duration of the on-sale')
+    parser.add_argument('--modes', nargs='+', default=['poll', 'poll-json', 'stream', 'stream-sqlite'],
+                        choices=['poll', 'poll-json', 'stream', 'stream-sqlite'])
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='eventlink-availability-'), 'availability.db')
+    appmod = routes.load_app(db_path)
+    seeded = routes.seed(appmod, routes.SCALES[args.scale])
+    appmod.job_queue.workers = 0
+    results = []
+    for mode in args.modes:
+        with appmod.db_pool.connection() as conn:
+            event_id = conn.execute('''INSERT INTO events (organizer_id, title, location, date_time, price, capacity)
+                                       VALUES (?, 'On-sale', 'Arena', '2030-01-01 20:00', 25, 1000000)''',
+                                    (seeded['organizers'][0],)).lastrowid
+            conn.commit()
+        results.append(run(appmod, mode, event_id, seeded['buyers'][0], args))
+    print(json.dumps({'benchmark': 'availability', 'scale': args.scale, 'interval_s': args.interval,
+                      'rate': args.rate, 'seconds': args.seconds, 'results': results}, indent=2))
+
+if __name__ == '__main__':
+    main()
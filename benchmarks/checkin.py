@@ -0,0 +1,184 @@
+"""Door check-in benchmark: QR scans per minute for one event.
+
+Seeds a database, adds one event with --tickets tickets, and scans them
+through the Flask test client the way door devices would, reporting
+throughput and latency as JSON:
+
+    door     --doors threads POST /checkin/<id>/scan; besides every ticket once,
+             a share of the scans are re-scans of used tickets and unknown codes
+    sync     offline devices upload their scans to /checkin/<id>/sync in batches
+    race     --doors threads scan the same fresh code at the same moment, for
+             a number of codes; exactly one scan of each may be admitted
+
+    python benchmarks/checkin.py
+    python benchmarks/checkin.py --scale 100k --tickets 50000 --doors 16
+
+Each mode runs on fresh tickets. Exits non-zero if a ticket was admitted more
+than once or not at all, or if door or sync throughput is below --min-per-minute.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import routes
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return round(samples[min(len(samples) - 1, int(len(samples) * q))] * 1000, 2) if samples else None
+
+def add_door_event(appmod, organizer_id, buyers, tickets, rng):
+    """An event with the given number of tickets; returns (event_id, codes)"""
+    with appmod.db_pool.connection() as conn:
+        with appmod.write_transaction(conn):
+            event_id = conn.execute('''INSERT INTO events (organizer_id, title, location, date_time, price, capacity)
+                                       VALUES (?, 'Door benchmark', 'Arena', '2030-01-01 20:00', 25, NULL)''',
+                                    (organizer_id,)).lastrowid
+            rows = []
+            for _ in range(tickets):
+                user_id = rng.choice(buyers)
+                rows.append((user_id, event_id, '2029-12-01 12:00', rng.randint(1, 4), 25.0,
+                             appmod.generate_qr_code(user_id, event_id)))
+            conn.executemany('''INSERT INTO tickets (user_id, event_id, purchase_date, quantity, unit_price, qr_code)
+                                VALUES (?, ?, ?, ?, ?, ?)''', rows)
+    return event_id, [row[-1] for row in rows]
+
+def admitted_counts(appmod, event_id, codes):
+    """Tickets among codes with a check-in, and whether any has more than one"""
+    with appmod.db_pool.connection() as conn:
+        conn.execute('CREATE TEMP TABLE IF NOT EXISTS bench_codes (code TEXT PRIMARY KEY)')
+        conn.execute('DELETE FROM bench_codes')
+        conn.executemany('INSERT INTO bench_codes VALUES (?)', ((code,) for code in codes))
+        counts = conn.execute('''SELECT COUNT(c.ticket_id), COUNT(*) FROM bench_codes b
+                                 JOIN tickets t ON t.qr_code = b.code
+                                 LEFT JOIN checkins c ON c.ticket_id = t.id''').fetchone()
+        conn.commit()
+    return counts[0], counts[1]
+
+def door(appmod, event_id, codes, doors, rescans, unknown, rng):
+    scans = list(codes)
+    scans += rng.sample(codes, int(len(codes) * rescans))
+    scans += [f'EVENTLINK-TICKET-{i:016x}-0-{event_id}' for i in range(int(len(codes) * unknown))]
+    rng.shuffle(scans)
+    headers = {'Authorization': f'Bearer {appmod.checkin_token(event_id)}'}
+    latencies, statuses = [], {}
+    lock = threading.Lock()
+
+    def device(n):
+        client = appmod.app.test_client()
+        mine, times, seen = scans[n::doors], [], {}
+        for code in mine:
+            t0 = time.perf_counter()
+            response = client.post(f'/checkin/{event_id}/scan', json={'code': code, 'device_id': f'door-{n}'},
+                                   headers=headers)
+            times.append(time.perf_counter() - t0)
+            seen[response.status_code] = seen.get(response.status_code, 0) + 1
+        with lock:
+            latencies.extend(times)
+            for status, count in seen.items():
+                statuses[str(status)] = statuses.get(str(status), 0) + count
+
+    threads = [threading.Thread(target=device, args=(n,)) for n in range(doors)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    checked_in, total = admitted_counts(appmod, event_id, codes)
+    return {'mode': 'door', 'doors': doors, 'scans': len(scans), 'elapsed_s': round(elapsed, 2),
+            'scans_per_minute': round(len(scans) / elapsed * 60), 'p50_ms': percentile(latencies, 0.5),
+            'p99_ms': percentile(latencies, 0.99), 'statuses': statuses,
+            'admitted_once': statuses.get('200', 0) == checked_in == total}
+
+def sync(appmod, event_id, codes, devices, batch_size, rng):
+    headers = {'Authorization': f'Bearer {appmod.checkin_token(event_id)}'}
+    doors_open = datetime(2030, 1, 1, 19, 0)
+    scans = [{'code': code, 'scanned_at': (doors_open + timedelta(seconds=rng.randrange(7200))).isoformat(sep=' ')}
+             for code in codes]
+    # Each device uploads its own scans; every batch is sent twice, as after a lost response
+    per_device = [scans[n::devices] for n in range(devices)]
+    client = appmod.app.test_client()
+    latencies, admitted, uploads = [], 0, 0
+    start = time.perf_counter()
+    for n, device_scans in enumerate(per_device):
+        for i in range(0, len(device_scans), batch_size):
+            batch = {'device_id': f'offline-{n}', 'scans': device_scans[i:i + batch_size]}
+            for attempt in range(2):
+                t0 = time.perf_counter()
+                counts = client.post(f'/checkin/{event_id}/sync', json=batch, headers=headers).get_json()['counts']
+                latencies.append(time.perf_counter() - t0)
+                uploads += len(batch['scans'])
+                if attempt == 0:
+                    admitted += counts.get('admitted', 0)
+    elapsed = time.perf_counter() - start
+    checked_in, total = admitted_counts(appmod, event_id, codes)
+    return {'mode': 'sync', 'devices': devices, 'batch_size': batch_size, 'scans_uploaded': uploads,
+            'elapsed_s': round(elapsed, 2), 'scans_per_minute': round(uploads / elapsed * 60),
+            'batch_p50_ms': percentile(latencies, 0.5), 'batch_p99_ms': percentile(latencies, 0.99),
+            'admitted_once': admitted == checked_in == total}
+
+def race(appmod, event_id, codes, doors):
+    headers = {'Authorization': f'Bearer {appmod.checkin_token(event_id)}'}
+    clients = [appmod.app.test_client() for _ in range(doors)]
+    wins = []
+    for code in codes:
+        barrier = threading.Barrier(doors)
+        statuses = []
+
+        def scan(client):
+            barrier.wait()
+            statuses.append(client.post(f'/checkin/{event_id}/scan', json={'code': code}, headers=headers).status_code)
+
+        threads = [threading.Thread(target=scan, args=(client,)) for client in clients]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        wins.append(statuses.count(200))
+    return {'mode': 'race', 'doors': doors, 'codes': len(codes), 'admitted_once': all(w == 1 for w in wins),
+            'most_admissions_for_one_code': max(wins)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=list(routes.SCALES), default='10k', help='events and tickets to seed')
+    parser.add_argument('--tickets', type=int, default=10_000, help='tickets for the door event in each mode')
+    parser.add_argument('--doors', type=int, default=8, help='concurrent door devices')
+    parser.add_argument('--rescans', type=float, default=0.05, help='share of extra scans of used tickets')
+    parser.add_argument('--unknown', type=float, default=0.02, help='share of extra scans of unknown codes')
+    parser.add_argument('--batch-size', type=int, default=500, help='scans per offline upload')
+    parser.add_argument('--race-codes', type=int, default=200, help='codes scanned by every door at once')
+    parser.add_argument('--min-per-minute', type=float, default=3000, help='throughput floor for door and sync')
+    parser.add_argument('--modes', nargs='+', default=['door', 'sync', 'race'], choices=['door', 'sync', 'race'])
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='eventlink-checkin-'), 'checkin.db')
+    appmod = routes.load_app(db_path)
+    seeded = routes.seed(appmod, routes.SCALES[args.scale])
+    appmod.job_queue.workers = 0
+    rng = random.Random(1)
+    organizer = seeded['organizers'][0]
+
+    results = []
+    for mode in args.modes:
+        tickets = args.race_codes if mode == 'race' else args.tickets
+        event_id, codes = add_door_event(appmod, organizer, seeded['buyers'], tickets, rng)
+        if mode == 'door':
+            results.append(door(appmod, event_id, codes, args.doors, args.rescans, args.unknown, rng))
+        elif mode == 'sync':
+            results.append(sync(appmod, event_id, codes, args.doors, args.batch_size, rng))
+        else:
+            results.append(race(appmod, event_id, codes, args.doors))
+    print(json.dumps({'benchmark': 'checkin', 'scale': args.scale, 'tickets': args.tickets,
+                      'min_per_minute': args.min_per_minute, 'results': results}, indent=2))
+    failed = any(not r['admitted_once'] or r.get('scans_per_minute', args.min_per_minute) < args.min_per_minute
+                 for r in results)
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
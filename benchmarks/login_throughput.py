@@ -0,0 +1,93 @@
+"""Login throughput benchmark for the password hashing pool.
+
+Runs concurrent logins through the Flask test client with the hashing pool
+sized to 0 (inline on the request thread), 1, 2, 4, ... up to the core count,
+and reports logins per second and latency for each size as JSON:
+
+    python benchmarks/login_throughput.py
+    python benchmarks/login_throughput.py --logins 400 --concurrency 32 --workers 0 1 2 4 8
+
+With the pool, throughput should grow with the number of hash workers until it
+runs out of cores; inline hashing stays flat however many threads are serving.
+"""
+import argparse
+import contextlib
+import json
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def load_app(db_path):
+    os.environ['EVENTLINK_DB'] = db_path
+    # Every request comes from one address and a few users: measure the routes, not the rate limits
+    os.environ.setdefault('EVENTLINK_RATE_LIMIT', '0')
+    os.environ.setdefault('EVENTLINK_ADMISSION_RATE', '0')
+    sys.path.insert(0, ROOT)
+    # Keep stdout clean for the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        import app
+        app.create_app(migrate_schema=True)
+    return app
+
+def setup_users(appmod, count, password):
+    stored = appmod.generate_password_hash(password, appmod.PASSWORD_HASH_METHOD)
+    with appmod.db_pool.connection() as conn:
+        with appmod.write_transaction(conn):
+            conn.executemany('INSERT INTO users (email, password, full_name, role) VALUES (?, ?, ?, ?)',
+                             [(f'login{i}@eventlink.test', stored, f'Login {i}', 'user') for i in range(count)])
+    return [f'login{i}@eventlink.test' for i in range(count)]
+
+def run(appmod, workers, emails, password, logins, concurrency):
+    appmod.password_hasher = appmod.PasswordHasher(workers=workers, limit=logins)
+    def login(i):
+        client = appmod.app.test_client()
+        t0 = time.perf_counter()
+        response = client.post('/login', data={'email': emails[i % len(emails)], 'password': password})
+        elapsed = time.perf_counter() - t0
+        if response.status_code != 302:
+            raise RuntimeError(f'login returned {response.status_code}')
+        return elapsed
+    # Warm up: start the pool's processes outside the measurement
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(login, range(max(workers, 1))))
+        start = time.perf_counter()
+        latencies = sorted(pool.map(login, range(logins)))
+    elapsed = time.perf_counter() - start
+    return {
+        'hash_workers': workers,
+        'logins': logins,
+        'logins_per_second': round(logins / elapsed, 1),
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 1),
+        'p95_ms': round(latencies[int(len(latencies) * 0.95)] * 1000, 1),
+    }
+
+def main():
+    cores = os.cpu_count() or 1
+    default_workers = [0] + [n for n in (1, 2, 4, 8, 16, 32, 64) if n < cores] + [cores]
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--logins', type=int, default=200, help='measured logins per pool size')
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent request threads')
+    parser.add_argument('--workers', type=int, nargs='+', default=sorted(set(default_workers)),
+                        help='hash pool sizes to compare (0 hashes inline)')
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='eventlink-login-'), 'login.db')
+    appmod = load_app(db_path)
+    password = 'correct horse battery staple'
+    emails = setup_users(appmod, args.concurrency, password)
+
+    results = [run(appmod, workers, emails, password, args.logins, args.concurrency) for workers in args.workers]
+    print(json.dumps({
+        'benchmark': 'login_throughput',
+        'cores': cores,
+        'hash_method': appmod.PASSWORD_HASH_METHOD,
+        'concurrency': args.concurrency,
+        'results': results,
+    }))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,269 @@
+"""Overload benchmark for rate limiting and admission control.
+
+Starts a gunicorn server on a seeded database and first measures its capacity:
+the closed-loop throughput of the bot traffic mix (half failed logins to
+existing accounts, half purchases on one hot event). It then offers 10x that
+rate open-loop (requests are sent on a fixed schedule whether or not earlier
+ones have finished, and latency counts from the scheduled time):
+
+* real buyers, each with their own IP and account, buy tickets for assorted
+  events at half the measured capacity in total;
+* bots, from a handful of IPs and accounts, send the rest of the 10x.
+
+The same run is repeated with protection off (EVENTLINK_RATE_LIMIT=0,
+EVENTLINK_ADMISSION_RATE=0) and on (limits and waiting room shared between
+workers through EVENTLINK_RATE_LIMIT_URL), and reports latency and outcome for
+each class of traffic as JSON:
+
+    python benchmarks/overload.py
+    python benchmarks/overload.py --overload 10 --seconds 15 --workers 4
+
+Latency is also reported for the second half of each run alone ('steady'):
+the bots spend their initial bucket bursts early on, after which only the
+refill rate gets through. Exits non-zero if, with protection on, the real
+buyers' steady-state p99 is above --bound-ms or any of their requests failed
+with a server error.
+"""
+import argparse
+import http.client
+import json
+import os
+import queue
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import routes
+
+CARD = 'card_number=4242+4242+4242+4242&expiry_date=12%2F30&cvv=123'
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return round(samples[min(len(samples) - 1, int(len(samples) * q))] * 1000, 1) if samples else None
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def make_sessions(appmod, user_ids):
+    """Session cookies for signed-in users, written straight into the sessions table"""
+    cookies = {}
+    with appmod.db_pool.connection() as conn:
+        for user_id in user_ids:
+            sid = f'overload-{user_id}'
+            version = appmod.session_store.save(conn, sid, {'user_id': user_id, 'role': 'user', 'name': 'Load'},
+                                                time.time() + 3600)
+            cookies[user_id] = f'session={sid}.{version}'
+    return cookies
+
+class Server:
+    """A gunicorn server for one run, with the environment of that run"""
+
+    def __init__(self, db_path, workers, env):
+        self.port = free_port()
+        # routes.load_app() turns the limits off for this process; the server gets only the run's settings
+        base = {k: v for k, v in os.environ.items() if k not in ('EVENTLINK_RATE_LIMIT', 'EVENTLINK_ADMISSION_RATE')}
+        self.process = subprocess.Popen(
+            [shutil.which('gunicorn'), '-w', str(workers), '-k', 'gthread', '--threads', '4',
+             '--backlog', '2048', '-b', f'127.0.0.1:{self.port}', 'app:create_app()'],
+            cwd=routes.ROOT, env=dict(base, EVENTLINK_DB=db_path, EVENTLINK_PROXY_HOPS='1', **env),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        if not routes.wait_for_port(self.port):
+            self.stop()
+            raise RuntimeError('gunicorn did not start')
+
+    def stop(self):
+        self.process.terminate()
+        self.process.wait(timeout=10)
+
+class Client:
+    """Sends each request on a new connection, as each buyer and bot is a separate client"""
+
+    def __init__(self, port):
+        self.port = port
+
+    def send(self, request):
+        method, path, ip, cookie, body = request
+        headers = {'X-Forwarded-For': ip, 'Connection': 'close'}
+        if cookie:
+            headers['Cookie'] = cookie
+        if body:
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        conn = http.client.HTTPConnection('127.0.0.1', self.port, timeout=120)
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            return response.status
+        except (http.client.HTTPException, OSError):
+            return 'error'
+        finally:
+            conn.close()
+
+class Traffic:
+    """Request factories for the real buyers and the bots"""
+
+    def __init__(self, fixture, buyer_cookies, bot_cookies, emails, rng):
+        self.rng = rng
+        self.emails = emails
+        self.buyers = list(buyer_cookies.items())
+        self.bots = list(bot_cookies.items())
+        self.events = fixture['open_events']
+        self.hot_event = self.events[0]
+
+    def real(self):
+        user_id, cookie = self.rng.choice(self.buyers)
+        event_id = self.rng.choice(self.events[1:] or self.events)
+        return ('POST', '/process_payment', f'10.1.{user_id // 250 % 250}.{user_id % 250}', cookie,
+                f'event_id={event_id}&{CARD}')
+
+    def bot(self):
+        user_id, cookie = self.rng.choice(self.bots)
+        ip = f'10.66.0.{user_id % 4}'
+        if self.rng.random() < 0.5:
+            # Existing accounts, so every attempt costs a password hash
+            email = self.rng.choice(self.emails).replace('@', '%40')
+            return ('POST', '/login', ip, None, f'email={email}&password=guess')
+        return ('POST', '/process_payment', ip, cookie, f'event_id={self.hot_event}&{CARD}')
+
+def measure_capacity(client, traffic, concurrency, seconds):
+    """Closed-loop throughput of the bot mix, with protection off"""
+    stop = time.perf_counter() + seconds
+    def loop(_):
+        done, latencies = 0, []
+        while time.perf_counter() < stop:
+            t0 = time.perf_counter()
+            client.send(traffic.bot())
+            latencies.append(time.perf_counter() - t0)
+            done += 1
+        return done, latencies
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(loop, range(concurrency)))
+    elapsed = time.perf_counter() - start
+    latencies = [s for _, samples in results for s in samples]
+    return {'requests_per_second': round(sum(done for done, _ in results) / elapsed, 1),
+            'p50_ms': percentile(latencies, 0.5), 'p99_ms': percentile(latencies, 0.99)}
+
+def open_loop(client, traffic, real_rate, bot_rate, seconds, senders):
+    """Offer real and bot requests on a fixed schedule; returns per-class (offset, latency, status) samples"""
+    schedule = []
+    for kind, rate in (('real', real_rate), ('bot', bot_rate)):
+        if rate > 0:
+            schedule += [(i / rate, kind) for i in range(int(seconds * rate))]
+    schedule.sort()
+    pending = queue.Queue()
+    samples = {'real': [], 'bot': []}
+    lock = threading.Lock()
+
+    def sender():
+        while True:
+            item = pending.get()
+            if item is None:
+                return
+            due, kind, request = item
+            status = client.send(request)
+            with lock:
+                samples[kind].append((due - start, time.perf_counter() - due, status))
+
+    threads = [threading.Thread(target=sender) for _ in range(senders)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for offset, kind in schedule:
+        delay = start + offset - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        pending.put((start + offset, kind, traffic.real() if kind == 'real' else traffic.bot()))
+    for _ in threads:
+        pending.put(None)
+    for thread in threads:
+        thread.join()
+    return samples, time.perf_counter() - start
+
+def summarize(samples, elapsed, seconds):
+    latencies = [latency for _, latency, _ in samples]
+    # The bots' first burst of tokens is spent in the first half; the second half is the steady state
+    steady = [latency for offset, latency, _ in samples if offset >= seconds / 2]
+    statuses = {}
+    for _, _, status in samples:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {'requests': len(samples), 'completed_per_second': round(len(samples) / elapsed, 1),
+            'p50_ms': percentile(latencies, 0.5), 'p99_ms': percentile(latencies, 0.99),
+            'max_ms': percentile(latencies, 1.0), 'steady_p50_ms': percentile(steady, 0.5),
+            'steady_p99_ms': percentile(steady, 0.99), 'statuses': statuses}
+
+def run(name, env, args, db_path, traffic, real_rate, bot_rate):
+    server = Server(db_path, args.workers, env)
+    try:
+        client = Client(server.port)
+        # Warm up: start workers' hashing pools and connections outside the measurement
+        for _ in range(args.workers * 4):
+            client.send(traffic.real())
+        samples, elapsed = open_loop(client, traffic, real_rate, bot_rate, args.seconds, args.senders)
+    finally:
+        server.stop()
+    return {'mode': name, 'elapsed_s': round(elapsed, 2),
+            'real': summarize(samples['real'], elapsed, args.seconds),
+            'bot': summarize(samples['bot'], elapsed, args.seconds)}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=list(routes.SCALES), default='10k', help='events and tickets to seed')
+    parser.add_argument('--overload', type=float, default=10.0, help='offered load as a multiple of capacity')
+    parser.add_argument('--seconds', type=float, default=20.0, help='duration of each open-loop run')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    parser.add_argument('--senders', type=int, default=64, help='concurrent client connections')
+    parser.add_argument('--buyers', type=int, default=500, help='distinct real buyers (one IP each)')
+    parser.add_argument('--bots', type=int, default=8, help='bot accounts, spread over 4 IPs')
+    parser.add_argument('--bound-ms', type=float, default=1000.0,
+                        help="ceiling for the real buyers' steady-state p99 when protected")
+    parser.add_argument('--modes', nargs='+', default=['unprotected', 'protected'], choices=['unprotected', 'protected'])
+    args = parser.parse_args()
+    if shutil.which('gunicorn') is None:
+        print(json.dumps({'benchmark': 'overload', 'skipped': 'gunicorn is not installed'}))
+        return
+
+    tmp = tempfile.mkdtemp(prefix='eventlink-overload-')
+    db_path = os.path.join(tmp, 'overload.db')
+    appmod = routes.load_app(db_path)
+    seeded = routes.seed(appmod, routes.SCALES[args.scale])
+    fixture = routes.load_fixture(appmod)
+    appmod.job_queue.workers = 0
+    buyers = seeded['buyers'][:args.buyers + args.bots]
+    with appmod.db_pool.connection() as conn:
+        emails = [row[0] for row in conn.execute("SELECT email FROM users WHERE role = 'user' LIMIT 1000")]
+    traffic = Traffic(fixture, make_sessions(appmod, buyers[:args.buyers]),
+                      make_sessions(appmod, buyers[args.buyers:]), emails, random.Random(1))
+
+    unprotected = {'EVENTLINK_RATE_LIMIT': '0', 'EVENTLINK_ADMISSION_RATE': '0'}
+    server = Server(db_path, args.workers, unprotected)
+    try:
+        capacity = measure_capacity(Client(server.port), traffic, args.workers * 4, 3.0)
+    finally:
+        server.stop()
+    offered = capacity['requests_per_second'] * args.overload
+    real_rate = capacity['requests_per_second'] / 2
+    modes = {
+        'unprotected': unprotected,
+        'protected': {'EVENTLINK_RATE_LIMIT_URL': f'sqlite:///{os.path.join(tmp, "ratelimit.db")}'},
+    }
+    results = [run(mode, modes[mode], args, db_path, traffic, real_rate, offered - real_rate) for mode in args.modes]
+    print(json.dumps({'benchmark': 'overload', 'workers': args.workers, 'capacity': capacity,
+                      'offered_per_second': round(offered, 1), 'real_per_second': round(real_rate, 1),
+                      'seconds': args.seconds, 'bound_ms': args.bound_ms, 'results': results}, indent=2))
+    failed = any(r['mode'] == 'protected' and (r['real']['steady_p99_ms'] > args.bound_ms or
+                                                any(s == 'error' or s.startswith('5') and s != '503'
+                                                    for s in r['real']['statuses']))
+                 for r in results)
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""Concurrent on-sale load test for the ticket purchase engine.
+
+Many buyers race to buy tickets for one event with limited capacity. The test
+checks that no seat is oversold and reports purchases per second as JSON:
+
+    python benchmarks/purchase_load.py --capacity 2000 --workers 16
+    python benchmarks/purchase_load.py --mode process --workers 8
+    python benchmarks/purchase_load.py --path batched --batch-size 64 --batch-latency-ms 0
+
+--path direct runs every purchase in its own transaction (purchase_tickets);
+--path batched hands purchases to the group-commit writer (PurchaseBatcher),
+which commits up to --batch-size of them together.
+
+Exits non-zero if the event is oversold or the counters disagree with the tickets table.
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def load_app(db_path):
+    if 'app' in sys.modules:
+        # Buyer threads share the imported module (redirect_stdout isn't thread-safe)
+        return sys.modules['app']
+    os.environ['EVENTLINK_DB'] = db_path
+    sys.path.insert(0, ROOT)
+    # Keep stdout clean for the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        import app
+        app.create_app(migrate_schema=True)
+    return app
+
+def setup_event(appmod, capacity, buyers):
+    with appmod.app.app_context():
+        conn = appmod.get_db()
+        organizer_id = conn.execute("INSERT INTO users (email, password, role) VALUES ('load-org@eventlink.test', 'x', 'organizer')").lastrowid
+        conn.executemany('INSERT INTO users (email, password) VALUES (?, ?)',
+                         [(f'buyer{i}@eventlink.test', 'x') for i in range(buyers)])
+        event_id = conn.execute('''INSERT INTO events (organizer_id, title, location, date_time, price, capacity)
+                                   VALUES (?, 'Load Test Gig', 'Arena', '2030-01-01 20:00', 50, ?)''',
+                                (organizer_id, capacity)).lastrowid
+        first_buyer = conn.execute("SELECT MIN(id) FROM users WHERE email LIKE 'buyer%'").fetchone()[0]
+        conn.commit()
+    return event_id, first_buyer
+
+def buy_until_sold_out(db_path, event_id, user_ids, max_quantity, seed, path):
+    """One buyer worker: keep purchasing until the event is sold out"""
+    appmod = load_app(db_path)
+    rng = random.Random(seed)
+    pool = appmod.ConnectionPool(db_path, max_size=1)
+    result = {'purchases': 0, 'seats': 0, 'refused': 0, 'errors': 0, 'latencies': []}
+    with pool.connection() as conn:
+        if path == 'direct':
+            buy = lambda *args: appmod.purchase_tickets(conn, *args)
+        else:
+            buy = appmod.purchase_batcher.purchase
+        while True:
+            quantity = rng.randint(1, max_quantity)
+            t0 = time.perf_counter()
+            try:
+                buy(event_id, rng.choice(user_ids), quantity)
+            except appmod.PurchaseError:
+                result['refused'] += 1
+                if quantity == 1:
+                    break
+                continue
+            except sqlite3.OperationalError:
+                result['errors'] += 1
+                continue
+            result['latencies'].append(time.perf_counter() - t0)
+            result['purchases'] += 1
+            result['seats'] += quantity
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--capacity', type=int, default=2000)
+    parser.add_argument('--workers', type=int, default=16)
+    parser.add_argument('--buyers', type=int, default=500, help='distinct buyer accounts')
+    parser.add_argument('--max-quantity', type=int, default=3)
+    parser.add_argument('--mode', choices=['thread', 'process'], default='thread')
+    parser.add_argument('--path', choices=['direct', 'batched'], default='direct')
+    parser.add_argument('--batch-size', type=int, default=64, help='largest group commit (--path batched)')
+    parser.add_argument('--batch-latency-ms', type=float, default=0, help='longest wait to fill a batch')
+    parser.add_argument('--synchronous', choices=['NORMAL', 'FULL'], default='NORMAL',
+                        help='FULL makes every commit fsync, as on a database without WAL-friendly durability settings')
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='eventlink-load-'), 'load.db')
+    os.environ['EVENTLINK_DB_SYNCHRONOUS'] = args.synchronous
+    appmod = load_app(db_path)
+    event_id, first_buyer = setup_event(appmod, args.capacity, args.buyers)
+    user_ids = list(range(first_buyer, first_buyer + args.buyers))
+    # Worker processes fork from here, so they inherit this configuration
+    appmod.purchase_batcher = appmod.PurchaseBatcher(appmod.db_pool, args.batch_size, args.batch_latency_ms)
+    appmod.job_queue.workers = 0
+
+    executor_cls = ThreadPoolExecutor if args.mode == 'thread' else ProcessPoolExecutor
+    start = time.perf_counter()
+    with executor_cls(max_workers=args.workers) as executor:
+        futures = [executor.submit(buy_until_sold_out, db_path, event_id, user_ids, args.max_quantity, seed, args.path)
+                   for seed in range(args.workers)]
+        results = [f.result() for f in futures]
+    elapsed = time.perf_counter() - start
+
+    with appmod.app.app_context():
+        conn = appmod.get_db()
+        sold_counter = conn.execute('SELECT tickets_sold FROM events WHERE id = ?', (event_id,)).fetchone()[0]
+        sold_tickets = conn.execute('SELECT COALESCE(SUM(quantity), 0) FROM tickets WHERE event_id = ?', (event_id,)).fetchone()[0]
+
+    purchases = sum(r['purchases'] for r in results)
+    latencies = sorted(latency for r in results for latency in r['latencies'])
+    report = {
+        'benchmark': 'purchase_load',
+        'mode': args.mode,
+        'path': args.path,
+        'workers': args.workers,
+        'capacity': args.capacity,
+        'seats_sold': sold_tickets,
+        'oversold': max(0, sold_tickets - args.capacity),
+        'counter_matches_tickets': sold_counter == sold_tickets,
+        'purchases': purchases,
+        'refused': sum(r['refused'] for r in results),
+        'lock_errors': sum(r['errors'] for r in results),
+        'seconds': round(elapsed, 3),
+        'purchases_per_second': round(purchases / elapsed, 1) if elapsed else None,
+        'p50_ms': round(latencies[len(latencies) // 2] * 1000, 2) if latencies else None,
+        'p99_ms': round(latencies[int(len(latencies) * 0.99)] * 1000, 2) if latencies else None,
+        'max_ms': round(latencies[-1] * 1000, 2) if latencies else None,
+        'synchronous': args.synchronous,
+    }
+    if args.path == 'batched' and args.mode == 'thread':
+        report['batches'] = appmod.purchase_batcher.snapshot()
+    print(json.dumps(report))
+    if report['oversold'] or not report['counter_matches_tickets'] or sold_tickets != args.capacity:
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
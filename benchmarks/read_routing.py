@@ -0,0 +1,143 @@
+"""Readers-versus-writer benchmark for read routing.
+
+A writer buys tickets in a loop while reader threads run a full organizer
+revenue report over the tickets table. The same run is repeated with the
+readers on each kind of read connection, and reports the writer's latency as
+JSON:
+
+    baseline  no readers
+    primary   readers share the writer's connection pool (no routing)
+    ro        readers use the read-only pool (mode=ro, EVENTLINK_READ_MODE=ro)
+    snapshot  readers use the immutable snapshot (EVENTLINK_READ_MODE=snapshot)
+
+    python benchmarks/read_routing.py --scale 100k --readers 8 --seconds 5
+
+Exits non-zero if a writer ever hit a lock error or pool timeout with routed
+readers, if a read connection accepted a write, or if a snapshot read was older
+than the staleness bound.
+"""
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+import routes
+
+REPORT_QUERY = '''SELECT e.organizer_id, COUNT(*), SUM(t.quantity), SUM(t.quantity * t.unit_price)
+                  FROM tickets t JOIN events e ON e.id = t.event_id
+                  GROUP BY e.organizer_id'''
+
+def percentile(samples, q):
+    samples = sorted(samples)
+    return round(samples[min(len(samples) - 1, int(len(samples) * q))] * 1000, 2) if samples else None
+
+def read_only_enforced(pool):
+    with pool.connection() as conn:
+        try:
+            conn.execute("INSERT INTO categories (name) VALUES ('read-routing-probe')")
+        except sqlite3.OperationalError:
+            return True
+        return False
+
+def run(appmod, mode, fixture, readers, seconds, staleness):
+    appmod.db_pool = appmod.ConnectionPool(appmod.DB_NAME, max_size=max(readers, 1), timeout=seconds)
+    replica = None
+    if mode == 'primary':
+        read_pool = appmod.db_pool
+    elif mode == 'ro':
+        read_pool = appmod.ConnectionPool(appmod.DB_NAME, readonly=True, max_size=readers)
+    elif mode == 'snapshot':
+        replica = appmod.SnapshotReplica(appmod.DB_NAME, appmod.DB_NAME + '-bench-snapshot', staleness)
+        replica.refresh(force=True)
+        replica.start()
+        read_pool = appmod.ConnectionPool(replica.path, immutable=True, max_size=readers)
+    stop = threading.Event()
+    writes, errors, reads, ages = [], {'locked': 0, 'pool_timeouts': 0}, [], []
+
+    def writer():
+        event_ids, buyers = fixture['open_events'], fixture['buyers']
+        i = 0
+        while not stop.is_set():
+            i += 1
+            t0 = time.perf_counter()
+            try:
+                with appmod.db_pool.connection() as conn:
+                    appmod.purchase_tickets(conn, event_ids[i % len(event_ids)], buyers[i % len(buyers)], 1)
+            except appmod.PoolTimeout:
+                errors['pool_timeouts'] += 1
+                continue
+            except sqlite3.OperationalError:
+                errors['locked'] += 1
+                continue
+            writes.append(time.perf_counter() - t0)
+
+    def reader():
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            with read_pool.connection() as conn:
+                conn.execute(REPORT_QUERY).fetchall()
+            reads.append(time.perf_counter() - t0)
+            if replica is not None:
+                ages.append(time.time() - replica.taken_at())
+
+    threads = [threading.Thread(target=writer)]
+    if mode != 'baseline':
+        threads += [threading.Thread(target=reader) for _ in range(readers)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    result = {
+        'mode': mode,
+        'purchases_per_second': round(len(writes) / elapsed, 1),
+        'write_p50_ms': percentile(writes, 0.5),
+        'write_p99_ms': percentile(writes, 0.99),
+        'write_max_ms': percentile(writes, 1.0),
+        'write_lock_errors': errors['locked'],
+        'write_pool_timeouts': errors['pool_timeouts'],
+        'reports': len(reads),
+        'report_p50_ms': percentile(reads, 0.5),
+    }
+    if mode in ('ro', 'snapshot'):
+        result['read_only_enforced'] = read_only_enforced(read_pool)
+    if replica is not None:
+        result['snapshot_max_age_s'] = round(max(ages), 3) if ages else None
+        result['snapshot_refreshes'] = replica.stats['refreshes']
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=list(routes.SCALES), default='10k', help='events and tickets to seed')
+    parser.add_argument('--readers', type=int, default=4, help='concurrent report threads')
+    parser.add_argument('--seconds', type=float, default=3.0, help='duration of each mode')
+    parser.add_argument('--staleness', type=float, default=2.0, help='snapshot staleness bound in seconds')
+    parser.add_argument('--modes', nargs='+', default=['baseline', 'primary', 'ro', 'snapshot'],
+                        choices=['baseline', 'primary', 'ro', 'snapshot'])
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='eventlink-reads-'), 'reads.db')
+    appmod = routes.load_app(db_path)
+    seeded = routes.seed(appmod, routes.SCALES[args.scale])
+    fixture = routes.load_fixture(appmod)
+    fixture['buyers'] = seeded['buyers']
+    # Purchases are wanted, not job processing
+    appmod.job_queue.workers = 0
+
+    results = [run(appmod, mode, fixture, args.readers, args.seconds, args.staleness) for mode in args.modes]
+    print(json.dumps({'benchmark': 'read_routing', 'scale': args.scale, 'readers': args.readers,
+                      'seconds': args.seconds, 'staleness_bound_s': args.staleness, 'results': results}, indent=2))
+    failed = any(r['mode'] in ('ro', 'snapshot') and (r['write_lock_errors'] or r['write_pool_timeouts']
+                                                       or not r['read_only_enforced']) for r in results)
+    failed = failed or any((r.get('snapshot_max_age_s') or 0) > args.staleness for r in results)
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,105 @@
+"""Request logging benchmark: what the access log and its writer cost the request path.
+
+Drives the main routes (as benchmarks/routes.py does) with every request logged
+(sampling off, the worst case) in three configurations:
+
+* off: app.logger above INFO, so no access lines are built at all;
+* sync: the JSON formatter on a plain StreamHandler, writing on the request thread;
+* async: the app's own handler, which queues records for the writer thread.
+
+and against two sinks: a file, and a slow one whose every write takes
+--slow-write-ms (stderr piped into a log shipper that has fallen behind). Reports
+per-route p50/p99 for each combination, the p50 added over 'off', and the
+records written and dropped as JSON:
+
+    python benchmarks/request_logging.py
+    python benchmarks/request_logging.py --scale 100k --requests 500 --slow-write-ms 5
+
+Exits non-zero if the async handler adds more than --max-overhead-ms to the
+median route p50 with either sink.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import routes
+
+class SlowStream:
+    """A file whose writes block, like a pipe nobody is reading fast enough"""
+
+    def __init__(self, stream, delay):
+        self.stream, self.delay = stream, delay
+
+    def write(self, text):
+        time.sleep(self.delay)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+def configure(appmod, mode, stream):
+    """Point app.logger at stream the way `mode` would; returns the async handler, if that is the one"""
+    logger = appmod.app.logger
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    if mode == 'off':
+        logger.setLevel(logging.WARNING)
+        return None
+    logger.setLevel(logging.INFO)
+    handler = logging.StreamHandler(stream) if mode == 'sync' else appmod.AsyncLogHandler(stream)
+    handler.setFormatter(appmod.JsonLogFormatter())
+    handler.addFilter(appmod.RequestIdFilter())
+    logger.addHandler(handler)
+    return handler if mode == 'async' else None
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=list(routes.SCALES), default='10k', help='events and tickets to seed')
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per route')
+    parser.add_argument('--warmup', type=int, default=20, help='unmeasured requests per route')
+    parser.add_argument('--slow-write-ms', type=float, default=2.0, help='time each write to the slow sink takes')
+    parser.add_argument('--max-overhead-ms', type=float, default=0.5,
+                        help='fail if async logging adds more than this to the median route p50')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='eventlink-logging-')
+    appmod = routes.load_app(os.path.join(tmp, 'logging.db'))
+    routes.seed(appmod, routes.SCALES[args.scale])
+    appmod.job_queue.workers = 0
+    appmod.LOG_SAMPLING = {}
+    fixture = routes.load_fixture(appmod)
+
+    results, baseline = [], {}
+    for sink in ('file', 'slow'):
+        for mode in ('off', 'sync', 'async'):
+            with open(os.path.join(tmp, f'{sink}-{mode}.log'), 'w') as log_file:
+                stream = log_file if sink == 'file' else SlowStream(log_file, args.slow_write_ms / 1000)
+                handler = configure(appmod, mode, stream)
+                measured = routes.run_test_client(appmod, fixture, args.requests, args.warmup, random.Random(1))
+                if handler is not None:
+                    handler.flush(timeout=60)
+                    stats = handler.snapshot()
+                    handler.close()
+                else:
+                    stats = None
+            if mode == 'off':
+                baseline[sink] = {route['route']: route['p50_ms'] for route in measured}
+            added = [route['p50_ms'] - baseline[sink][route['route']] for route in measured]
+            results.append({'sink': sink, 'mode': mode,
+                            'median_p50_added_ms': round(statistics.median(added), 3),
+                            'writer': stats, 'routes': measured})
+
+    failed = [r for r in results if r['mode'] == 'async' and r['median_p50_added_ms'] > args.max_overhead_ms]
+    print(json.dumps({'benchmark': 'request_logging', 'scale': args.scale, 'requests': args.requests,
+                      'slow_write_ms': args.slow_write_ms, 'max_overhead_ms': args.max_overhead_ms,
+                      'results': results}, indent=2))
+    sys.exit(1 if failed else 0)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,295 @@
+"""Latency benchmark for the EventLink routes.
+
+Seeds a database with synthetic events, users and tickets (shaped like
+populate_sample_events), then drives every main route through the Flask test
+client and, if gunicorn is installed, through a multi-worker gunicorn server.
+Reports p50/p95/p99 latency, throughput and SQL statements per request (read
+from the Server-Timing header) as JSON for trend comparison:
+
+    python benchmarks/routes.py --scale 10k
+    python benchmarks/routes.py --scale 100k --mode gunicorn --workers 4 --output bench.json
+    python benchmarks/routes.py --scale 1M --db /tmp/eventlink-1m.db   # seeded once, reused after
+
+Seeding 1M rows takes a few minutes; pass --db to keep the database between runs.
+"""
+import argparse
+import contextlib
+import http.client
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SCALES = {'10k': 10_000, '100k': 100_000, '1M': 1_000_000}
+
+TITLE_WORDS = ['Jazz', 'Techno', 'Acoustic', 'Craft Beer', 'Whiskey', 'Salsa', 'Rooftop', 'Brunch',
+               'Comedy', 'Poetry', 'Wine', 'Indie', 'Soul', 'Karaoke', 'Startup', 'Design']
+TITLE_NOUNS = ['Night', 'Sessions', 'Festival', 'Tasting', 'Social', 'Showcase', 'Party', 'Meetup']
+VENUES = ['Blue Note Lounge', 'Club Pulse', 'Hop House Brewery', 'Sky Lounge Hotel', 'The Wooden Spoon',
+          'The Oak Barrel', 'Casa Latina Club', 'Grand Royale Hotel']
+DISTRICTS = ['Downtown District', 'Entertainment Quarter', 'Industrial District', 'Financial District',
+             'Arts District', 'Heritage Street', 'Cultural Quarter', 'Luxury District']
+QUERIES_RE = re.compile(r'db;dur=[\d.]+;desc="(\d+) queries"')
+SEARCH_TERMS = ['jazz', 'night', 'beer tasting', 'rooftop', 'club', 'sal', 'festival district']
+
+def load_app(db_path):
+    os.environ['EVENTLINK_DB'] = db_path
+    # Every request comes from one address and a few users: measure the routes, not the rate limits
+    os.environ.setdefault('EVENTLINK_RATE_LIMIT', '0')
+    os.environ.setdefault('EVENTLINK_ADMISSION_RATE', '0')
+    sys.path.insert(0, ROOT)
+    # Keep stdout clean for the JSON report
+    with contextlib.redirect_stdout(sys.stderr):
+        import app
+        app.create_app(migrate_schema=True)
+    return app
+
+def seed(appmod, n, seed_value=1, chunk=10_000):
+    """Insert n events and n tickets (plus organizers and buyers) in one transaction"""
+    rng = random.Random(seed_value)
+    categories = [name for name, _ in appmod.DEFAULT_CATEGORIES]
+    organizers, buyers = max(10, n // 100), max(100, n // 10)
+    password = appmod.generate_password_hash('bench')
+    with appmod.app.app_context():
+        conn = appmod.get_db()
+        with appmod.write_transaction(conn):
+            first_user = conn.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM users').fetchone()[0]
+            conn.executemany('INSERT INTO users (email, password, full_name, role) VALUES (?, ?, ?, ?)',
+                             ((f'org{i}@bench.test', password, f'Organizer {i}', 'organizer') for i in range(organizers)))
+            conn.executemany('INSERT INTO users (email, password, full_name, role) VALUES (?, ?, ?, ?)',
+                             ((f'buyer{i}@bench.test', password, f'Buyer {i}', 'user') for i in range(buyers)))
+            organizer_ids = range(first_user, first_user + organizers)
+            buyer_ids = range(first_user + organizers, first_user + organizers + buyers)
+
+            first_event = conn.execute('SELECT COALESCE(MAX(id), 0) + 1 FROM events').fetchone()[0]
+            prices = {}
+            for start in range(0, n, chunk):
+                rows = []
+                for i in range(start, min(start + chunk, n)):
+                    price = round(rng.uniform(10, 120), 2)
+                    prices[first_event + i] = price
+                    day = rng.randrange(0, 4 * 365)
+                    rows.append((
+                        rng.choice(organizer_ids),
+                        f'{rng.choice(TITLE_WORDS)} {rng.choice(TITLE_NOUNS)} #{i}',
+                        f'{rng.choice(TITLE_WORDS)} and {rng.choice(TITLE_WORDS).lower()} with friends. Drinks served all evening.',
+                        f'{rng.choice(VENUES)}, {rng.choice(DISTRICTS)}',
+                        time.strftime('%Y-%m-%d %H:%M', time.gmtime(1735689600 + day * 86400 + rng.randrange(17, 23) * 3600)),
+                        price,
+                        None if rng.random() < 0.5 else 1_000_000,
+                        rng.choice(categories),
+                    ))
+                conn.executemany('''INSERT INTO events (organizer_id, title, description, location, date_time, price, capacity, category)
+                                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)''', rows)
+
+            event_ids = list(prices)
+            for start in range(0, n, chunk):
+                rows = []
+                for i in range(start, min(start + chunk, n)):
+                    event_id = rng.choice(event_ids)
+                    rows.append((
+                        rng.choice(buyer_ids), event_id,
+                        time.strftime('%Y-%m-%d %H:%M', time.gmtime(time.time() - rng.randrange(0, 365 * 86400))),
+                        rng.randint(1, 3), prices[event_id], f'EVENTLINK-TICKET-{i:08x}-bench',
+                    ))
+                conn.executemany('''INSERT INTO tickets (user_id, event_id, purchase_date, quantity, unit_price, qr_code)
+                                    VALUES (?, ?, ?, ?, ?, ?)''', rows)
+            appmod.rebuild_sales_stats(conn)
+        conn.execute('PRAGMA optimize')
+    return {'organizers': list(organizer_ids), 'buyers': list(buyer_ids), 'events': event_ids}
+
+def load_fixture(appmod):
+    """Pick the busiest organizer and buyer plus some events from an already seeded database"""
+    with appmod.app.app_context():
+        conn = appmod.get_db()
+        organizer = conn.execute('SELECT organizer_id FROM organizer_stats ORDER BY tickets DESC LIMIT 1').fetchone()
+        buyer = conn.execute('SELECT user_id FROM user_stats ORDER BY tickets DESC LIMIT 1').fetchone()
+        events = [row[0] for row in conn.execute('SELECT id FROM events ORDER BY RANDOM() LIMIT 1000')]
+        open_events = [row[0] for row in conn.execute(
+            "SELECT id FROM events WHERE status = 'active' AND capacity IS NULL LIMIT 100")]
+    return {'organizer': organizer[0] if organizer else None, 'buyer': buyer[0] if buyer else None,
+            'events': events, 'open_events': open_events or events}
+
+def route_plan(fixture, rng):
+    """(name, role, method, path-factory, form-factory) for each benchmarked route"""
+    categories = ['', 'Concert', 'Workshop', 'Food & Drink']
+    def events_path():
+        params = [f'category={rng.choice(categories).replace(" ", "+").replace("&", "%26")}']
+        if rng.random() < 0.3:
+            params.append('search=' + rng.choice(SEARCH_TERMS).replace(' ', '+'))
+        return '/events?' + '&'.join(params)
+    card = {'card_number': '4242 4242 4242 4242', 'expiry_date': '12/30', 'cvv': '123'}
+    return [
+        ('/events', 'user', 'GET', events_path, None),
+        ('/event/<id>', 'user', 'GET', lambda: f'/event/{rng.choice(fixture["events"])}', None),
+        ('/dashboard (user)', 'user', 'GET', lambda: '/dashboard', None),
+        ('/dashboard (organizer)', 'organizer', 'GET', lambda: '/dashboard', None),
+        ('/payments', 'organizer', 'GET', lambda: '/payments', None),
+        ('/my_tickets', 'user', 'GET', lambda: '/my_tickets', None),
+        ('/process_payment', 'user', 'POST', lambda: '/process_payment',
+         lambda: dict(card, event_id=str(rng.choice(fixture['open_events'])))),
+    ]
+
+def summarize(name, latencies, elapsed, statements=None):
+    latencies = sorted(latencies)
+    def pct(p):
+        return round(latencies[min(len(latencies) - 1, int(p / 100 * len(latencies)))] * 1000, 3)
+    return {
+        'route': name,
+        'requests': len(latencies),
+        'p50_ms': pct(50), 'p95_ms': pct(95), 'p99_ms': pct(99),
+        'mean_ms': round(sum(latencies) / len(latencies) * 1000, 3),
+        'throughput_rps': round(len(latencies) / elapsed, 1),
+        'queries_per_request': round(statements / len(latencies), 2) if statements is not None else None,
+    }
+
+def queries_in(server_timing):
+    """SQL statement count reported by the app's Server-Timing header"""
+    match = QUERIES_RE.search(server_timing or '')
+    return int(match.group(1)) if match else 0
+
+def run_test_client(appmod, fixture, requests, warmup, rng):
+    """Drive the app in-process through the Flask test client"""
+    users = {'user': fixture['buyer'], 'organizer': fixture['organizer']}
+    results = []
+    for name, role, method, path, form in route_plan(fixture, rng):
+        client = appmod.app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'], sess['role'], sess['name'] = users[role], role, 'Bench'
+        for _ in range(warmup):
+            client.open(path(), method=method, data=form() if form else None)
+        latencies, statements = [], 0
+        start = time.perf_counter()
+        for _ in range(requests):
+            url, data = path(), form() if form else None
+            t0 = time.perf_counter()
+            response = client.open(url, method=method, data=data)
+            latencies.append(time.perf_counter() - t0)
+            statements += queries_in(response.headers.get('Server-Timing'))
+            if response.status_code >= 500:
+                raise RuntimeError(f'{name}: {url} returned {response.status_code}')
+        results.append(summarize(name, latencies, time.perf_counter() - start, statements))
+    return results
+
+def wait_for_port(port, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return True
+        except OSError:
+            time.sleep(0.1)
+    return False
+
+def run_gunicorn(appmod, fixture, db_path, requests, warmup, rng, workers, concurrency):
+    """Drive a real multi-worker gunicorn server over HTTP with keep-alive connections"""
+    gunicorn = shutil.which('gunicorn')
+    if gunicorn is None:
+        return {'skipped': 'gunicorn is not installed'}
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        port = s.getsockname()[1]
+    env = dict(os.environ, EVENTLINK_DB=db_path)
+    server = subprocess.Popen([gunicorn, '-w', str(workers), '-k', 'gthread', '--threads', '4',
+                               '-b', f'127.0.0.1:{port}', 'app:create_app()'],
+                              cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        if not wait_for_port(port):
+            return {'skipped': 'gunicorn did not start'}
+        cookies = {}
+        with appmod.db_pool.connection() as conn:
+            for role, user in (('user', fixture['buyer']), ('organizer', fixture['organizer'])):
+                sid = f'bench-{role}'
+                version = appmod.session_store.save(conn, sid, {'user_id': user, 'role': role, 'name': 'Bench'},
+                                                    time.time() + 3600)
+                cookies[role] = f'session={sid}.{version}'
+        local = threading.local()
+
+        def send(method, url, cookie, form):
+            conn = getattr(local, 'conn', None)
+            if conn is None:
+                conn = local.conn = http.client.HTTPConnection('127.0.0.1', port, timeout=30)
+            body = '&'.join(f'{k}={v}'.replace(' ', '+') for k, v in form.items()) if form else None
+            headers = {'Cookie': cookie}
+            if body:
+                headers['Content-Type'] = 'application/x-www-form-urlencoded'
+            t0 = time.perf_counter()
+            conn.request(method, url, body=body, headers=headers)
+            response = conn.getresponse()
+            response.read()
+            elapsed = time.perf_counter() - t0
+            if response.status >= 500:
+                raise RuntimeError(f'{url} returned {response.status}')
+            return elapsed, queries_in(response.getheader('Server-Timing'))
+
+        results = []
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            for name, role, method, path, form in route_plan(fixture, rng):
+                jobs = [(method, path(), cookies[role], form() if form else None) for _ in range(warmup + requests)]
+                list(pool.map(lambda job: send(*job), jobs[:warmup]))
+                start = time.perf_counter()
+                samples = list(pool.map(lambda job: send(*job), jobs[warmup:]))
+                results.append(summarize(name, [elapsed for elapsed, _ in samples], time.perf_counter() - start,
+                                         sum(queries for _, queries in samples)))
+        return results
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--scale', choices=list(SCALES), default='10k', help='events and tickets to seed')
+    parser.add_argument('--db', help='database to seed or reuse (default: a temporary file)')
+    parser.add_argument('--mode', choices=['test-client', 'gunicorn', 'both'], default='test-client')
+    parser.add_argument('--requests', type=int, default=200, help='measured requests per route')
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn worker processes')
+    parser.add_argument('--concurrency', type=int, default=16, help='concurrent HTTP clients in gunicorn mode')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args()
+
+    db_path = args.db or os.path.join(tempfile.mkdtemp(prefix='eventlink-bench-'), 'bench.db')
+    reuse = args.db is not None and os.path.exists(args.db)
+    appmod = load_app(db_path)
+    seed_seconds = None
+    if not reuse:
+        t0 = time.perf_counter()
+        seed(appmod, SCALES[args.scale], args.seed)
+        seed_seconds = round(time.perf_counter() - t0, 2)
+    fixture = load_fixture(appmod)
+
+    report = {
+        'benchmark': 'routes',
+        'scale': args.scale,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'python': platform.python_version(),
+        'seed_seconds': seed_seconds,
+        'results': {},
+    }
+    if args.mode in ('test-client', 'both'):
+        report['results']['test-client'] = run_test_client(appmod, fixture, args.requests, args.warmup,
+                                                           random.Random(args.seed))
+    if args.mode in ('gunicorn', 'both'):
+        report['results']['gunicorn'] = run_gunicorn(appmod, fixture, db_path, args.requests, args.warmup,
+                                                     random.Random(args.seed), args.workers, args.concurrency)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+"""Cold start benchmark: time from process start to the first served request.
+
+Migrates and seeds a temporary database once with `flask migrate --seed` (the
+deployment step), then measures, as JSON:
+
+* in-process: importing app, setup and the first test-client request, each in
+  a fresh interpreter: through create_app() ('factory', which also compiles the
+  templates), with setup deferred to the first request ('lazy', as under
+  `gunicorn app:app`), and with create_app() migrating and seeding on boot
+  ('migrate_on_boot');
+* gunicorn: time from spawning the server until it answers its first request,
+  with and without --preload.
+
+    python benchmarks/startup.py
+    python benchmarks/startup.py --runs 10 --workers 4
+"""
+import argparse
+import json
+import os
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Runs in a fresh interpreter so nothing is imported or compiled yet
+CHILD = '''
+import contextlib, json, sys, time
+t0 = time.perf_counter()
+with contextlib.redirect_stdout(sys.stderr):
+    import app
+t1 = time.perf_counter()
+flask_app = app.create_app(migrate_schema={migrate}, seed={migrate}) if {factory} else app.app
+t2 = time.perf_counter()
+status = flask_app.test_client().get('/login').status_code
+t3 = time.perf_counter()
+assert status == 200, status
+print(json.dumps({{'import_ms': (t1 - t0) * 1000, 'create_app_ms': (t2 - t1) * 1000,
+                  'first_request_ms': (t3 - t2) * 1000, 'total_ms': (t3 - t0) * 1000}}))
+'''
+
+def prepare_db(db_path):
+    env = dict(os.environ, EVENTLINK_DB=db_path)
+    subprocess.run([sys.executable, '-m', 'flask', '--app', 'app', 'migrate', '--seed'],
+                   cwd=ROOT, env=env, check=True, stdout=subprocess.DEVNULL)
+
+def in_process(db_path, runs, factory=True, migrate=False):
+    env = dict(os.environ, EVENTLINK_DB=db_path)
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, '-c', CHILD.format(factory=factory, migrate=migrate)], cwd=ROOT, env=env,
+                             check=True, capture_output=True, text=True).stdout
+        samples.append(json.loads(out))
+    return {key: round(statistics.median(s[key] for s in samples), 1) for key in samples[0]}
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+def gunicorn_first_request(gunicorn, db_path, workers, preload, timeout=30):
+    """Milliseconds from spawning gunicorn until GET /login returns 200"""
+    port = free_port()
+    args = [gunicorn, '-w', str(workers), '-k', 'gthread', '--threads', '4', '-b', f'127.0.0.1:{port}']
+    if preload:
+        args.append('--preload')
+    env = dict(os.environ, EVENTLINK_DB=db_path)
+    start = time.perf_counter()
+    server = subprocess.Popen(args + ['app:create_app()'], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/login', timeout=5) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except (urllib.error.URLError, ConnectionError):
+                time.sleep(0.005)
+        raise RuntimeError('gunicorn did not answer within the timeout')
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5, help='cold starts per measurement (median reported)')
+    parser.add_argument('--workers', type=int, default=2, help='gunicorn worker processes')
+    args = parser.parse_args()
+
+    db_path = os.path.join(tempfile.mkdtemp(prefix='eventlink-startup-'), 'startup.db')
+    prepare_db(db_path)
+    report = {
+        'benchmark': 'startup',
+        'runs': args.runs,
+        'in_process': {
+            'factory': in_process(db_path, args.runs),
+            'lazy': in_process(db_path, args.runs, factory=False),
+            'migrate_on_boot': in_process(db_path, args.runs, migrate=True),
+        },
+    }
+    gunicorn = shutil.which('gunicorn')
+    if gunicorn is None:
+        report['gunicorn'] = {'skipped': 'gunicorn is not installed'}
+    else:
+        report['gunicorn'] = {'workers': args.workers}
+        for name, preload in (('no_preload', False), ('preload', True)):
+            samples = [gunicorn_first_request(gunicorn, db_path, args.workers, preload) for _ in range(args.runs)]
+            report['gunicorn'][f'{name}_first_request_ms'] = round(statistics.median(samples), 1)
+    print(json.dumps(report))
+
+if __name__ == '__main__':
+    main()
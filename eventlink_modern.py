@@ -1,6 +1,15 @@
+import os
+import queue
+import sqlite3
+import threading
 import tkinter as tk
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
 from tkinter import ttk, messagebox
 
+from werkzeug.security import check_password_hash
+
 # --- Design Constants (Based on your screenshots) ---
 COLOR_BG_MAIN = "#f3f4f6"       # Light gray background
 COLOR_BG_SIDEBAR = "#ffffff"    # White sidebar
@@ -12,132 +21,540 @@ FONT_HEADER = ("Helvetica", 20, "bold")
 FONT_SUBHEADER = ("Helvetica", 14, "bold")
 FONT_BODY = ("Helvetica", 10)
 
+# --- Data Settings ---
+# The client reads the web app's database (EVENTLINK_DB, as for app.py), read-only.
+DB_PATH = os.environ.get("EVENTLINK_DB", str(Path(__file__).with_name("eventlink.db")))
+POLL_MS = 30            # how often the UI picks up results from the loader thread
+ROW_HEIGHT = 70         # height of one row in the events list, in pixels
+PAGE_SIZE = 100         # events fetched per query while scrolling
+MAX_PAGES = 50          # pages kept in memory (5,000 events); older ones are fetched again
+DASHBOARD_EVENTS = 3    # rows under "Your Upcoming Events"
+
+
+def wall_clock_epoch():
+    """Now, to the minute, on the scale of events.starts_at (see Event Times in app.py)"""
+    return int(datetime.now().replace(second=0, microsecond=0, tzinfo=timezone.utc).timestamp())
+
+
+def format_date(date_time):
+    """'2025-07-15 20:00' -> 'Jul 15, 2025'"""
+    try:
+        return datetime.strptime(date_time[:16], "%Y-%m-%d %H:%M").strftime("%b %d, %Y")
+    except (TypeError, ValueError):
+        return date_time or ""
+
+
+class DatabaseSource:
+    """EventLink data read straight from the SQLite database.
+
+    Only used from the loader thread, which owns the connection. Results are
+    plain tuples and dicts, so nothing tied to the connection reaches the UI.
+    """
+
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._conn = None
+
+    def conn(self):
+        if self._conn is None:
+            # mode=ro: the desktop client never writes, and can't take the web app's write lock
+            self._conn = sqlite3.connect(Path(self.path).resolve().as_uri() + "?mode=ro", uri=True)
+            self._conn.row_factory = sqlite3.Row
+        return self._conn
+
+    def login(self, email, password):
+        """The user for these credentials, or None"""
+        row = self.conn().execute("SELECT id, email, password, full_name, role FROM users WHERE email = ?",
+                                  (email,)).fetchone()
+        if row is None or not check_password_hash(row["password"], password):
+            return None
+        return {"id": row["id"], "name": row["full_name"] or row["email"], "role": row["role"]}
+
+    def dashboard(self, user):
+        """Stat cards as (title, value, subtext) and the next few events as (name, details, amount)"""
+        conn = self.conn()
+        now = wall_clock_epoch()
+        if user["role"] == "organizer":
+            month_start = (datetime.now().date() - timedelta(days=29)).isoformat()
+            total, upcoming = conn.execute("""SELECT COUNT(*) + (SELECT COUNT(*) FROM events_archive WHERE organizer_id = ?2),
+                                                     COALESCE(SUM(starts_at >= ?1), 0)
+                                              FROM events WHERE organizer_id = ?2""", (now, user["id"])).fetchone()
+            totals = conn.execute("SELECT tickets, gross_revenue FROM organizer_stats WHERE organizer_id = ?",
+                                  (user["id"],)).fetchone()
+            recent = conn.execute("""SELECT COALESCE(SUM(tickets), 0), COALESCE(SUM(gross_revenue), 0)
+                                     FROM organizer_daily_sales WHERE organizer_id = ? AND day >= ?""",
+                                  (user["id"], month_start)).fetchone()
+            tickets, revenue = (totals[0], totals[1]) if totals else (0, 0.0)
+            cards = [("Total Events", f"{total:,}", f"{upcoming:,} upcoming"),
+                     ("Total Attendees", f"{tickets:,}", f"+{recent[0]:,} this month"),
+                     ("Total Revenue", f"${revenue:,.0f}", f"+${recent[1]:,.0f} this month")]
+            rows = conn.execute("""SELECT e.title, e.date_time, e.tickets_sold, COALESCE(s.gross_revenue, 0)
+                                   FROM events e LEFT JOIN event_stats s ON s.event_id = e.id
+                                   WHERE e.organizer_id = ? AND e.starts_at >= ?
+                                   ORDER BY e.starts_at, e.id LIMIT ?""", (user["id"], now, DASHBOARD_EVENTS))
+            events = [(title, f"{format_date(date_time)} • {sold:,} attendees", f"${gross:,.0f}")
+                      for title, date_time, sold, gross in rows]
+        else:
+            upcoming = conn.execute("SELECT COUNT(*) FROM events WHERE status = 'active' AND starts_at >= ?",
+                                    (now,)).fetchone()[0]
+            stats = conn.execute("SELECT orders, tickets, total_spent FROM user_stats WHERE user_id = ?",
+                                 (user["id"],)).fetchone()
+            orders, tickets, spent = (stats[0], stats[1], stats[2]) if stats else (0, 0, 0.0)
+            cards = [("Upcoming Events", f"{upcoming:,}", "open for booking"),
+                     ("My Tickets", f"{tickets:,}", f"{orders:,} orders"),
+                     ("Total Spent", f"${spent:,.2f}", "across all orders")]
+            rows = conn.execute("""SELECT title, date_time, location, price FROM events
+                                   WHERE status = 'active' AND starts_at >= ?
+                                   ORDER BY starts_at, id LIMIT ?""", (now, DASHBOARD_EVENTS))
+            events = [(title, f"{format_date(date_time)} • {location}", f"${price:,.2f}")
+                      for title, date_time, location, price in rows]
+        return {"cards": cards, "events": events}
+
+    def _event_filter(self, user):
+        # Organizers see all their own events, everyone else the upcoming ones on sale
+        # (idx_events_organizer_starts and idx_events_status_starts serve both in date order)
+        if user["role"] == "organizer":
+            return "organizer_id = ?", (user["id"],)
+        return "status = 'active' AND starts_at >= ?", (wall_clock_epoch(),)
+
+    def event_count(self, user):
+        where, params = self._event_filter(user)
+        return self.conn().execute(f"SELECT COUNT(*) FROM events WHERE {where}", params).fetchone()[0]
+
+    def event_page(self, user, page):
+        """Rows page*PAGE_SIZE onwards of the events list, as (name, details, amount)"""
+        where, params = self._event_filter(user)
+        rows = self.conn().execute(f"""SELECT title, date_time, location, category, price FROM events
+                                       WHERE {where} ORDER BY starts_at, id LIMIT ? OFFSET ?""",
+                                   (*params, PAGE_SIZE, page * PAGE_SIZE))
+        return [(title, f"{format_date(date_time)} • {location}" + (f" • {category}" if category else ""),
+                 f"${price:,.2f}") for title, date_time, location, category, price in rows]
+
+
+class Loader:
+    """Runs data source calls on a background thread so the UI never blocks.
+
+    Tk may only be used from the main thread, so results are queued and the
+    main loop collects them every POLL_MS through after(), then runs the
+    callbacks there.
+    """
+
+    def __init__(self, root, source):
+        self.root = root
+        self.source = source
+        self._requests = queue.Queue()
+        self._results = queue.Queue()
+        threading.Thread(target=self._run, name="eventlink-loader", daemon=True).start()
+        self.root.after(POLL_MS, self._poll)
+
+    def submit(self, method, *args, on_done=None, on_error=None, wanted=None):
+        """Call source.method(*args) in the background and pass the result to on_done.
+
+        wanted() is checked just before the call runs; when it returns False the
+        call is skipped and on_done gets None (e.g. a page scrolled out of view).
+        """
+        self._requests.put((method, args, on_done, on_error, wanted))
+
+    def _run(self):
+        while True:
+            method, args, on_done, on_error, wanted = self._requests.get()
+            result = error = None
+            if wanted is None or wanted():
+                try:
+                    result = getattr(self.source, method)(*args)
+                except Exception as e:
+                    error = e
+            self._results.put((result, error, on_done, on_error))
+
+    def _poll(self):
+        while True:
+            try:
+                result, error, on_done, on_error = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if error is not None:
+                (on_error or self.show_error)(error)
+            elif on_done is not None:
+                on_done(result)
+        self.root.after(POLL_MS, self._poll)
+
+    def show_error(self, error):
+        messagebox.showerror("EventLink", f"Could not load data: {error}")
+
+
+class VirtualEventList(tk.Frame):
+    """Scrollable events list that only draws the rows in view.
+
+    The canvas holds one set of items per visible row, moved and relabelled as
+    the list scrolls, and row data is fetched PAGE_SIZE events at a time on the
+    loader thread, so scrolling costs the same for 50 events or 50,000.
+    """
+
+    def __init__(self, parent, loader, row_height=ROW_HEIGHT):
+        super().__init__(parent, bg=COLOR_BG_MAIN)
+        self.loader = loader
+        self.row_height = row_height
+        self.user = None
+        self.count = 0
+        self.offset = 0                 # pixels scrolled from the top of the list
+        self._pages = OrderedDict()     # page number -> rows, least recently viewed first
+        self._stale = {}                # pages from before a refresh, shown until reloaded
+        self._loading = set()
+        self._wanted = frozenset()      # pages in view; read by the loader thread
+        self._generation = 0            # bumped when the list changes, to drop late results
+        self._slots = []                # recycled canvas items, one dict per visible row
+
+        self.scrollbar = ttk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.pack(side="right", fill="y")
+        self.canvas = tk.Canvas(self, bg=COLOR_BG_MAIN, highlightthickness=0)
+        self.canvas.pack(side="left", fill="both", expand=True)
+        self.canvas.bind("<Configure>", lambda event: self.redraw())
+        self.canvas.bind("<Button-1>", self._on_click)
+        for sequence in ("<MouseWheel>", "<Button-4>", "<Button-5>"):
+            self.canvas.bind(sequence, self._on_wheel)
+
+    def load(self, user):
+        """Show the events list for a user; for the same user, rows already loaded stay until refreshed"""
+        if user != self.user:
+            self.user = user
+            self.offset = 0
+            self.count = 0
+            self._pages.clear()
+            self._stale = {}
+        self._generation += 1
+        self._loading.clear()
+        generation = self._generation
+        self.loader.submit("event_count", user, on_done=lambda count: self._count_loaded(generation, count))
+        self.redraw()
+
+    def _count_loaded(self, generation, count):
+        if generation != self._generation:
+            return
+        self.count = count
+        # Rows may have shifted since the pages were fetched; keep showing them while fresh ones load
+        self._stale, self._pages = dict(self._pages), OrderedDict()
+        self.scroll_to(self.offset)
+
+    def scroll_to(self, offset):
+        max_offset = max(0, self.count * self.row_height - self.canvas.winfo_height())
+        self.offset = min(max(0, int(offset)), max_offset)
+        self.redraw()
+
+    def _on_scrollbar(self, action, value, unit=None):
+        if action == "moveto":
+            self.scroll_to(float(value) * self.count * self.row_height)
+        elif action == "scroll":
+            step = self.row_height if unit == "units" else self.canvas.winfo_height() - self.row_height
+            self.scroll_to(self.offset + int(value) * step)
+
+    def _on_wheel(self, event):
+        # X11 sends buttons 4/5; Windows and macOS send <MouseWheel> with a signed delta
+        direction = -1 if event.num == 4 or getattr(event, "delta", 0) > 0 else 1
+        self.scroll_to(self.offset + direction * 3 * self.row_height)
+
+    def _on_click(self, event):
+        index = (self.offset + event.y) // self.row_height
+        row = self._row(index) if index < self.count else None
+        if row is not None:
+            messagebox.showinfo(row[0], f"{row[1]}\n\nPrice: {row[2]}")
+
+    def _row(self, index):
+        page, position = divmod(index, PAGE_SIZE)
+        rows = self._pages.get(page)
+        if rows is not None:
+            self._pages.move_to_end(page)
+        else:
+            rows = self._stale.get(page)
+            if rows is None:
+                return None
+        return rows[position] if position < len(rows) else None
+
+    def redraw(self):
+        width, height = self.canvas.winfo_width(), self.canvas.winfo_height()
+        first = self.offset // self.row_height
+        visible = range(first, min(self.count, (self.offset + height) // self.row_height + 1))
+        while len(self._slots) < len(visible):
+            self._slots.append(self._new_slot())
+        for slot, index in zip(self._slots, visible):
+            self._draw_slot(slot, index * self.row_height - self.offset, width, self._row(index))
+        for slot in self._slots[len(visible):]:
+            for item in slot.values():
+                self.canvas.itemconfigure(item, state="hidden")
+
+        total = self.count * self.row_height
+        self.scrollbar.set(*((self.offset / total, min(1.0, (self.offset + height) / total)) if total else (0, 1)))
+
+        pages = {index // PAGE_SIZE for index in visible}
+        self._wanted = frozenset(pages)
+        for page in sorted(pages - self._pages.keys() - self._loading):
+            self._loading.add(page)
+            generation = self._generation
+            self.loader.submit("event_page", self.user, page, wanted=lambda page=page: page in self._wanted,
+                               on_done=lambda rows, page=page: self._page_loaded(generation, page, rows))
+
+    def _page_loaded(self, generation, page, rows):
+        if generation != self._generation:
+            return
+        self._loading.discard(page)
+        if rows is None:
+            return  # scrolled away before the query ran
+        self._pages[page] = rows
+        self._stale.pop(page, None)
+        while len(self._pages) > MAX_PAGES:
+            self._pages.popitem(last=False)
+        if page in self._wanted:
+            self.redraw()
+
+    def _new_slot(self):
+        create = self.canvas
+        return {
+            "card": create.create_rectangle(0, 0, 0, 0, fill=COLOR_CARD, outline=""),
+            "name": create.create_text(0, 0, anchor="w", font=("Helvetica", 11, "bold"), fill=COLOR_TEXT_MAIN),
+            "details": create.create_text(0, 0, anchor="w", font=("Helvetica", 9), fill=COLOR_TEXT_MUTED),
+            "amount": create.create_text(0, 0, anchor="e", font=("Helvetica", 11, "bold"), fill=COLOR_TEXT_MAIN),
+            "button": create.create_rectangle(0, 0, 0, 0, fill="white", outline=COLOR_TEXT_MUTED),
+            "label": create.create_text(0, 0, text="View", font=FONT_BODY, fill=COLOR_TEXT_MAIN),
+        }
+
+    def _draw_slot(self, slot, y, width, row):
+        # Same layout as create_event_row: a white card with 5px between rows
+        top, bottom, middle = y + 5, y + self.row_height - 5, y + self.row_height // 2
+        name, details, amount = row or ("Loading…", "", "")
+        canvas = self.canvas
+        canvas.coords(slot["card"], 0, top, width, bottom)
+        canvas.coords(slot["name"], 20, middle - 10)
+        canvas.coords(slot["details"], 20, middle + 10)
+        canvas.coords(slot["amount"], width - 90, middle)
+        canvas.coords(slot["button"], width - 70, middle - 12, width - 20, middle + 12)
+        canvas.coords(slot["label"], width - 45, middle)
+        canvas.itemconfigure(slot["name"], text=name)
+        canvas.itemconfigure(slot["details"], text=details)
+        canvas.itemconfigure(slot["amount"], text=amount)
+        for key, item in slot.items():
+            canvas.itemconfigure(item, state="hidden" if row is None and key in ("button", "label") else "normal")
+
+
 class EventLinkApp(tk.Tk):
-    def __init__(self):
+    def __init__(self, source=None):
         super().__init__()
         self.title("EventLink")
         self.geometry("1000x700")
         self.configure(bg=COLOR_BG_MAIN)
-        
-        # Initialize the main container
+
+        # Initialize the main container; every screen is a frame stacked in the same cell
         self.container = tk.Frame(self, bg=COLOR_BG_MAIN)
         self.container.pack(fill="both", expand=True)
-        
+        self.container.grid_rowconfigure(0, weight=1)
+        self.container.grid_columnconfigure(0, weight=1)
+        self.screens = {}
+        self.pages = {}
+
+        self.loader = Loader(self, source or DatabaseSource())
+        self.user = None
+
         # Start with the Login Screen
         self.show_login_screen()
 
-    def clear_screen(self):
-        for widget in self.container.winfo_children():
-            widget.destroy()
+    def show_screen(self, name, build, parent=None, cache=None):
+        """Raise a screen, building it the first time; screens are kept, not rebuilt, between visits"""
+        cache = self.screens if cache is None else cache
+        screen = cache.get(name)
+        if screen is None:
+            screen = cache[name] = build(parent or self.container)
+            screen.grid(row=0, column=0, sticky="nsew")
+        screen.tkraise()
+        return screen
 
     # ==========================
     # SCREEN 1: LOGIN (Matches IMG_5009)
     # ==========================
     def show_login_screen(self):
-        self.clear_screen()
-        
+        self.show_screen("login", self.build_login_screen)
+
+    def build_login_screen(self, parent):
+        screen = tk.Frame(parent, bg=COLOR_BG_MAIN)
+
         # Center Box
-        login_card = tk.Frame(self.container, bg=COLOR_CARD, padx=40, pady=40)
+        login_card = tk.Frame(screen, bg=COLOR_CARD, padx=40, pady=40)
         login_card.place(relx=0.5, rely=0.5, anchor="center", width=400, height=500)
-        
+
         # Logo / Brand
         tk.Label(login_card, text="✨ EventLink", font=("Helvetica", 16, "bold"), fg=COLOR_PRIMARY, bg=COLOR_CARD).pack(pady=(0, 20))
-        
+
         # Header
         tk.Label(login_card, text="Welcome back", font=FONT_HEADER, fg=COLOR_TEXT_MAIN, bg=COLOR_CARD).pack(anchor="w")
         tk.Label(login_card, text="Sign in to your account to continue", font=FONT_BODY, fg=COLOR_TEXT_MUTED, bg=COLOR_CARD).pack(anchor="w", pady=(0, 20))
-        
+
         # Inputs
         tk.Label(login_card, text="Email address", font=("Helvetica", 9, "bold"), bg=COLOR_CARD, fg=COLOR_TEXT_MAIN).pack(anchor="w")
         self.email_entry = tk.Entry(login_card, font=FONT_BODY, highlightthickness=1, relief="flat", bg="#f9fafb")
         self.email_entry.pack(fill="x", pady=(5, 15), ipady=5)
-        
+
         tk.Label(login_card, text="Password", font=("Helvetica", 9, "bold"), bg=COLOR_CARD, fg=COLOR_TEXT_MAIN).pack(anchor="w")
         self.pass_entry = tk.Entry(login_card, show="*", font=FONT_BODY, highlightthickness=1, relief="flat", bg="#f9fafb")
         self.pass_entry.pack(fill="x", pady=(5, 20), ipady=5)
-        
+        self.pass_entry.bind("<Return>", lambda event: self.sign_in())
+
         # Primary Button (Using tk.Button for color control)
         # Note: On Mac, background colors on buttons are restricted by the OS. On Windows/Linux, this will be Blue.
-        btn = tk.Button(login_card, text="Sign in  →", bg=COLOR_PRIMARY, fg="white", font=("Helvetica", 10, "bold"), 
-                        relief="flat", command=self.show_dashboard_screen)
-        btn.pack(fill="x", ipady=8)
-        
+        self.sign_in_button = tk.Button(login_card, text="Sign in  →", bg=COLOR_PRIMARY, fg="white", font=("Helvetica", 10, "bold"),
+                                        relief="flat", command=self.sign_in)
+        self.sign_in_button.pack(fill="x", ipady=8)
+        self.login_status = tk.Label(login_card, text="", font=("Helvetica", 9), fg="#dc2626", bg=COLOR_CARD)
+        self.login_status.pack(pady=(10, 0))
+
         # Footer
-        tk.Label(login_card, text="Don't have an account? Sign up", font=("Helvetica", 9), fg=COLOR_PRIMARY, bg=COLOR_CARD).pack(pady=20)
+        tk.Label(login_card, text="Don't have an account? Sign up", font=("Helvetica", 9), fg=COLOR_PRIMARY, bg=COLOR_CARD).pack(pady=10)
+        return screen
+
+    def sign_in(self):
+        # Checking the password hash takes a while, so it runs on the loader thread too
+        self.sign_in_button.configure(state="disabled")
+        self.login_status.configure(text="Signing in…", fg=COLOR_TEXT_MUTED)
+        self.loader.submit("login", self.email_entry.get().strip(), self.pass_entry.get(),
+                           on_done=self.signed_in, on_error=self.sign_in_failed)
+
+    def signed_in(self, user):
+        self.sign_in_button.configure(state="normal")
+        if user is None:
+            self.login_status.configure(text="Invalid email or password", fg="#dc2626")
+            return
+        self.login_status.configure(text="")
+        self.pass_entry.delete(0, "end")
+        self.user = user
+        self.show_dashboard_screen()
+
+    def sign_in_failed(self, error):
+        self.sign_in_button.configure(state="normal")
+        self.login_status.configure(text=f"Could not reach the database: {error}", fg="#dc2626")
 
     # ==========================
-    # SCREEN 2: DASHBOARD (Matches IMG_5011/5010)
+    # Signed-in shell: sidebar plus the page area
     # ==========================
-    def show_dashboard_screen(self):
-        self.clear_screen()
-        
+    def show_page(self, name, build):
+        self.show_screen("main", self.build_main_screen)
+        return self.show_screen(name, build, parent=self.page_area, cache=self.pages)
+
+    def build_main_screen(self, parent):
+        screen = tk.Frame(parent, bg=COLOR_BG_MAIN)
+
         # --- Sidebar (Left) ---
-        sidebar = tk.Frame(self.container, bg=COLOR_BG_SIDEBAR, width=250)
+        sidebar = tk.Frame(screen, bg=COLOR_BG_SIDEBAR, width=250)
         sidebar.pack(side="left", fill="y")
-        
+
         # Sidebar Logo
         tk.Label(sidebar, text="✨ EventLink", font=("Helvetica", 16, "bold"), fg=COLOR_PRIMARY, bg=COLOR_BG_SIDEBAR).pack(pady=30, padx=20, anchor="w")
-        
+
         # Sidebar Menu Items
-        menu_items = ["🏠  Home", "📅  My Events", "💳  Payments", "👤  Profile", "⚙️  Settings"]
-        for item in menu_items:
-            btn = tk.Button(sidebar, text=item, font=("Helvetica", 11), bg=COLOR_BG_SIDEBAR, fg=COLOR_TEXT_MAIN, 
-                            relief="flat", anchor="w", padx=20, borderwidth=0)
+        menu_items = [("🏠  Home", self.show_dashboard_screen), ("📅  My Events", self.show_events_screen),
+                      ("💳  Payments", None), ("👤  Profile", None), ("⚙️  Settings", None)]
+        for item, command in menu_items:
+            btn = tk.Button(sidebar, text=item, font=("Helvetica", 11), bg=COLOR_BG_SIDEBAR, fg=COLOR_TEXT_MAIN,
+                            relief="flat", anchor="w", padx=20, borderwidth=0, command=command)
             btn.pack(fill="x", pady=5, ipady=5)
+        tk.Button(sidebar, text="↩  Sign out", font=("Helvetica", 11), bg=COLOR_BG_SIDEBAR, fg=COLOR_TEXT_MUTED,
+                  relief="flat", anchor="w", padx=20, borderwidth=0, command=self.sign_out).pack(side="bottom", fill="x", pady=20, ipady=5)
 
         # --- Main Content Area (Right) ---
-        main_area = tk.Frame(self.container, bg=COLOR_BG_MAIN)
-        main_area.pack(side="left", fill="both", expand=True, padx=30, pady=30)
-        
+        self.page_area = tk.Frame(screen, bg=COLOR_BG_MAIN)
+        self.page_area.pack(side="left", fill="both", expand=True, padx=30, pady=30)
+        self.page_area.grid_rowconfigure(0, weight=1)
+        self.page_area.grid_columnconfigure(0, weight=1)
+        return screen
+
+    def sign_out(self):
+        self.user = None
+        self.show_login_screen()
+
+    # ==========================
+    # SCREEN 2: DASHBOARD (Matches IMG_5011/5010)
+    # ==========================
+    def show_dashboard_screen(self):
+        self.show_page("dashboard", self.build_dashboard_screen)
+        # The widgets are kept; only the figures are reloaded
+        user = self.user
+        self.loader.submit("dashboard", user, on_done=lambda data: self.fill_dashboard(user, data))
+
+    def build_dashboard_screen(self, parent):
+        main_area = tk.Frame(parent, bg=COLOR_BG_MAIN)
+
         # Top Bar
         top_frame = tk.Frame(main_area, bg=COLOR_BG_MAIN)
         top_frame.pack(fill="x", pady=(0, 20))
         tk.Label(top_frame, text="Dashboard", font=FONT_HEADER, bg=COLOR_BG_MAIN, fg=COLOR_TEXT_MAIN).pack(side="left")
-        tk.Button(top_frame, text="+ Create Event", bg=COLOR_PRIMARY, fg="white", relief="flat", font=("Helvetica", 10, "bold")).pack(side="right", padx=10)
+        self.create_event_button = tk.Button(top_frame, text="+ Create Event", bg=COLOR_PRIMARY, fg="white", relief="flat", font=("Helvetica", 10, "bold"))
 
-        # Dashboard Logic: Stats Cards
+        # Dashboard Logic: Stats Cards (filled in when the figures arrive)
         stats_frame = tk.Frame(main_area, bg=COLOR_BG_MAIN)
         stats_frame.pack(fill="x", pady=20)
-        
-        self.create_stat_card(stats_frame, "Total Events", "12", "+3 this month")
-        self.create_stat_card(stats_frame, "Total Attendees", "8,450", "+1,250 this month")
-        self.create_stat_card(stats_frame, "Total Revenue", "$425,000", "+$85k this month")
+        self.stat_cards = [self.create_stat_card(stats_frame, "", "—", "") for _ in range(3)]
 
         # Upcoming Events Section (Matches IMG_5011)
         tk.Label(main_area, text="Your Upcoming Events", font=FONT_SUBHEADER, bg=COLOR_BG_MAIN, fg=COLOR_TEXT_MAIN).pack(anchor="w", pady=(20, 10))
-        
-        events_list = tk.Frame(main_area, bg=COLOR_BG_MAIN)
-        events_list.pack(fill="both", expand=True)
-        
-        # Event 1
-        self.create_event_row(events_list, "Summer Music Festival 2025", "Jul 15, 2025 • 2,500 attendees", "$112,500")
-        # Event 2
-        self.create_event_row(events_list, "Tech Innovation Summit", "Aug 05, 2025 • 1,200 attendees", "$144,000")
-        # Event 3
-        self.create_event_row(events_list, "Jazz Night Under the Stars", "Sep 28, 2025 • 300 attendees", "$15,400")
+
+        self.dashboard_events = tk.Frame(main_area, bg=COLOR_BG_MAIN)
+        self.dashboard_events.pack(fill="both", expand=True)
+        return main_area
+
+    def fill_dashboard(self, user, data):
+        if user is not self.user:
+            return  # signed out (or in as someone else) while loading
+        if user["role"] == "organizer":
+            self.create_event_button.pack(side="right", padx=10)
+        else:
+            self.create_event_button.pack_forget()
+        for labels, values in zip(self.stat_cards, data["cards"]):
+            for label, text in zip(labels, values):
+                label.configure(text=text)
+        for row in self.dashboard_events.winfo_children():
+            row.destroy()
+        for name, details, amount in data["events"]:
+            self.create_event_row(self.dashboard_events, name, details, amount)
+        if not data["events"]:
+            tk.Label(self.dashboard_events, text="No upcoming events", font=FONT_BODY, fg=COLOR_TEXT_MUTED, bg=COLOR_BG_MAIN).pack(anchor="w")
 
     def create_stat_card(self, parent, title, value, subtext):
         card = tk.Frame(parent, bg=COLOR_CARD, padx=20, pady=20)
         card.pack(side="left", fill="both", expand=True, padx=(0, 20))
-        
-        tk.Label(card, text=title, font=("Helvetica", 10), fg=COLOR_TEXT_MUTED, bg=COLOR_CARD).pack(anchor="w")
-        tk.Label(card, text=value, font=("Helvetica", 20, "bold"), fg=COLOR_TEXT_MAIN, bg=COLOR_CARD).pack(anchor="w", pady=5)
-        tk.Label(card, text=subtext, font=("Helvetica", 9), fg="green", bg=COLOR_CARD).pack(anchor="w")
+
+        title_label = tk.Label(card, text=title, font=("Helvetica", 10), fg=COLOR_TEXT_MUTED, bg=COLOR_CARD)
+        title_label.pack(anchor="w")
+        value_label = tk.Label(card, text=value, font=("Helvetica", 20, "bold"), fg=COLOR_TEXT_MAIN, bg=COLOR_CARD)
+        value_label.pack(anchor="w", pady=5)
+        subtext_label = tk.Label(card, text=subtext, font=("Helvetica", 9), fg="green", bg=COLOR_CARD)
+        subtext_label.pack(anchor="w")
+        return title_label, value_label, subtext_label
 
     def create_event_row(self, parent, name, details, revenue):
         row = tk.Frame(parent, bg=COLOR_CARD, padx=20, pady=15)
         row.pack(fill="x", pady=5)
-        
+
         # Left: Info
         info_frame = tk.Frame(row, bg=COLOR_CARD)
         info_frame.pack(side="left")
         tk.Label(info_frame, text=name, font=("Helvetica", 11, "bold"), fg=COLOR_TEXT_MAIN, bg=COLOR_CARD).pack(anchor="w")
         tk.Label(info_frame, text=details, font=("Helvetica", 9), fg=COLOR_TEXT_MUTED, bg=COLOR_CARD).pack(anchor="w")
-        
+
         # Right: Revenue & Action
         tk.Button(row, text="View", bg="white", fg=COLOR_TEXT_MAIN, relief="solid", borderwidth=1).pack(side="right", padx=10)
         tk.Label(row, text=revenue, font=("Helvetica", 11, "bold"), fg=COLOR_TEXT_MAIN, bg=COLOR_CARD).pack(side="right", padx=20)
 
+    # ==========================
+    # SCREEN 3: EVENTS LIST
+    # ==========================
+    def show_events_screen(self):
+        self.show_page("events", self.build_events_screen)
+        self.events_header.configure(text="My Events" if self.user["role"] == "organizer" else "Upcoming Events")
+        self.event_list.load(self.user)
+
+    def build_events_screen(self, parent):
+        main_area = tk.Frame(parent, bg=COLOR_BG_MAIN)
+        self.events_header = tk.Label(main_area, text="", font=FONT_HEADER, bg=COLOR_BG_MAIN, fg=COLOR_TEXT_MAIN)
+        self.events_header.pack(anchor="w", pady=(0, 20))
+        self.event_list = VirtualEventList(main_area, self.loader)
+        self.event_list.pack(fill="both", expand=True)
+        return main_area
+
 if __name__ == "__main__":
     app = EventLinkApp()
-    app.mainloop()
\ No newline at end of file
+    app.mainloop()